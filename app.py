@@ -8,7 +8,9 @@ import sys  # Module système pour accéder aux paramètres de l'interpréteur P
 import os  # Modules système pour l'accès aux fichiers et répertoires
 
 import json  # Manipulation du format de données JSON (JavaScript Object Notation)
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash  # Framework web Flask pour créer l'application
+import base64  # Encodage des curseurs de pagination (jetons opaques dans les URLs)
+import secrets  # Jetons aléatoires des classements mis en cache
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g  # Framework web Flask pour créer l'application
 import pandas as pd  # Bibliothèque d'analyse de données (DataFrames) - manipulation de tableaux de données
 from datetime import timedelta  # Gestion des durées temporelles (ex: durée de session)
 from functools import wraps  # Outil pour créer des décorateurs (fonctions qui modifient d'autres fonctions)
@@ -21,10 +23,21 @@ from config import (
     SECRET_KEY,              # Clé secrète pour chiffrer les sessions utilisateur
     SESSION_LIFETIME_DAYS,   # Durée de validité de la session en jours
     CLEAN_DATA_PATH,         # Chemin vers le fichier CSV contenant les cours
-    COURSES_PER_PAGE         # Nombre de cours affichés par page (pagination)
+    COURSES_PER_PAGE,        # Nombre de cours affichés par page (pagination)
+    TRACK_BATCH_MAX_EVENTS,  # Nombre maximal d'événements par lot (/api/track/batch)
+    ADMIN_USERNAMES,         # Utilisateurs autorisés sur les endpoints d'administration
+    HOME_FEED_CACHE_SIZE,    # Nombre maximal de fils personnalisés gardés en mémoire
+    HOME_FEED_CACHE_TTL,     # Durée de vie d'un fil personnalisé en cache (secondes)
+    RANKING_CACHE_SIZE,      # Nombre maximal de classements /courses gardés en mémoire
+    RANKING_CACHE_TTL,       # Durée de vie d'un classement /courses (pagination stable)
+    ANALYTICS_CUBE_PATH,     # Fichier du cube analytique du tableau de bord
+    N_CLUSTERS               # Nombre de clusters K-Means
 )
 from models.recommender import CourseRecommender  # Moteur de recommandation (Logique métier) - algorithmes ML
 from user_manager import UserManager  # Gestion des utilisateurs (Base de données SQLite)
+from cache import TTLCache  # Cache mémoire avec expiration et borne LRU
+from models.analytics_cube import AnalyticsCube  # Agrégats du tableau de bord (catégorie × plateforme × niveau × cluster)
+from models.course_json import encode_object  # Assemblage des réponses à partir du JSON pré-encodé
 
 # === CONFIGURATION DE L'APPLICATION FLASK ===
 app = Flask(__name__)  # Initialisation de l'application Flask (création de l'instance)
@@ -42,6 +55,8 @@ app.jinja_env.globals.update(max=max, min=min)
 # Un seul objet créé pour toute l'application (pattern Singleton)
 recommender = CourseRecommender()  # Instance du moteur de recommandation (TF-IDF, Cosine Similarity)
 user_manager = UserManager()  # Instance du gestionnaire d'utilisateurs (SQLite)
+home_feed_cache = TTLCache(HOME_FEED_CACHE_SIZE, HOME_FEED_CACHE_TTL)  # user_id -> fil de l'accueil
+ranking_cache = TTLCache(RANKING_CACHE_SIZE, RANKING_CACHE_TTL)  # jeton -> classement du catalogue
 
 
 # === DÉCORATEUR DE PROTECTION DES ROUTES ===
@@ -57,11 +72,65 @@ def login_required(f):  # Décorateur personnalisé pour protéger l'accès aux
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):  # Décorateur réservant une route aux administrateurs
+    """Vérifie que l'utilisateur connecté fait partie de ADMIN_USERNAMES"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'username' not in session:
+            return redirect(url_for('login'))
+        if session['username'] not in ADMIN_USERNAMES:
+            return jsonify({'error': 'Forbidden'}), 403  # Connecté mais non administrateur
+        return f(*args, **kwargs)
+    return decorated_function
+
 def get_current_user():
     """Récupère le nom d'utilisateur depuis la session active"""
     # session.get() retourne None si la clé n'existe pas (évite les erreurs)
     return session.get('username')
 
+def get_current_user_id():
+    """Récupère l'ID de l'utilisateur connecté (résolu une seule fois par session)"""
+    # L'ID est stocké dans la session à la connexion : plus de SELECT sur 'users' à chaque requête
+    user_id = session.get('user_id')
+    if user_id is None and 'username' in session:
+        # Sessions ouvertes avant l'ajout de l'ID : on le résout une fois puis on le mémorise
+        user_id = user_manager.get_user_id(session['username'])
+        if user_id is not None:
+            session['user_id'] = user_id
+    return user_id
+
+def get_profile_snapshot():
+    """Profil complet de l'utilisateur connecté, mémorisé pour la durée de la requête"""
+    # flask.g vit le temps d'une requête : plusieurs appels ne déclenchent qu'une seule transaction
+    if 'profile_snapshot' not in g:
+        g.profile_snapshot = user_manager.get_profile_snapshot(get_current_user_id())
+    return g.profile_snapshot
+
+def json_bytes_response(body, status=200):
+    """Réponse JSON à partir d'octets déjà encodés (fragments de cours pré-encodés)"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def encode_page_cursor(key):
+    """Encode une clé de pagination (ex: (timestamp, id)) en jeton opaque pour les URLs"""
+    # None = pas de page suivante ; le client renvoie le jeton tel quel (?cursor=...)
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def decode_page_cursor(token):
+    """Décode un jeton de pagination ; None si absent, ValueError s'il est invalide"""
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    # Forme émise par encode_page_cursor : [timestamp ISO, id entier] ; tout autre jeton est refusé
+    if (not isinstance(key, list) or len(key) != 2 or not isinstance(key[0], str)
+            or not isinstance(key[1], int) or isinstance(key[1], bool)):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
 # === INITIALISATION DU SYSTÈME DE RECOMMANDATION ===
 def init_recommender():  # Initialisation et chargement du modèle de recommandation au démarrage
     """Charge ou entraîne le modèle de recommandation (TF-IDF + Cosine Similarity)"""
@@ -88,6 +157,16 @@ def init_recommender():  # Initialisation et chargement du modèle de recommanda
         recommender.train()  # Calcul de la matrice TF-IDF et de la similarité cosinus
         recommender.save_model()  # Sérialisation du modèle (pickle)
     
+    # Catalogue lu depuis le CSV (premier démarrage ou CSV modifié) : écrire l'instantané binaire
+    # pour que les prochains démarrages (et les autres workers) évitent l'analyse du CSV
+    if not recommender.loaded_from_snapshot:
+        recommender.save_snapshot()
+    
+    # Les clics ne stockent que course_id : la base retrouve catégorie/niveau/plateforme via le catalogue
+    user_manager.set_course_lookup(recommender.get_course_lookup())
+    home_feed_cache.clear()  # Les fils en cache référencent l'ancien catalogue
+    ranking_cache.clear()
+    
     # Vérification finale : le modèle est-il prêt ?
     if recommender.is_trained:
         stats = recommender.get_stats()  # Récupère les statistiques (nombre de cours, etc.)
@@ -114,6 +193,7 @@ def login():  # Gestion de la connexion utilisateur
         
         if success:  # Identifiants corrects
             session['username'] = username  # Crée une session (cookie chiffré)
+            session['user_id'] = user_manager.get_user_id(username)  # ID résolu une seule fois (cache)
             session.permanent = True  # La session persiste même après fermeture du navigateur
             return redirect(url_for('home'))  # Redirige vers la page d'accueil
         else:  # Identifiants incorrects
@@ -148,6 +228,7 @@ def register():  # Gestion de l'inscription utilisateur
         
         if success:  # Inscription réussie
             session['username'] = username  # Connexion automatique après inscription
+            session['user_id'] = user_manager.get_user_id(username)  # ID stocké pour les requêtes suivantes
             session.permanent = True  # Session persistante
             return redirect(url_for('home'))  # Redirige vers l'accueil
         else:  # Échec (ex: nom d'utilisateur déjà pris)
@@ -160,8 +241,40 @@ def register():  # Gestion de l'inscription utilisateur
 def logout():
     """Déconnecte l'utilisateur en supprimant sa session"""
     session.pop('username', None)  # Supprime 'username' de la session (déconnexion)
+    session.pop('user_id', None)  # Supprime l'ID mis en cache dans la session
     return redirect(url_for('login'))  # Redirige vers la page de connexion
 
+# === FIL PERSONNALISÉ DE L'ACCUEIL ===
+def build_home_feed(user_prefs, recent_searches):
+    """Construit le fil personnalisé de l'accueil : IDs des cours, scores de base et raisons"""
+    # Moteur hybride (models/hybrid_ranker.py) : recherches récentes, catégories préférées, popularité
+    # Dédoublonnage et scores calculés sur des tableaux numpy (voir CourseRecommender.recommend_for_user)
+    return recommender.recommend_for_user(user_prefs, recent_searches)
+
+def render_home_feed(feed, n=20):
+    """Transforme un fil (mis en cache) en cartes de cours : bruit aléatoire, bornage et tri"""
+    # Le bruit aléatoire (±2 points) est tiré à chaque affichage, après la lecture du cache
+    order, scores = recommender.get_hybrid_ranker().top(feed['base_scores'], n=n)
+    course_ids = feed['course_ids'][order]
+    courses_by_id = {course['course_id']: course for course in recommender.get_courses_by_ids(course_ids)}
+    
+    personalized_courses = []
+    for course_id, idx, score in zip(course_ids, order, scores):
+        course = courses_by_id.get(course_id)
+        if course is None:
+            continue
+        course['reason'] = feed['reasons'][idx]  # Raison affichée sur la carte du cours
+        course['similarity_score'] = float(score)  # Note finale de pertinence (40 à 99), triée
+        personalized_courses.append(course)
+    return personalized_courses
+
+def invalidate_home_feed(user_ids):
+    """Oublie le fil mis en cache des utilisateurs dont l'activité a changé (clic, recherche)"""
+    for user_id in user_ids:
+        home_feed_cache.pop(user_id)
+
+user_manager.add_activity_listener(invalidate_home_feed)  # Appelé à chaque clic/recherche suivi
+
 # === ROUTES WEB PRINCIPALES ===
 # Ces routes affichent les pages HTML de l'application
 
@@ -171,8 +284,11 @@ def home():  # Page d'accueil : Tableau de bord principal
     """Tableau de bord personnalisé avec recommandations hybrides basées sur le comportement utilisateur"""
     # Récupération des informations de l'utilisateur connecté
     username = get_current_user()  # Nom d'utilisateur depuis la session
-    user_prefs = user_manager.get_preferences(username)  # Récupération des préférences (catégories cliquées)
-    user_stats = user_manager.get_user_stats(username)  # Statistiques (nombre de clics, recherches, etc.)
+    snapshot = get_profile_snapshot()  # Profil complet en une seule transaction (mémorisé pour la requête)
+    if not snapshot:
+        return redirect(url_for('logout'))  # Utilisateur supprimé de la BD : on force la déconnexion
+    user_prefs = snapshot['preferences']  # Préférences (catégories cliquées)
+    user_stats = snapshot['stats']  # Statistiques (nombre de clics, recherches, etc.)
     
     # Récupération des métadonnées globales du système
     categories = recommender.get_categories()  # Liste de toutes les catégories disponibles
@@ -180,132 +296,14 @@ def home():  # Page d'accueil : Tableau de bord principal
     levels = recommender.get_levels()  # Niveaux de difficulté (Débutant, Intermédiaire, Avancé)
     stats = recommender.get_stats()  # Statistiques globales (nombre total de cours, etc.)
     
-    # --- Moteur de Recommandation Hybride ---
-    # Combine trois sources de recommandations :
-    # 1. Historique de recherche (intentions explicites)
-    # 2. Catégories préférées (comportement implicite au clic)
-    # 3. Popularité globale (si pas assez de données)
-    personalized_courses = []
-    recommendation_reasons = {}
-    
-    # 1. Recommandations basées sur les recherches récentes
-    # On regarde les derniers termes recherchés par l'utilisateur
-    recent_searches = user_manager.get_recent_searches(username, 3)
-    for query in recent_searches[:2]:
-        if query:
-            search_recs = recommender.recommend_by_query(query, n=3)
-            for course in search_recs:
-                if course['course_id'] not in [c['course_id'] for c in personalized_courses]:
-                    personalized_courses.append(course)
-                    recommendation_reasons[course['course_id']] = f"Basé sur votre recherche: '{query}'"
-    
-    # 2. Recommandations basées sur les catégories préférées (Proportionnel)
-    # On analyse les clics précédents pour identifier les sujets d'intérêt
-    cat_counts = user_prefs.get('categories', {})
-    if cat_counts:
-        # Prendre les 5 catégories les plus intéressantes
-        sorted_cats = sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        total_top_clicks = sum(count for cat, count in sorted_cats)
-        
-        # Nous voulons remplir environ 18-20 emplacements basés sur les intérêts de catégorie
-        target_total_cat_recs = 20
-        
-        for cat, count in sorted_cats:
-            # Calculer combien de cours montrer pour cette catégorie (poids proportionnel)
-            # Plus l'utilisateur clique sur une catégorie, plus on lui en montre
-            # Au moins 2 cours par sujet s'il est dans le top 5
-            proportion = count / total_top_clicks
-            n_to_fetch = max(2, round(proportion * target_total_cat_recs))
-            
-            # Obtenir les cours populaires dans cette catégorie
-            cat_courses = recommender.get_popular_courses(n=n_to_fetch, category=cat)
-            for course in cat_courses:
-                if course['course_id'] not in [c['course_id'] for c in personalized_courses]:
-                    personalized_courses.append(course)
-                    # Ajouter la raison de la recommandation
-                    recommendation_reasons[course['course_id']] = f"Car vous aimez: {cat}"
-                    # Limiter le nombre de recommandations
-                    if len(personalized_courses) >= 30: break
-            if len(personalized_courses) >= 30: break
-    else:
-        # Repli pour les nouveaux utilisateurs sans clics
-        top_cats = recommender.get_categories()[:3]
-        for cat in top_cats:
-            cat_courses = recommender.get_popular_courses(n=4, category=cat)
-            for course in cat_courses:
-                if course['course_id'] not in [c['course_id'] for c in personalized_courses]:
-                    personalized_courses.append(course)
-                    recommendation_reasons[course['course_id']] = f"Découvrez: {cat}"
-    
-    
-    # 3. Remplir avec des cours populaires si nécessaire
-    if len(personalized_courses) < 15:
-        popular = recommender.get_popular_courses(n=25)
-        for course in popular:
-            if len(personalized_courses) >= 25:
-                break
-            if course['course_id'] not in [c['course_id'] for c in personalized_courses]:
-                personalized_courses.append(course)
-                recommendation_reasons[course['course_id']] = "Cours populaire"
-    
-    # Ajouter des raisons explicatives et calculer des scores de similarité
-    import random
-    total_clicks = sum(cat_counts.values()) or 1
-    
-    for course in personalized_courses:
-        # Raison affichée sur la carte du cours (ex: "Basé sur votre recherche python")
-        course['reason'] = recommendation_reasons.get(course['course_id'], '')
-        
-        # Si le score existe déjà (venant du moteur de recherche), on l'ajuste
-        # Sinon on le calcule basé sur les métadonnées
-        
-        current_score = course.get('similarity_score')
-        
-        if current_score:
-            # C'est un résultat de recherche directe ou recommandation ML
-            # On normalise si c'est > 1 (le moteur retourne 0-100)
-            if current_score <= 1: current_score *= 100
-                
-            # DIVERSIFICATION : Réduire légèrement le score si on a déjà fait d'autres actions
-            # Si l'utilisateur a beaucoup d'autres intérêts, une seule recherche pèse moins lourd
-            if total_clicks > 5:
-                penalty = min(total_clicks * 0.5, 15.0) # Jusqu'à 15% de pénalité si très actif ailleurs
-                current_score -= penalty
-        else:
-            # Calcul heuristique pour les recommandations par catégorie/popularité
-            if 'recherche' in course['reason'].lower():
-                base = 85.0
-            elif 'aimez' in course['reason'].lower():
-                # Poids dynamique basé sur l'intérêt pour cette catégorie spécifique
-                cat_name = course.get('category')
-                cat_interest = cat_counts.get(cat_name, 0)
-                
-                # Ratio d'intérêt : part de cette catégorie dans l'historique total (0.0 à 1.0)
-                interest_ratio = cat_interest / total_clicks
-                
-                # Le score reflète la part d'intérêt : 
-                # Si 100% des clics sont ici -> ~95%
-                # Si 10% des clics sont ici -> ~75%
-                base = 70.0 + (interest_ratio * 25.0) 
-            elif 'populaire' in course['reason'].lower():
-                base = 60.0
-            else:
-                base = 50.0
-            
-            # Ajouter un bonus de qualité du cours (Note)
-            rating = course.get('rating', 0)
-            quality_bonus = max(0, (rating - 4.0) * 10) # +0 à +10 points pour 4.0 à 5.0
-            
-            current_score = base + quality_bonus
-            
-        # Ajout de bruit aléatoire pour éviter les scores trop ronds
-        final_score = current_score + random.uniform(-2.0, 2.0)
-        
-        # Bornage du score (Note finale de pertinence entre 40 et 99)
-        course['similarity_score'] = round(max(40.0, min(99.0, final_score)), 1)
-    
-    # Trier les recommandations par le score calculé pour que les sujets favoris apparaissent en premier
-    personalized_courses.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
+    # Fil personnalisé mis en cache par utilisateur (invalidé à chaque nouveau clic ou recherche)
+    recent_searches = snapshot['recent_searches'][:3]
+    user_id = get_current_user_id()
+    feed = home_feed_cache.get(user_id)
+    if feed is None:
+        feed = build_home_feed(user_prefs, recent_searches)
+        home_feed_cache.set(user_id, feed)
+    personalized_courses = render_home_feed(feed)
     
     return render_template('home.html',
                          username=username,
@@ -323,6 +321,7 @@ def home():  # Page d'accueil : Tableau de bord principal
 def courses():  # Catalogue des cours : Recherche, Filtrage et Pagination
     """Page de catalogue avec recherche, filtres (catégorie, plateforme, niveau) et tri intelligent"""
     username = get_current_user()  # Utilisateur connecté
+    user_id = get_current_user_id()  # ID de l'utilisateur (session)
     
     # === RÉCUPÉRATION DES PARAMÈTRES DE L'URL (Query Parameters) ===
     page = request.args.get('page', 1, type=int)  # Numéro de page (pagination)
@@ -339,93 +338,49 @@ def courses():  # Catalogue des cours : Recherche, Filtrage et Pagination
     if level: filters['level'] = level
     if search: filters['search'] = search
         
+    ranking_token = None  # Jeton du classement en cache (tri « recommandation » uniquement)
     if sort_by == 'recommendation':
-        # Mode Recommandation Intelligente
-        # 1. On récupère d'abord tous les candidats possibles (filtrés par catégories/niveau etc)
-        # Obtenir tous les cours en passant une grande valeur per_page ou en calculant le total
-        total_count = len(recommender.df) if recommender.df is not None else 1000
-        all_filtered = recommender.get_all_courses(page=1, per_page=total_count, sort_by='rating', filters=filters)['courses']
-        
-        # Le but est de re-trier cette liste `all_filtered` selon la pertinence utilisateur
-        
-        # 1. Essayer les recommandations basées sur l'historique de recherche
-        recent_searches = user_manager.get_recent_searches(username, n=3)
+        # Mode Recommandation Intelligente : les cours filtrés sont re-triés selon la pertinence utilisateur
+        # Le classement complet est calculé une fois puis gardé en cache ; les liens de pagination
+        # portent son jeton (?cursor=...) pour que les pages suivantes découpent le même ordre
+        # (pas de chevauchement ni de cours sautés, coût quasi nul pour les pages lointaines)
+        ranking_token = request.args.get('cursor', '')
+        entry = ranking_cache.get(ranking_token) if ranking_token else None
+        owner = (user_id, tuple(sorted(filters.items())))  # Un jeton ne sert qu'au même utilisateur et aux mêmes filtres
         
-        # 2. Essayer les recommandations basées sur les catégories principales (d'après les clics)
-        top_cats = user_manager.get_top_categories(username, n=2)
-        
-        query_text = ""
-        if recent_searches:
-            # On donne un poids normal aux recherches
-            query_text += " ".join(recent_searches)
-        if top_cats:
-            # On BOOSTE les catégories (x3) pour compenser leur IDF souvent plus faible
-            # (IDF = Inverse Document Frequency : un mot commun pèse moins lourd)
-            # Cela permet aux interactions récentes (clics) d'avoir plus d'impact face aux recherches textuelles
-            cat_text = " ".join(top_cats)
-            query_text += " " + (cat_text + " ") * 3
+        if entry is None or entry['owner'] != owner:
+            # 1. Essayer les recommandations basées sur l'historique de recherche
+            recent_searches = user_manager.get_recent_searches(user_id, n=3)
             
-        if query_text.strip():
-            # Recommandation personnalisée via TF-IDF / Cosine Similarity
-            # On demande au moteur de trouver les cours proches du "profil textuel" construit ci-dessus
-            recs = recommender.recommend_by_query(query_text, n=len(all_filtered), filters=filters)
-            rec_map = {r['course_id']: r['similarity_score'] for r in recs}
+            # 2. Essayer les recommandations basées sur les catégories principales (d'après les clics)
+            top_cats = user_manager.get_top_categories(user_id, n=2)
             
-            # Importer les modules nécessaires
-            import math
-            import random
+            query_text = ""
+            if recent_searches:
+                # On donne un poids normal aux recherches
+                query_text += " ".join(recent_searches)
+            if top_cats:
+                # On BOOSTE les catégories (x3) pour compenser leur IDF souvent plus faible
+                # (IDF = Inverse Document Frequency : un mot commun pèse moins lourd)
+                # Cela permet aux interactions récentes (clics) d'avoir plus d'impact face aux recherches textuelles
+                cat_text = " ".join(top_cats)
+                query_text += " " + (cat_text + " ") * 3
             
-            # Trouver le score max pour la normalisation
-            # On s'assure que le max n'est pas trop bas pour éviter de booster du bruit
-            max_sim = max(rec_map.values()) if rec_map else 1.0
-            max_sim = max(max_sim, 0.1) # Seuil minimal
+            # Classement vectorisé en un seul passage (filtres, similarité TF-IDF, note)
+            # Sans historique, l'ordre est aléatoire pour favoriser la découverte ("Serendipity")
+            ranking = recommender.rank_course_ids(query_text, filters=filters)
+            ranking_token = secrets.token_urlsafe(12)  # Jeton opaque (ne révèle ni l'utilisateur ni les filtres)
+            entry = {'owner': owner, 'query': query_text, 'ranking': ranking}
+            ranking_cache.set(ranking_token, entry)
             
-            for c in all_filtered:
-                raw_sim = rec_map.get(c['course_id'], 0)
-                
-                # Validation : Si le score brut est trop faible (< 0.05), on le considère comme nul
-                # sauf si c'est une correspondance exacte (rare)
-                if raw_sim < 0.01:
-                    raw_sim = 0
-                
-                # Boost et Mise à l'échelle
-                if raw_sim > 0:
-                    normalized = raw_sim / max_sim
-                    
-                    # Formule adoucie :
-                    # On veut que même les items avec une similarité moyenne (0.3-0.5) aient un score décent (60-70%)
-                    # Score = Base 50 + (sqrt(Normalisé) * 45) + (Bonus Note)
-                    # La racine carrée remonte les scores moyens vers le haut
-                    rating_bonus = (c.get('rating', 0) - 3.0) * 3 if c.get('rating', 0) > 3.0 else 0
-                    scaled_score = 50 + (math.sqrt(normalized) * 40) + rating_bonus
-                    
-                    # Ajouter un petit facteur aléatoire
-                    scaled_score += random.uniform(-1.5, 1.5)
-                    
-                    c['similarity_score'] = round(max(40.0, min(99.5, scaled_score)), 1)
-                else:
-                    c['similarity_score'] = 0
-                    
-            # Tri final par score décroissant
-            all_filtered.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
-        else:
-            # Repli : Mélanger aléatoirement si pas d'historique utilisateur pour éviter une liste statique
-            # C'est important pour la découverte ("Serendipity")
-            import random
-            random.shuffle(all_filtered)
-        
-        total = len(all_filtered)
-        start = (page - 1) * COURSES_PER_PAGE
-        end = start + COURSES_PER_PAGE
-        courses_list = all_filtered[start:end]
-        pages = (total + COURSES_PER_PAGE - 1) // COURSES_PER_PAGE
-        result = {'courses': courses_list, 'total': total, 'pages': pages, 'current_page': page}
+        # Seuls les cours de la page demandée sont convertis en dictionnaires
+        result = recommender.page_of_ranking(entry['ranking'], page=page, per_page=COURSES_PER_PAGE)
     else:
         result = recommender.get_all_courses(page=page, per_page=COURSES_PER_PAGE, sort_by=sort_by, filters=filters)
     
     # Suivre la recherche si elle renvoie des résultats
     if search and result['total'] > 0:
-        user_manager.track_search(username, search)
+        user_manager.track_search(user_id, search)
     
     return render_template('courses.html',
                          username=username,
@@ -436,13 +391,15 @@ def courses():  # Catalogue des cours : Recherche, Filtrage et Pagination
                          categories=recommender.get_categories(),
                          platforms=recommender.get_platforms(),
                          levels=recommender.get_levels(),
-                         current_filters={'platform': platform, 'category': category, 'level': level, 'search': search, 'sort': sort_by})
+                         current_filters={'platform': platform, 'category': category, 'level': level, 'search': search, 'sort': sort_by},
+                         ranking_token=ranking_token)  # Jeton du classement pour les liens de pagination
 
 @app.route('/course/<int:course_id>')  # Route dynamique avec paramètre (ID du cours)
 @login_required  # Nécessite une connexion
 def course_detail(course_id):  # Page de détail d'un cours spécifique
     """Affiche les détails complets d'un cours + recommandations de cours similaires"""
     username = get_current_user()  # Utilisateur connecté
+    user_id = get_current_user_id()  # ID de l'utilisateur (session)
     course = recommender.get_course_by_id(course_id)  # Récupère les détails du cours depuis le DataFrame
     
     # Vérification : le cours existe-t-il ?
@@ -451,9 +408,9 @@ def course_detail(course_id):  # Page de détail d'un cours spécifique
     
     # === TRACKING DU COMPORTEMENT UTILISATEUR ===
     # Enregistre que l'utilisateur a consulté ce cours (pour les statistiques)
-    user_manager.track_view(username, course_id)
+    user_manager.track_view(user_id, course_id)
     # Enregistre le clic (pour construire le profil d'intérêts)
-    user_manager.track_click(username, course)
+    user_manager.track_click(user_id, course)
     
     # Recommandation "Item-based" : Cours similaires à celui-ci (Collaborative Filtering)
     # Utilise la similarité cosinus pour trouver des cours proches
@@ -470,18 +427,20 @@ def course_detail(course_id):  # Page de détail d'un cours spécifique
 def profile():
     """Page de profil : affiche les statistiques, préférences et parcours sauvegardés de l'utilisateur"""
     username = get_current_user()  # Utilisateur connecté
-    user = user_manager.get_user(username)  # Récupère les infos utilisateur (email, date d'inscription, etc.)
+    snapshot = get_profile_snapshot()  # Compte, stats, préférences et parcours en une seule transaction
     
     # Vérification de sécurité : l'utilisateur existe-t-il dans la base de données ?
-    if not user:
+    if not snapshot:
         # Si la session existe mais l'utilisateur n'est pas dans la BD (après migration ou suppression)
         flash("Utilisateur introuvable. Veuillez vous reconnecter.")  # Message flash (notification)
         return redirect(url_for('logout'))  # Force la déconnexion
     
     # Récupération des données du profil
-    stats = user_manager.get_user_stats(username)  # Statistiques d'activité (clics, recherches, etc.)
-    prefs = user_manager.get_preferences(username)  # Préférences (catégories favorites)
-    saved_paths = user_manager.get_saved_paths(username)  # Parcours d'apprentissage sauvegardés
+    user = snapshot['user']  # Infos utilisateur (email, date d'inscription, etc.)
+    stats = snapshot['stats']  # Statistiques d'activité (clics, recherches, etc.)
+    prefs = snapshot['preferences']  # Préférences (catégories favorites)
+    saved_paths = snapshot['saved_paths']  # En-têtes des parcours sauvegardés (première page)
+    saved_paths_cursor = encode_page_cursor(snapshot['saved_paths_next'])  # Jeton de la page suivante
     
     # Rendu du template avec toutes les données du profil
     return render_template('profile.html',
@@ -489,7 +448,8 @@ def profile():
                          user=user,
                          stats=stats,
                          preferences=prefs,
-                         saved_paths=saved_paths)
+                         saved_paths=saved_paths,
+                         saved_paths_cursor=saved_paths_cursor)
 
 @app.route('/report')  # Route pour la page de rapport
 @login_required  # Nécessite une connexion
@@ -504,7 +464,7 @@ def report():
 @login_required  # Nécessite une connexion
 def api_search():
     """API de recherche instantanée : retourne des recommandations basées sur une requête textuelle (AJAX)"""
-    username = get_current_user()  # Utilisateur connecté
+    user_id = get_current_user_id()  # ID de l'utilisateur connecté
     data = request.get_json()  # Récupère les données JSON envoyées par le client (JavaScript)
     query = data.get('query', '')  # Terme de recherche
     n = data.get('n', 20)  # Nombre de résultats souhaités (par défaut 20)
@@ -513,30 +473,31 @@ def api_search():
     if not query:  # Validation : la requête est-elle vide ?
         return jsonify({'error': 'Query required'}), 400  # Erreur HTTP 400 (Bad Request)
     
-    # Appel du moteur de recommandation (TF-IDF + Cosine Similarity)
-    recommendations = recommender.recommend_by_query(query, n)
+    # Appel du moteur de recommandation (TF-IDF + Cosine Similarity) : lignes du catalogue + similarités
+    rows, scores = recommender.query_rows(query, n)
     
     # Suivre la recherche uniquement si des résultats sont trouvés et pertinents
     # Nous vérifions si nous avons des résultats et si le meilleur résultat a au moins une certaine similarité (ex. 15%)
-    if recommendations and recommendations[0].get('similarity_score', 0) > 15:
-        user_manager.track_search(username, query)  # Enregistre la recherche dans la BD
+    if len(rows) and recommender.similarity_percentages(scores[:1])[0] > 15:
+        user_manager.track_search(user_id, query)  # Enregistre la recherche dans la BD
     else:
         print(f"🔍 Recherche pour '{query}' ignorée (pas de résultats pertinents trouvés)")
     
-    # Retourne les résultats au format JSON
-    return jsonify({
-        'recommendations': recommendations,  # Liste des cours recommandés
-        'query': query,  # Requête originale
-        'count': len(recommendations)  # Nombre de résultats
-    })
+    # Retourne les résultats au format JSON (cours pré-encodés + score et rang de cette requête)
+    return json_bytes_response(encode_object(
+        recommendations=recommender.courses_json(rows, scores),  # Liste des cours recommandés
+        query=query,  # Requête originale
+        count=len(rows)  # Nombre de résultats
+    ))
 
 @app.route('/api/recommend/<int:course_id>')  # Route API avec paramètre dynamique
 @login_required  # Nécessite une connexion
 def api_recommend(course_id):
     """API de recommandation item-based : retourne des cours similaires à un cours donné"""
     n = request.args.get('n', 6, type=int)
-    similar = recommender.recommend_similar(course_id, n)
-    return jsonify({'course_id': course_id, 'recommendations': similar, 'count': len(similar)})
+    rows, scores = recommender.similar_rows(course_id, n)
+    return json_bytes_response(encode_object(
+        course_id=course_id, recommendations=recommender.courses_json(rows, scores), count=len(rows)))
 
 @app.route('/api/courses')  # API pour récupérer la liste des cours
 @login_required  # Nécessite une connexion
@@ -553,45 +514,117 @@ def api_courses():
         if request.args.get(key):  # Si le paramètre existe dans l'URL
             filters[key] = request.args.get(key)  # Ajoute au dictionnaire
     
-    # Appel du moteur de recommandation avec les paramètres
-    result = recommender.get_all_courses(page, per_page, sort_by, filters)
-    return jsonify(result)  # Retourne le résultat au format JSON
+    # Appel du moteur de recommandation avec les paramètres (lignes triées, sans conversion en dictionnaires)
+    if recommender.get_catalog() is None:  # Catalogue pas encore chargé
+        return jsonify({'courses': [], 'total': 0, 'pages': 0})
+    rows = recommender.catalog_rows(sort_by, filters)
+    start = (page - 1) * per_page  # Début de la page demandée
+    return json_bytes_response(encode_object(  # Retourne le résultat au format JSON (cours pré-encodés)
+        courses=recommender.courses_json(rows[start:start + per_page]),
+        total=len(rows),
+        pages=(len(rows) + per_page - 1) // per_page,
+        current_page=page
+    ))
 
 @app.route('/api/track/click', methods=['POST'])  # Tracking des clics (POST uniquement)
 @login_required  # Nécessite une connexion
 def api_track_click():
     """API de tracking : enregistre un clic utilisateur sur un cours (pour le profil d'intérêts)"""
-    username = get_current_user()
+    user_id = get_current_user_id()
     data = request.get_json()
     course_id = data.get('course_id')
     
     if course_id is not None:
         course = recommender.get_course_by_id(course_id)
         if course:
-            user_manager.track_click(username, course)
+            user_manager.track_click(user_id, course)
     
     return jsonify({'status': 'ok'})
 
+@app.route('/api/track/batch', methods=['POST'])  # Tracking par lot (POST uniquement)
+@login_required  # Nécessite une connexion
+def api_track_batch():
+    """API de tracking par lot : enregistre plusieurs clics et recherches du client en une seule requête"""
+    user_id = get_current_user_id()
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')  # Format : [{"type": "click", "course_id": 12}, {"type": "search", "query": "python"}]
+    
+    if not isinstance(events, list):  # Validation du format
+        return jsonify({'error': 'Events list required'}), 400
+    if len(events) > TRACK_BATCH_MAX_EVENTS:  # Protection contre les lots trop volumineux
+        return jsonify({'error': f'Too many events (max {TRACK_BATCH_MAX_EVENTS})'}), 413
+    
+    accepted = 0
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        if event.get('type') == 'click':
+            try:
+                course = recommender.get_course_by_id(int(event.get('course_id')))
+            except (TypeError, ValueError):
+                course = None
+            if course:
+                user_manager.track_click(user_id, course)  # Mis en file d'attente (écriture par lot)
+                accepted += 1
+        elif event.get('type') == 'search':
+            query = str(event.get('query') or '').strip()
+            if query:
+                user_manager.track_search(user_id, query)
+                accepted += 1
+    
+    return jsonify({
+        'status': 'ok',
+        'accepted': accepted,  # Événements enregistrés
+        'rejected': len(events) - accepted,  # Événements invalides ignorés
+        'queue_depth': user_manager.get_event_queue_depth()  # Événements en attente d'écriture
+    })
+
+@app.route('/api/track/queue')  # Profondeur de la file d'ingestion des événements
+@login_required  # Nécessite une connexion
+def api_track_queue():
+    """API de supervision : événements en attente d'écriture dans la base et événements perdus (file pleine)"""
+    return jsonify({
+        'queue_depth': user_manager.get_event_queue_depth(),  # En attente d'écriture
+        'dropped': user_manager.get_event_queue_dropped()  # Abandonnés depuis le démarrage
+    })
+
+@app.route('/api/admin/db-profile')  # Résumé de l'instrumentation SQLite (administrateurs)
+@admin_required  # Réservé à ADMIN_USERNAMES
+def api_admin_db_profile():
+    """API d'administration : requêtes les plus coûteuses, requêtes lentes et parcours complets"""
+    top = request.args.get('top', 20, type=int)  # Nombre d'instructions listées
+    profile = user_manager.get_query_profile(max(top, 0))  # None si DB_PROFILING = False
+    if profile is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **profile})
+
 @app.route('/api/user/stats')  # API pour les statistiques utilisateur
 @login_required  # Nécessite une connexion
 def api_user_stats():
     """API de statistiques : retourne les stats d'activité de l'utilisateur (clics, recherches, etc.)"""
-    username = get_current_user()
-    stats = user_manager.get_user_stats(username)
+    user_id = get_current_user_id()
+    stats = user_manager.get_user_stats(user_id)
     return jsonify(stats)
 
 @app.route('/api/stats')  # API pour les statistiques globales (pas de login requis)
 def api_stats():
     """API de statistiques globales : retourne les stats du système (nombre de cours, catégories, etc.)"""
-    return jsonify(recommender.get_stats())
+    metadata = recommender.get_metadata()  # Calculées une fois par version du catalogue
+    if metadata is None:
+        return jsonify({})
+    # Corps JSON pré-encodé + ETag (version du catalogue) : 304 Not Modified si le client l'a déjà
+    response = app.response_class(metadata.stats_json, mimetype='application/json')
+    response.set_etag(metadata.etag)
+    return response.make_conditional(request)
 
 @app.route('/api/popular')  # API pour les cours populaires (pas de login requis)
 def api_popular():
     """API de popularité : retourne les cours les plus populaires (tri par nombre de vues/notes)"""
     n = request.args.get('n', 10, type=int)
     category = request.args.get('category', None)
-    popular = recommender.get_popular_courses(n, category)
-    return jsonify({'courses': popular, 'count': len(popular)})
+    leaderboard = recommender.get_leaderboard()  # Classements précalculés
+    rows = leaderboard.top(n, category) if leaderboard is not None else []
+    return json_bytes_response(encode_object(courses=recommender.courses_json(rows), count=len(rows)))
 
 # === ROUTES DE CLUSTERING (Analyse et Visualisation) ===
 # Le clustering regroupe les cours similaires en clusters (groupes) via K-Means
@@ -603,7 +636,7 @@ def get_clustering():  # Instance unique du modèle de clustering (Lazy Loading)
     global clustering_instance  # Utilise la variable globale
     if clustering_instance is None:  # Si pas encore initialisé
         from models.clustering import CourseClustering  # Import local (pour éviter les imports circulaires)
-        clustering_instance = CourseClustering(n_clusters=24)  # Crée une instance avec 24 clusters
+        clustering_instance = CourseClustering(n_clusters=N_CLUSTERS)  # Crée une instance avec 24 clusters
         clustering_instance.run()  # Lance l'algorithme K-Means (TF-IDF + clustering)
     return clustering_instance  # Retourne l'instance (existante ou nouvellement créée)
 
@@ -637,30 +670,61 @@ def clustering():  # Page de visualisation des clusters (Groupes de cours simila
                          n_clusters=len(clusters_info),  # Nombre de clusters
                          n_categories=len(categories))  # Nombre de catégories
 
+analytics_cube = None  # Cube analytique de la version courante du catalogue (chargé ou calculé à la demande)
+
+def get_analytics_cube():  # Cube du tableau de bord : mémoire -> fichier -> calcul (K-Means seulement si nécessaire)
+    """Cube analytique (catégorie × plateforme × niveau × cluster) pour la version courante du catalogue"""
+    global analytics_cube
+    from models.clustering import clustering_version  # Import local (comme get_clustering)
+    catalog_version = recommender.catalog_version  # Empreinte du contenu du catalogue
+    cluster_version = clustering_version(N_CLUSTERS)  # Paramètres du K-Means (résultats déterministes)
+    
+    # 1. Cube déjà en mémoire et à jour
+    if (analytics_cube is not None and analytics_cube.catalog_version == catalog_version
+            and analytics_cube.clustering_version == cluster_version):
+        return analytics_cube
+        
+    # 2. Cube sauvegardé à côté des modèles (évite de relancer K-Means au démarrage)
+    cube = AnalyticsCube.load(ANALYTICS_CUBE_PATH, catalog_version, cluster_version)
+    if cube is None:
+        # 3. Calcul : les labels de cluster sont alignés ligne à ligne sur le catalogue (même CSV)
+        clustering_model = get_clustering()
+        cube = AnalyticsCube.build(recommender.get_catalog(), clustering_model.df['cluster'].to_numpy(),
+                                   catalog_version, cluster_version)
+        cube.save(ANALYTICS_CUBE_PATH)
+    analytics_cube = cube
+    return cube
+
+def dashboard_filters():  # Filtres de tranche communs au tableau de bord et à /api/dashboard
+    """Filtres {axe: valeur} lus dans l'URL (category, platform, level, cluster)"""
+    filters = {dimension: request.args.get(dimension, '') for dimension in ('category', 'platform', 'level')}
+    filters['cluster'] = request.args.get('cluster', None, type=int)  # None si absent ou invalide
+    return {key: value for key, value in filters.items() if value not in ('', None)}
+
 @app.route('/dashboard')  # Route pour le tableau de bord analytique
 @login_required  # Nécessite une connexion
 def dashboard():
     """Tableau de bord analytique : graphiques et statistiques sur les cours et clusters (Chart.js)"""
     username = get_current_user()  # Utilisateur connecté
-    clustering_model = get_clustering()  # Récupère le modèle de clustering
+    # Tous les graphiques sont des tranches du cube précalculé (pas de parcours du DataFrame par visite)
+    cube = get_analytics_cube()
+    filters = dashboard_filters()  # Tranche optionnelle (ex: ?category=Data Science)
     
     # === PRÉPARATION DES DONNÉES POUR LES GRAPHIQUES (Chart.js) ===
     
     # 1. Cours par Catégorie (Top 10) - Graphique en barres
-    # value_counts() compte le nombre d'occurrences de chaque catégorie
-    cat_counts = recommender.df['category'].value_counts().head(10).to_dict()
+    cat_counts = cube.counts_by('category', filters, top=10)
     
     # 2. Préparer les Données du Graphique - Cours par Plateforme (Diagramme circulaire)
-    platform_counts = recommender.df['platform'].value_counts().to_dict()
+    platform_counts = cube.counts_by('platform', filters)
     
     # 3. Préparer les Données du Graphique - Distribution des Clusters (Histogramme)
-    # Compte le nombre de cours dans chaque cluster (0, 1, 2, ..., 23)
-    cluster_counts = clustering_model.df['cluster'].value_counts().sort_index().tolist()
+    # Nombre de cours dans chaque cluster (0, 1, 2, ..., 23)
+    cluster_counts = cube.cluster_counts(filters)
     cluster_labels = [f"Cluster {i}" for i in range(len(cluster_counts))]  # Labels pour l'axe X
     
     # 4. Préparer les Données du Graphique - Note Moyenne par Plateforme (Graphique en barres)
-    # groupby() regroupe par plateforme, mean() calcule la moyenne
-    avg_ratings = recommender.df.groupby('platform')['rating'].mean().to_dict()
+    avg_ratings = cube.rating_means_by('platform', filters)
     
     # 5. Stats Résumées (Cartes de statistiques)
     stats = recommender.get_stats()  # Nombre total de cours, catégories, etc.
@@ -675,6 +739,13 @@ def dashboard():
                          rating_data=json.dumps(avg_ratings),
                          stats=stats)
 
+@app.route('/api/dashboard')  # API des agrégats du tableau de bord
+@login_required  # Nécessite une connexion
+def api_dashboard():
+    """API du tableau de bord : tranche du cube analytique (?category=&platform=&level=&cluster=&top=)"""
+    top = request.args.get('top', None, type=int)  # Nombre maximal de valeurs par répartition
+    return jsonify(get_analytics_cube().summary(dashboard_filters(), top=top))
+
 @app.route('/api/learning-path')  # API pour générer un parcours d'apprentissage
 @login_required  # Nécessite une connexion
 def api_learning_path():
@@ -683,10 +754,9 @@ def api_learning_path():
     if not category:  # Validation : la catégorie est-elle fournie ?
         return jsonify({'error': 'Category required', 'path': []})  # Erreur si manquante
     
-    # Génère un parcours d'apprentissage séquentiel basé sur le clustering
+    # Génère un parcours d'apprentissage séquentiel depuis le catalogue en colonnes (sans K-Means)
     # Suggère une suite logique de cours (Débutant → Intermédiaire → Avancé)
-    clustering_model = get_clustering()  # Récupère le modèle de clustering
-    path = clustering_model.get_learning_path(category)  # Génère le parcours
+    path = recommender.get_learning_path(category)  # Génère le parcours
     return jsonify({'category': category, 'path': path})  # Retourne le parcours au format JSON
 
 @app.route('/api/clusters')  # API pour récupérer les données de clustering (pas de login requis)
@@ -699,7 +769,7 @@ def api_clusters():
 @login_required  # Nécessite une connexion
 def api_save_path():
     """API de sauvegarde : enregistre un parcours d'apprentissage personnalisé pour l'utilisateur"""
-    username = get_current_user()
+    user_id = get_current_user_id()
     data = request.get_json()
     category = data.get('category')
     path_data = data.get('path')
@@ -707,9 +777,33 @@ def api_save_path():
     if not category or not path_data:
         return jsonify({'error': 'Missing data'}), 400
         
-    user_manager.save_path(username, category, path_data)
+    user_manager.save_path(user_id, category, path_data)
     return jsonify({'status': 'ok'})
 
+@app.route('/api/saved-paths')  # API des en-têtes de parcours sauvegardés (page suivante du profil)
+@login_required  # Nécessite une connexion
+def api_saved_paths():
+    """API de pagination : retourne une page d'en-têtes de parcours (sans le détail des étapes)"""
+    try:
+        before = decode_page_cursor(request.args.get('cursor'))  # Clé du dernier en-tête affiché
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    page = user_manager.get_saved_path_headers(get_current_user_id(), before=before)
+    return jsonify({
+        'paths': page['paths'],  # [{id, category, steps, total_duration, timestamp}, ...]
+        'next_cursor': encode_page_cursor(page['next'])  # None s'il n'y a plus de page
+    })
+
+@app.route('/api/saved-paths/<int:path_id>')  # API du détail d'un parcours (déplié dans le profil)
+@login_required  # Nécessite une connexion
+def api_saved_path(path_id):
+    """API de détail : décode un parcours sauvegardé uniquement lorsqu'il est affiché"""
+    path = user_manager.get_saved_path(get_current_user_id(), path_id)
+    if path is None:  # Inexistant ou appartenant à un autre utilisateur
+        return jsonify({'error': 'Path not found'}), 404
+    return jsonify(path)
+
 # === POINT D'ENTRÉE PRINCIPAL (MAIN) ===
 # Ce bloc s'exécute uniquement si le script est lancé directement (pas importé)
 if __name__ == '__main__':  # Vérifie si c'est le fichier principal
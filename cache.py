@@ -0,0 +1,65 @@
+"""
+Cache mémoire générique : expiration (TTL) + borne LRU, sûr entre threads
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Dictionnaire borné : les entrées expirent après ttl secondes, les moins récemment utilisées
+    sont évincées au-delà de max_entries"""
+
+    def __init__(self, max_entries=1000, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # clé -> (expiration monotone, valeur)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Valeur associée à key si elle est présente et non expirée, sinon default"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Mémorise value (ttl spécifique optionnel) et évince les entrées les plus anciennes"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Retire key du cache (invalidation)"""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Compteurs : entrées, succès et échecs"""
+        with self._lock:
+            return {'entries': len(self._data), 'hits': self.hits, 'misses': self.misses,
+                    'max_entries': self.max_entries, 'ttl': self.ttl}
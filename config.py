@@ -2,6 +2,8 @@
 Configuration du système de recommandation de cours
 """
 
+import os
+
 # =====================================
 # CONFIGURATION DU SCRAPING
 # =====================================
@@ -42,6 +44,13 @@ REQUEST_DELAY = 2
 RAW_DATA_PATH = 'final_data/final_data.csv'
 CLEAN_DATA_PATH = 'processed_data/final_courses_shuffled.csv'
 
+# Nettoyage en flux (python utils/data_cleaner.py --stream) : catalogues plus grands que la mémoire
+CLEAN_CHUNK_SIZE = 100000       # Lignes lues, nettoyées et écrites par morceau
+DEDUPE_MEMORY_LIMIT = 1000000   # Titres distincts gardés en mémoire avant de basculer sur disque (SQLite)
+
+# Nettoyage et feature engineering parallèles (étapes ligne par ligne réparties par tranches de lignes)
+PIPELINE_N_JOBS = 1             # Processus : 1 -> en série, -1 -> tous les cœurs
+
 # Colonnes du dataset (jeu de données)
 DATASET_COLUMNS = [
     'id',
@@ -90,3 +99,44 @@ COURSES_PER_PAGE = 12
 # Session
 SESSION_LIFETIME_DAYS = 21  # Durée de vie de la session en jours
 SECRET_KEY = 'course_recommender_secret_key_2024'
+
+# =====================================
+# CONFIGURATION DU SUIVI DES ÉVÉNEMENTS
+# =====================================
+
+# Moteur de stockage des utilisateurs : 'sqlite' (data/recommandations.db) ou 'memory' (benchmarks, tests de charge)
+STORAGE_BACKEND = 'sqlite'
+
+# Instrumentation des requêtes SQLite (latences, requêtes lentes + EXPLAIN QUERY PLAN) : /api/admin/db-profile
+DB_PROFILING = False
+DB_SLOW_QUERY_MS = 50       # Seuil de journalisation d'une requête lente
+DB_SLOW_LOG_SIZE = 100      # Nombre de requêtes lentes conservées
+# Utilisateurs autorisés à consulter les endpoints d'administration : aucun par défaut (l'inscription est ouverte,
+# un nom fixe serait pris par le premier venu). Comptes existants, séparés par des virgules : ADMIN_USERNAMES=alice,bob
+ADMIN_USERNAMES = [name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()]
+
+# Fil personnalisé de l'accueil mis en cache par utilisateur (invalidé à chaque clic ou recherche)
+HOME_FEED_CACHE_SIZE = 1000     # Utilisateurs gardés en mémoire (les moins récents sont évincés)
+HOME_FEED_CACHE_TTL = 300       # Secondes avant recalcul
+
+# Classements du tri « recommandation » de /courses, partagés par les pages suivantes (jeton dans les liens)
+RANKING_CACHE_SIZE = 500        # Classements gardés en mémoire (les moins récents sont évincés)
+RANKING_CACHE_TTL = 600         # Secondes pendant lesquelles la pagination reste stable
+
+# Cube analytique du tableau de bord (sauvegardé à côté des modèles, recalculé si le catalogue change)
+ANALYTICS_CUBE_PATH = 'models/analytics_cube.pkl'
+N_CLUSTERS = 24                 # Nombre de clusters K-Means (page clustering et tableau de bord)
+
+# Parcours enregistrés affichés par page sur le profil (pagination par clé)
+SAVED_PATHS_PAGE_SIZE = 10
+
+# Écriture différée des clics et recherches (file d'attente + thread d'arrière-plan)
+EVENT_QUEUE_ENABLED = True
+EVENT_FLUSH_SIZE = 100          # Écrire dès que N événements sont en attente
+EVENT_FLUSH_INTERVAL_MS = 500   # ... ou au plus tard après T millisecondes
+EVENT_QUEUE_MAX_DEPTH = 50000   # Au-delà, les événements les plus anciens sont abandonnés
+TRACK_BATCH_MAX_EVENTS = 200    # Taille maximale d'un lot envoyé à /api/track/batch
+
+# Rétention : les événements plus anciens sont repliés en agrégats journaliers (scripts/compact_events.py)
+EVENT_RETENTION_DAYS = 30
+EVENT_COMPACTION_BATCH = 50000  # Lignes traitées par transaction
@@ -4,22 +4,82 @@ Gère les utilisateurs et leurs comportements
 """
 
 import sqlite3
-import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 import os
 
-class Database:
-    """Classe pour gérer la base de données SQLite"""
+from storage.base import StorageBackend, SAVED_PATHS_PAGE_SIZE
+from db_profiler import QueryProfiler
+
+# Taille du cache LRU nom d'utilisateur -> user_id (appels par nom)
+USER_ID_CACHE_SIZE = 256
+
+try:
+    from config import EVENT_RETENTION_DAYS, EVENT_COMPACTION_BATCH, DB_PROFILING
+except ImportError:
+    EVENT_RETENTION_DAYS = 30
+    EVENT_COMPACTION_BATCH = 50000
+    DB_PROFILING = False
+
+SECONDS_PER_DAY = 86400
+
+def now_epoch():
+    """Horodatage courant en secondes epoch (entier)"""
+    return int(time.time())
+
+
+def iso_to_epoch(value):
+    """Convertit un horodatage ISO (ancien format) en secondes epoch"""
+    if value is None:
+        return now_epoch()
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(str(value)).timestamp())
+    except ValueError:
+        return now_epoch()
+
+
+class Database(StorageBackend):
+    """Moteur de stockage SQLite (fichier sur disque)"""
+
+    # Migrations appliquées dans l'ordre : (version, méthode, description)
+    MIGRATIONS = [
+        (1, '_migrate_epoch_timestamps', "Horodatages epoch entiers (searches, clicks, favorites)"),
+        (2, '_migrate_event_indexes', "Index composites sur les tables d'événements"),
+        (3, '_migrate_pref_counters', "Compteurs de préférences matérialisés (user_pref_counters)"),
+        (4, '_migrate_compact_clicks', "Table clicks compacte (user_id, course_id, timestamp)"),
+        (5, '_migrate_event_rollups', "Agrégats journaliers des clics et recherches anciens"),
+        (6, '_migrate_import_progress', "Suivi de progression des imports (reprise idempotente)"),
+        (7, '_migrate_saved_path_headers', "En-têtes des parcours enregistrés (étapes, durée totale)"),
+    ]
     
-    def __init__(self, db_path='data/recommandations.db'):
+    # Index des tables d'événements (supprimés puis recréés lors des imports massifs)
+    EVENT_INDEXES = {
+        'idx_searches_user_ts': 'CREATE INDEX IF NOT EXISTS idx_searches_user_ts ON searches (user_id, timestamp)',
+        'idx_clicks_user_ts': 'CREATE INDEX IF NOT EXISTS idx_clicks_user_ts ON clicks (user_id, timestamp)',
+    }
+    
+    def __init__(self, db_path='data/recommandations.db', profiling=DB_PROFILING):
         """Initialise la connexion à la base de données"""
         self.db_path = db_path
+        # Instrumentation optionnelle : latences par instruction, requêtes lentes, parcours complets
+        self.profiler = QueryProfiler() if profiling else None
+        self._user_id_cache = OrderedDict()  # Cache LRU username -> user_id
+        self._user_id_lock = threading.Lock()
+        self.course_lookup = None  # Table course_id -> attributs codés (fournie par le catalogue)
+        self._vacuum_after_migrate = False
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.init_database()
     
     def get_connection(self):
         """Crée une connexion à la base de données"""
-        conn = sqlite3.connect(self.db_path)
+        if self.profiler is not None:
+            conn = self.profiler.connect(self.db_path)
+        else:
+            conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -92,10 +152,275 @@ class Database:
         
         conn.commit()
         conn.close()
+
+        self.migrate()
+
+    def get_schema_version(self):
+        """Retourne la version du schéma de la base"""
+        conn = self.get_connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        conn.close()
+        return version
+
+    def migrate(self):
+        """Applique les migrations manquantes, chacune dans sa propre transaction"""
+        conn = self.get_connection()
+        conn.isolation_level = None  # Transactions explicites (le DDL doit y être inclus)
+        conn.create_function('iso_to_epoch', 1, iso_to_epoch, deterministic=True)
+        cursor = conn.cursor()
+
+        try:
+            current = cursor.execute('PRAGMA user_version').fetchone()[0]
+            for version, method, description in self.MIGRATIONS:
+                if version <= current:
+                    continue
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    getattr(self, method)(cursor)
+                    cursor.execute(f'PRAGMA user_version = {int(version)}')
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+                print(f"🗄️ Migration {version} appliquée : {description}")
+            if self._vacuum_after_migrate:
+                # Récupère l'espace libéré par les reconstructions de tables (hors transaction)
+                cursor.execute('VACUUM')
+                self._vacuum_after_migrate = False
+        finally:
+            conn.close()
+
+    def _rebuild_table(self, cursor, table, create_sql, columns, select_exprs):
+        """Reconstruit une table (SQLite ne permet pas de changer le type d'une colonne)"""
+        cursor.execute(f'DROP TABLE IF EXISTS {table}_new')
+        cursor.execute(create_sql.format(table=f'{table}_new'))
+        cursor.execute(f'''
+            INSERT INTO {table}_new ({', '.join(columns)})
+            SELECT {', '.join(select_exprs)} FROM {table}
+        ''')
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+
+    def _migrate_epoch_timestamps(self, cursor):
+        """Migration 1 : timestamp TEXT ISO -> INTEGER epoch"""
+        self._rebuild_table(cursor, 'searches', '''
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        ''', ['id', 'user_id', 'query', 'timestamp'],
+            ['id', 'user_id', 'query', 'iso_to_epoch(timestamp)'])
+
+        self._rebuild_table(cursor, 'clicks', '''
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                course_title TEXT,
+                category TEXT,
+                level TEXT,
+                platform TEXT,
+                timestamp INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        ''', ['id', 'user_id', 'course_id', 'course_title', 'category', 'level', 'platform', 'timestamp'],
+            ['id', 'user_id', 'course_id', 'course_title', 'category', 'level', 'platform', 'iso_to_epoch(timestamp)'])
+
+        self._rebuild_table(cursor, 'favorites', '''
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(id),
+                UNIQUE(user_id, course_id)
+            )
+        ''', ['id', 'user_id', 'course_id', 'timestamp'],
+            ['id', 'user_id', 'course_id', 'iso_to_epoch(timestamp)'])
+
+    def _migrate_event_indexes(self, cursor):
+        """Migration 2 : index composites pour les requêtes par utilisateur"""
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_searches_user_ts ON searches (user_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_clicks_user_ts ON clicks (user_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_clicks_user_category ON clicks (user_id, category)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_user_ts ON favorites (user_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_saved_paths_user_ts ON saved_paths (user_id, timestamp)')
+
+    def _migrate_pref_counters(self, cursor):
+        """Migration 3 : table des compteurs de préférences, remplie depuis l'historique"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_pref_counters (
+                user_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, dimension, value)
+            ) WITHOUT ROWID
+        ''')
+        # Les colonnes texte de clicks existent encore à ce stade (supprimées par la migration 4)
+        for dimension, column in self.PREF_DIMENSIONS.items():
+            cursor.execute(f'''
+                INSERT INTO user_pref_counters (user_id, dimension, value, count)
+                SELECT user_id, ?, {column}, COUNT(*)
+                FROM clicks
+                WHERE {column} IS NOT NULL
+                GROUP BY user_id, {column}
+            ''', (dimension,))
+    
+    def _migrate_compact_clicks(self, cursor):
+        """Migration 4 : clicks ne garde que (user_id, course_id, timestamp)"""
+        # Titre, catégorie, niveau et plateforme sont retrouvés via le catalogue (course_lookup)
+        cursor.execute('DROP INDEX IF EXISTS idx_clicks_user_category')
+        self._rebuild_table(cursor, 'clicks', '''
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        ''', ['id', 'user_id', 'course_id', 'timestamp'],
+            ['id', 'user_id', 'course_id', 'timestamp'])
+        cursor.execute(self.EVENT_INDEXES['idx_clicks_user_ts'])
+        self._vacuum_after_migrate = True
+    
+    def _migrate_event_rollups(self, cursor):
+        """Migration 5 : agrégats journaliers (user_id, cours/requête, jour, nombre)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS click_rollups (
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                day INTEGER NOT NULL, -- jour epoch (timestamp // 86400)
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, course_id, day)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS search_rollups (
+                user_id INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                last_seen INTEGER NOT NULL, -- dernier horodatage du jour (ordre des recherches récentes)
+                PRIMARY KEY (user_id, query, day)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_rollups_user_ts ON search_rollups (user_id, last_seen)')
+    
+    def _migrate_import_progress(self, cursor):
+        """Migration 6 : position atteinte par source et par utilisateur lors des imports"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS import_progress (
+                source TEXT NOT NULL,
+                username TEXT NOT NULL,
+                searches_done INTEGER NOT NULL DEFAULT 0,
+                clicks_done INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, username)
+            )
+        ''')
     
-    def hash_password(self, password):
-        """Hash un mot de passe avec SHA256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def _migrate_saved_path_headers(self, cursor):
+        """Migration 7 : colonnes d'en-tête des parcours (évite de décoder path_data pour la liste)"""
+        cursor.execute('ALTER TABLE saved_paths ADD COLUMN steps INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('ALTER TABLE saved_paths ADD COLUMN total_duration REAL NOT NULL DEFAULT 0')
+        cursor.execute('SELECT id, path_data FROM saved_paths')
+        headers = []
+        for row in cursor.fetchall():
+            steps, total_duration = self.path_header(self._decode_saved_path(row)['path_data'])
+            headers.append((steps, total_duration, row['id']))
+        cursor.executemany('UPDATE saved_paths SET steps = ?, total_duration = ? WHERE id = ?', headers)
+    
+    def drop_event_indexes(self, conn):
+        """Supprime les index des tables d'événements (avant un chargement massif)"""
+        for name in self.EVENT_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.commit()
+    
+    def create_event_indexes(self, conn):
+        """(Re)crée les index des tables d'événements"""
+        for sql in self.EVENT_INDEXES.values():
+            conn.execute(sql)
+        conn.commit()
+    
+    def _aggregate_click_preferences(self, cursor, user_id=None):
+        """Agrège les clics par cours puis projette via course_lookup : {user_id: préférences}"""
+        if self.course_lookup is None:
+            raise RuntimeError("course_lookup requis : appeler set_course_lookup() avec le catalogue chargé")
+        where = 'WHERE user_id = ?' if user_id is not None else ''
+        params = (user_id,) if user_id is not None else ()
+        # Clics bruts récents + agrégats journaliers des clics compactés
+        cursor.execute(f'''
+            SELECT user_id, course_id, SUM(count) AS count FROM (
+                SELECT user_id, course_id, COUNT(*) AS count
+                FROM clicks {where} GROUP BY user_id, course_id
+                UNION ALL
+                SELECT user_id, course_id, SUM(count)
+                FROM click_rollups {where} GROUP BY user_id, course_id
+            )
+            GROUP BY user_id, course_id
+            ORDER BY user_id
+        ''', params * 2)
+        
+        per_user = {}
+        for row in cursor.fetchall():
+            ids, counts = per_user.setdefault(row['user_id'], ([], []))
+            ids.append(row['course_id'])
+            counts.append(row['count'])
+        return {uid: self.course_lookup.aggregate(ids, counts) for uid, (ids, counts) in per_user.items()}
+    
+    def _rebuild_pref_counters(self, cursor, user_id=None):
+        """Recalcule les compteurs de préférences depuis la table clicks"""
+        aggregated = self._aggregate_click_preferences(cursor, user_id)
+        where = 'WHERE user_id = ?' if user_id is not None else ''
+        params = (user_id,) if user_id is not None else ()
+        cursor.execute(f'DELETE FROM user_pref_counters {where}', params)
+        cursor.executemany('''
+            INSERT INTO user_pref_counters (user_id, dimension, value, count)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            (uid, dimension, value, count)
+            for uid, prefs in aggregated.items()
+            for dimension, values in prefs.items()
+            for value, count in values.items()
+        ])
+    
+    def rebuild_pref_counters(self, user=None):
+        """Reconstruit les compteurs de préférences (tous les utilisateurs ou un seul)
+        
+        Retourne le nombre de lignes de compteurs, ou None sans rien modifier si user est inconnu
+        (un nom mal saisi ne doit pas basculer sur la reconstruction de tous les utilisateurs).
+        """
+        user_id = None
+        if user is not None:
+            user_id = self.resolve_user_id(user)
+            if not user_id:
+                return None
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        self._rebuild_pref_counters(cursor, user_id)
+        conn.commit()
+        cursor.execute('SELECT COUNT(*) AS count FROM user_pref_counters')
+        count = cursor.fetchone()['count']
+        conn.close()
+        return count
+    
+    def _increment_pref_counters(self, cursor, clicks):
+        """Incrémente les compteurs de préférences pour une liste de (user_id, course) cliqués"""
+        rows = []
+        for user_id, course in clicks:
+            for dimension, key in self.PREF_DIMENSIONS.items():
+                value = course.get(key)
+                if isinstance(value, str) and value:
+                    rows.append((user_id, dimension, value))
+        cursor.executemany('''
+            INSERT INTO user_pref_counters (user_id, dimension, value, count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = count + 1
+        ''', rows)
     
     def register_user(self, username, email, password):
         """Enregistre un nouvel utilisateur"""
@@ -136,6 +461,7 @@ class Database:
             ''', (datetime.now().isoformat(), user['id']))
             conn.commit()
             conn.close()
+            self._cache_user_id(username, user['id'])
             return True, "Connexion réussie"
         
         conn.close()
@@ -158,14 +484,31 @@ class Database:
             return dict(user)
         return None
     
-    def get_user_id(self, username):
-        """Récupère l'ID d'un utilisateur"""
-        user = self.get_user(username)
-        return user['id'] if user else None
+    def _cache_user_id(self, username, user_id):
+        """Mémorise l'ID d'un utilisateur dans le cache LRU"""
+        with self._user_id_lock:
+            self._user_id_cache[username] = user_id
+            self._user_id_cache.move_to_end(username)
+            while len(self._user_id_cache) > USER_ID_CACHE_SIZE:
+                self._user_id_cache.popitem(last=False)
+    
+    def resolve_user_id(self, user):
+        """Accepte un user_id (int) ou un nom d'utilisateur (résolu une seule fois via le cache LRU)"""
+        if user is None or isinstance(user, int):
+            return user
+        with self._user_id_lock:
+            user_id = self._user_id_cache.get(user)
+            if user_id is not None:
+                self._user_id_cache.move_to_end(user)
+                return user_id
+        user_id = self.get_user_id(user)
+        if user_id:
+            self._cache_user_id(user, user_id)
+        return user_id
     
-    def add_search(self, username, query):
+    def add_search(self, user, query):
         """Enregistre une recherche"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return
         
@@ -175,14 +518,14 @@ class Database:
         cursor.execute('''
             INSERT INTO searches (user_id, query, timestamp)
             VALUES (?, ?, ?)
-        ''', (user_id, query, datetime.now().isoformat()))
+        ''', (user_id, query, now_epoch()))
         
         conn.commit()
         conn.close()
     
-    def add_click(self, username, course):
+    def add_click(self, user, course):
         """Enregistre un clic sur un cours"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return
         
@@ -190,126 +533,128 @@ class Database:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO clicks (user_id, course_id, course_title, category, level, platform, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user_id,
-            course.get('course_id'),
-            course.get('title'),
-            course.get('category'),
-            course.get('level'),
-            course.get('platform'),
-            datetime.now().isoformat()
-        ))
+            INSERT INTO clicks (user_id, course_id, timestamp)
+            VALUES (?, ?, ?)
+        ''', (user_id, course.get('course_id'), now_epoch()))
+        # Mise à jour des compteurs dans la même transaction que le clic
+        self._increment_pref_counters(cursor, [(user_id, course)])
         
         conn.commit()
         conn.close()
     
-    def get_recent_searches(self, username, limit=10):
-        """Récupère les recherches récentes d'un utilisateur"""
-        user_id = self.get_user_id(username)
-        if not user_id:
-            return []
+    def add_events_batch(self, clicks=(), searches=()):
+        """Enregistre un lot de clics et de recherches dans une seule transaction
+        
+        clicks : liste de (user_id, course, timestamp) ; searches : liste de (user_id, query, timestamp)
+        """
+        if not clicks and not searches:
+            return
         
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT query FROM searches
-            WHERE user_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (user_id, limit))
-        
-        searches = [row['query'] for row in cursor.fetchall()]
-        conn.close()
-        return searches
+        try:
+            cursor.executemany('''
+                INSERT INTO searches (user_id, query, timestamp)
+                VALUES (?, ?, ?)
+            ''', [(user_id, query, ts) for user_id, query, ts in searches])
+            
+            cursor.executemany('''
+                INSERT INTO clicks (user_id, course_id, timestamp)
+                VALUES (?, ?, ?)
+            ''', [(user_id, course.get('course_id'), ts) for user_id, course, ts in clicks])
+            
+            self._increment_pref_counters(cursor, [(user_id, course) for user_id, course, ts in clicks])
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
     
-    def get_user_preferences(self, username):
-        """Calcule les préférences d'un utilisateur basées sur ses clics"""
-        user_id = self.get_user_id(username)
+    def get_recent_searches(self, user, limit=10):
+        """Récupère les recherches récentes d'un utilisateur"""
+        user_id = self.resolve_user_id(user)
         if not user_id:
-            return {'categories': {}, 'levels': {}, 'platforms': {}}
+            return []
         
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Compte les catégories
+        searches = self._query_recent_searches(conn.cursor(), user_id, limit)
+        conn.close()
+        return searches
+    
+    def _query_recent_searches(self, cursor, user_id, limit):
+        """Recherches récentes : table brute puis agrégats journaliers (une ligne par requête et par jour)"""
         cursor.execute('''
-            SELECT category, COUNT(*) as count
-            FROM clicks
-            WHERE user_id = ? AND category IS NOT NULL
-            GROUP BY category
-            ORDER BY count DESC
-        ''', (user_id,))
-        categories = {row['category']: row['count'] for row in cursor.fetchall()}
-        
-        # Compte les niveaux
+            SELECT query FROM (
+                SELECT query, timestamp, id FROM searches WHERE user_id = :uid
+                UNION ALL
+                SELECT query, last_seen, 0 FROM search_rollups WHERE user_id = :uid
+            )
+            ORDER BY timestamp DESC, id DESC
+            LIMIT :limit
+        ''', {'uid': user_id, 'limit': limit})
+        return [row['query'] for row in cursor.fetchall()]
+    
+    def _query_activity_counts(self, cursor, user_id):
+        """Compteurs d'activité (événements bruts + agrégats compactés) en une seule requête"""
         cursor.execute('''
-            SELECT level, COUNT(*) as count
-            FROM clicks
-            WHERE user_id = ? AND level IS NOT NULL
-            GROUP BY level
-            ORDER BY count DESC
-        ''', (user_id,))
-        levels = {row['level']: row['count'] for row in cursor.fetchall()}
-        
-        # Compte les plateformes
+            SELECT
+                (SELECT COUNT(*) FROM searches WHERE user_id = :uid)
+                  + (SELECT IFNULL(SUM(count), 0) FROM search_rollups WHERE user_id = :uid) AS total_searches,
+                (SELECT COUNT(*) FROM clicks WHERE user_id = :uid)
+                  + (SELECT IFNULL(SUM(count), 0) FROM click_rollups WHERE user_id = :uid) AS total_clicks,
+                (SELECT COUNT(*) FROM favorites WHERE user_id = :uid) AS total_favorites
+        ''', {'uid': user_id})
+        return dict(cursor.fetchone())
+    
+    def _query_preferences(self, cursor, user_id):
+        """Lit les compteurs de préférences (O(nombre de valeurs distinctes), pas O(clics))"""
         cursor.execute('''
-            SELECT platform, COUNT(*) as count
-            FROM clicks
-            WHERE user_id = ? AND platform IS NOT NULL
-            GROUP BY platform
+            SELECT dimension, value, count
+            FROM user_pref_counters
+            WHERE user_id = ? AND count > 0
             ORDER BY count DESC
         ''', (user_id,))
-        platforms = {row['platform']: row['count'] for row in cursor.fetchall()}
-        
-        conn.close()
         
-        return {
-            'categories': categories,
-            'levels': levels,
-            'platforms': platforms
-        }
+        prefs = {'categories': {}, 'levels': {}, 'platforms': {}}
+        for row in cursor.fetchall():
+            prefs[row['dimension']][row['value']] = row['count']
+        return prefs
     
-    def get_top_categories(self, username, limit=5):
-        """Récupère les catégories préférées d'un utilisateur"""
-        prefs = self.get_user_preferences(username)
-        categories = prefs['categories']
-        sorted_cats = sorted(categories.items(), key=lambda x: x[1], reverse=True)
-        return [cat[0] for cat in sorted_cats[:limit]]
+    def get_user_preferences(self, user):
+        """Calcule les préférences d'un utilisateur basées sur ses clics"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return {'categories': {}, 'levels': {}, 'platforms': {}}
+        
+        conn = self.get_connection()
+        prefs = self._query_preferences(conn.cursor(), user_id)
+        conn.close()
+        return prefs
     
-    def get_user_stats(self, username):
+    def get_user_stats(self, user):
         """Récupère les statistiques d'un utilisateur"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return {}
         
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) as count FROM searches WHERE user_id = ?', (user_id,))
-        total_searches = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM clicks WHERE user_id = ?', (user_id,))
-        total_clicks = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM favorites WHERE user_id = ?', (user_id,))
-        total_favorites = cursor.fetchone()['count']
-        
+        counts = self._query_activity_counts(conn.cursor(), user_id)
         conn.close()
         
         return {
-            'total_searches': total_searches,
-            'total_clicks': total_clicks,
-            'total_favorites': total_favorites,
-            'top_categories': self.get_top_categories(username, 3),
-            'recent_searches': self.get_recent_searches(username, 5)
+            'total_searches': counts['total_searches'],
+            'total_clicks': counts['total_clicks'],
+            'total_favorites': counts['total_favorites'],
+            'top_categories': self.get_top_categories(user_id, 3),
+            'recent_searches': self.get_recent_searches(user_id, 5)
         }
     
-    def add_favorite(self, username, course_id):
+    def add_favorite(self, user, course_id):
         """Ajoute un cours aux favoris"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return False
             
@@ -319,7 +664,7 @@ class Database:
             cursor.execute('''
                 INSERT INTO favorites (user_id, course_id, timestamp)
                 VALUES (?, ?, ?)
-            ''', (user_id, course_id, datetime.now().isoformat()))
+            ''', (user_id, course_id, now_epoch()))
             conn.commit()
             return True
         except sqlite3.IntegrityError:
@@ -327,9 +672,9 @@ class Database:
         finally:
             conn.close()
             
-    def remove_favorite(self, username, course_id):
+    def remove_favorite(self, user, course_id):
         """Supprime un cours des favoris"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return False
             
@@ -343,9 +688,9 @@ class Database:
         conn.close()
         return success
         
-    def get_favorites(self, username):
+    def get_favorites(self, user):
         """Récupère la liste des IDs des cours favoris"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return []
             
@@ -357,9 +702,9 @@ class Database:
         conn.close()
         return favs
 
-    def add_saved_path(self, username, category, path_data):
-        """Enregistre un parcours pour l'utilisateur"""
-        user_id = self.get_user_id(username)
+    def add_saved_path(self, user, category, path_data):
+        """Enregistre un parcours pour l'utilisateur (avec son en-tête : étapes, durée totale)"""
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return False
             
@@ -368,19 +713,20 @@ class Database:
         
         # Vérifier si on a déjà un parcours pour cette catégorie récemment (optionnel, ici on autorise tout)
         import json
+        steps, total_duration = self.path_header(path_data)
         
         cursor.execute('''
-            INSERT INTO saved_paths (user_id, category, path_data, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, category, json.dumps(path_data), datetime.now().isoformat()))
+            INSERT INTO saved_paths (user_id, category, path_data, timestamp, steps, total_duration)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, category, json.dumps(path_data), datetime.now().isoformat(), steps, total_duration))
         
         conn.commit()
         conn.close()
         return True
 
-    def get_saved_paths(self, username):
+    def get_saved_paths(self, user):
         """Récupère les parcours enregistrés de l'utilisateur"""
-        user_id = self.get_user_id(username)
+        user_id = self.resolve_user_id(user)
         if not user_id:
             return []
             
@@ -390,22 +736,175 @@ class Database:
         cursor.execute('''
             SELECT * FROM saved_paths 
             WHERE user_id = ? 
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
         ''', (user_id,))
         
-        paths = []
-        import json
-        for row in cursor.fetchall():
-            path = dict(row)
-            try:
-                path['path_data'] = json.loads(path['path_data'])
-            except:
-                path['path_data'] = []
-            paths.append(path)
+        paths = [self._decode_saved_path(row) for row in cursor.fetchall()]
             
         conn.close()
         return paths
+    
+    def _query_saved_path_headers(self, cursor, user_id, limit, before=None):
+        """Page d'en-têtes par clé (timestamp, id) : parcours de l'index, path_data n'est pas lu"""
+        keyset = 'AND (timestamp, id) < (:ts, :id)' if before else ''
+        cursor.execute(f'''
+            SELECT id, category, steps, total_duration, timestamp
+            FROM saved_paths
+            WHERE user_id = :uid {keyset}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT :limit
+        ''', {'uid': user_id, 'ts': before[0] if before else None,
+              'id': before[1] if before else None, 'limit': limit + 1})
+        paths = [dict(row) for row in cursor.fetchall()]
+        # Une ligne de plus que demandé : indique s'il existe une page suivante
+        has_more = len(paths) > limit
+        paths = paths[:limit]
+        next_key = (paths[-1]['timestamp'], paths[-1]['id']) if has_more else None
+        return {'paths': paths, 'next': next_key}
+    
+    def get_saved_path_headers(self, user, limit=SAVED_PATHS_PAGE_SIZE, before=None):
+        """Récupère une page d'en-têtes de parcours (sans décoder path_data)"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return {'paths': [], 'next': None}
+        
+        conn = self.get_connection()
+        page = self._query_saved_path_headers(conn.cursor(), user_id, limit, before)
+        conn.close()
+        return page
+    
+    def get_saved_path(self, user, path_id):
+        """Récupère et décode un parcours de l'utilisateur"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return None
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM saved_paths WHERE id = ? AND user_id = ?', (path_id, user_id))
+        row = cursor.fetchone()
+        conn.close()
+        return self._decode_saved_path(row) if row else None
+    
+    def _decode_saved_path(self, row):
+        """Convertit une ligne de saved_paths en dictionnaire (JSON décodé)"""
+        import json
+        path = dict(row)
+        try:
+            path['path_data'] = json.loads(path['path_data'])
+        except:
+            path['path_data'] = []
+        return path
+    
+    def get_profile_snapshot(self, user, recent_limit=10):
+        """Récupère tout le profil d'un utilisateur en une seule transaction (une connexion)"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return None
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        # Transaction de lecture : toutes les requêtes voient le même état de la base
+        cursor.execute('BEGIN')
+        
+        cursor.execute('''
+            SELECT id, username, email, created_at, last_login
+            FROM users WHERE id = ?
+        ''', (user_id,))
+        user_row = cursor.fetchone()
+        if not user_row:
+            conn.close()
+            return None
+        
+        # Compteurs d'activité combinés en une seule requête
+        counts = self._query_activity_counts(cursor, user_id)
+        preferences = self._query_preferences(cursor, user_id)
+        recent_searches = self._query_recent_searches(cursor, user_id, recent_limit)
+        
+        cursor.execute('SELECT course_id FROM favorites WHERE user_id = ?', (user_id,))
+        favorites = [row['course_id'] for row in cursor.fetchall()]
+        
+        # En-têtes seulement : les parcours sont décodés à la demande (/api/saved-paths/<id>)
+        saved_paths = self._query_saved_path_headers(cursor, user_id, SAVED_PATHS_PAGE_SIZE)
+        
+        conn.commit()
+        conn.close()
+        
+        # Même structure que get_user_stats, sans requêtes supplémentaires
+        sorted_cats = sorted(preferences['categories'].items(), key=lambda x: x[1], reverse=True)
+        stats = dict(counts)
+        stats['top_categories'] = [cat[0] for cat in sorted_cats[:3]]
+        stats['recent_searches'] = recent_searches[:5]
+        
+        return {
+            'user': dict(user_row),
+            'stats': stats,
+            'preferences': preferences,
+            'recent_searches': recent_searches,
+            'favorites': favorites,
+            'saved_paths': saved_paths['paths'],
+            'saved_paths_next': saved_paths['next']
+        }
 
+    def compact_events(self, retention_days=EVENT_RETENTION_DAYS, batch_size=EVENT_COMPACTION_BATCH):
+        """Replie les clics/recherches plus anciens que retention_days en agrégats journaliers
+        
+        Les lignes brutes sont agrégées puis supprimées par lots (une transaction par lot,
+        parcours par plage d'id) pour ne pas bloquer les écritures. Retourne {table: lignes compactées}.
+        """
+        cutoff = now_epoch() - int(retention_days) * SECONDS_PER_DAY
+        # (table brute, table d'agrégats, clé, colonnes supplémentaires : (colonne, expression, mise à jour))
+        targets = [
+            ('clicks', 'click_rollups', 'course_id', []),
+            ('searches', 'search_rollups', 'query',
+             [('last_seen', 'MAX(timestamp)', 'MAX(last_seen, excluded.last_seen)')]),
+        ]
+        compacted = {}
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            for table, rollup_table, key, extra in targets:
+                compacted[table] = 0
+                last_id = 0
+                while True:
+                    cursor.execute(f'''
+                        SELECT MAX(id) AS hi, COUNT(*) AS n FROM (
+                            SELECT id FROM {table}
+                            WHERE id > ? AND timestamp < ?
+                            ORDER BY id LIMIT ?
+                        )
+                    ''', (last_id, cutoff, batch_size))
+                    batch = cursor.fetchone()
+                    if not batch['n']:
+                        break
+                    bounds = {'lo': last_id, 'hi': batch['hi'], 'cutoff': cutoff}
+                    extra_cols = ''.join(f', {col}' for col, _, _ in extra)
+                    extra_exprs = ''.join(f', {expr}' for _, expr, _ in extra)
+                    extra_updates = ''.join(f', {col} = {update}' for col, _, update in extra)
+                    cursor.execute(f'''
+                        INSERT INTO {rollup_table} (user_id, {key}, day, count{extra_cols})
+                        SELECT user_id, {key}, timestamp / {SECONDS_PER_DAY}, COUNT(*){extra_exprs}
+                        FROM {table}
+                        WHERE id > :lo AND id <= :hi AND timestamp < :cutoff
+                        GROUP BY user_id, {key}, timestamp / {SECONDS_PER_DAY}
+                        ON CONFLICT (user_id, {key}, day) DO UPDATE SET count = count + excluded.count{extra_updates}
+                    ''', bounds)
+                    cursor.execute(f'''
+                        DELETE FROM {table}
+                        WHERE id > :lo AND id <= :hi AND timestamp < :cutoff
+                    ''', bounds)
+                    conn.commit()
+                    compacted[table] += batch['n']
+                    last_id = batch['hi']
+        finally:
+            conn.close()
+        return compacted
+    
+    def get_query_profile(self, top=20):
+        """Résumé de l'instrumentation des requêtes (None si elle est désactivée)"""
+        return self.profiler.summary(top) if self.profiler is not None else None
+    
     def get_total_users(self):
         """Récupère le nombre total d'utilisateurs"""
         conn = self.get_connection()
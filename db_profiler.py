@@ -0,0 +1,238 @@
+"""
+Instrumentation optionnelle des requêtes SQLite
+Mesure la latence de chaque instruction (histogrammes), journalise les requêtes lentes avec leur
+plan d'exécution (EXPLAIN QUERY PLAN) et signale les parcours complets des tables d'événements
+
+Le temps mesuré comprend l'exécution (execute/executemany) et la lecture des lignes (fetch*) ;
+un gestionnaire de progression compte les instructions de la machine virtuelle SQLite.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+try:
+    from config import DB_SLOW_QUERY_MS, DB_SLOW_LOG_SIZE
+except ImportError:
+    DB_SLOW_QUERY_MS = 50
+    DB_SLOW_LOG_SIZE = 100
+
+# Bornes supérieures des classes de l'histogramme (millisecondes)
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, float('inf'))
+
+# Tables qui grossissent avec l'activité : un SCAN sans index y est signalé
+EVENT_TABLES = ('searches', 'clicks', 'favorites', 'saved_paths', 'click_rollups', 'search_rollups',
+                'user_pref_counters')
+
+# Le gestionnaire de progression est appelé toutes les N instructions de la machine virtuelle
+PROGRESS_STEP = 1000
+
+# Seules ces instructions ont un plan d'exécution utile
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_WHITESPACE = re.compile(r'\s+')
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+
+
+def normalize_sql(sql):
+    """Une instruction sur une seule ligne (clé des statistiques)"""
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryProfiler:
+    """Statistiques de latence par instruction, partagées par toutes les connexions (thread-safe)"""
+
+    def __init__(self, slow_query_ms=DB_SLOW_QUERY_MS, slow_log_size=DB_SLOW_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats = {}  # sql normalisé -> compteurs
+        self._plans = {}  # sql normalisé -> lignes EXPLAIN QUERY PLAN (une seule fois par instruction)
+        self._scans = {}  # sql normalisé -> tables d'événements parcourues entièrement
+        self._slow = deque(maxlen=slow_log_size)
+        self.started_at = time.time()
+
+    def connect(self, db_path):
+        """Ouvre une connexion instrumentée"""
+        conn = sqlite3.connect(db_path, factory=ProfiledConnection)
+        conn.profiler = self
+        conn.set_progress_handler(conn._count_vm_steps, PROGRESS_STEP)
+        return conn
+
+    def _explain(self, conn, sql, params):
+        """Plan d'exécution d'une instruction (curseur brut : non mesuré lui-même)"""
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return []
+        try:
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+        except sqlite3.Error:
+            return []
+
+    def _full_scans(self, plan):
+        """Tables d'événements parcourues sans index ('SCAN clicks', pas 'SCAN clicks USING INDEX')"""
+        tables = []
+        for detail in plan:
+            match = _SCAN.match(detail)
+            if match and match.group(1) in EVENT_TABLES and 'INDEX' not in match.group(2):
+                tables.append(match.group(1))
+        return tables
+
+    def _new_stats(self):
+        return {
+            'count': 0, 'total_ms': 0.0, 'fetch_ms': 0.0, 'max_ms': 0.0, 'vm_steps': 0,
+            'histogram': [0] * len(LATENCY_BUCKETS_MS),
+        }
+
+    def record_fetch(self, conn, sql, params, elapsed_ms, vm_steps):
+        """Ajoute le temps de lecture des lignes à la dernière exécution de l'instruction"""
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._stats.setdefault(key, self._new_stats())
+            stats['total_ms'] += elapsed_ms
+            stats['fetch_ms'] += elapsed_ms
+            stats['vm_steps'] += vm_steps
+        if elapsed_ms >= self.slow_query_ms:
+            self._log_slow(conn, key, sql, params, elapsed_ms, 'fetch')
+
+    def _log_slow(self, conn, key, sql, params, elapsed_ms, phase):
+        plan = self._explain(conn, sql, params)
+        with self._lock:
+            self._slow.append({
+                'sql': key,
+                'ms': round(elapsed_ms, 3),
+                'phase': phase,
+                'plan': plan,
+                'at': time.time(),
+            })
+        print(f"🐢 Requête lente ({elapsed_ms:.1f} ms, {phase}) : {key[:120]}")
+
+    def record(self, conn, sql, params, elapsed_ms, vm_steps=0):
+        """Enregistre une exécution ; calcule le plan à la première occurrence ou si elle est lente"""
+        key = normalize_sql(sql)
+        slow = elapsed_ms >= self.slow_query_ms
+        with self._lock:
+            known_plan = key in self._plans
+        plan = self._explain(conn, sql, params) if not known_plan else None
+
+        with self._lock:
+            stats = self._stats.setdefault(key, self._new_stats())
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['vm_steps'] += vm_steps
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    stats['histogram'][i] += 1
+                    break
+
+            if plan is not None and not known_plan:
+                self._plans[key] = plan
+                scans = self._full_scans(plan)
+                if scans:
+                    self._scans[key] = scans
+                    print(f"⚠️ Parcours complet de {', '.join(scans)} : {key[:120]}")
+        if slow:
+            self._log_slow(conn, key, sql, params, elapsed_ms, 'execute')
+
+    def summary(self, top=20):
+        """Résumé : instructions les plus coûteuses, requêtes lentes récentes, parcours complets"""
+        with self._lock:
+            statements = [
+                {
+                    'sql': sql,
+                    'count': s['count'],
+                    'total_ms': round(s['total_ms'], 3),
+                    'avg_ms': round(s['total_ms'] / s['count'], 3) if s['count'] else 0.0,
+                    'max_ms': round(s['max_ms'], 3),
+                    'fetch_ms': round(s['fetch_ms'], 3),
+                    'vm_steps': s['vm_steps'] * PROGRESS_STEP,  # Approximation (par paquets de PROGRESS_STEP)
+                    'histogram': dict(zip([str(b) for b in LATENCY_BUCKETS_MS], s['histogram'])),
+                    'plan': self._plans.get(sql, []),
+                    'full_scans': self._scans.get(sql, []),
+                }
+                for sql, s in self._stats.items()
+            ]
+            slow = list(self._slow)
+            scans = [{'sql': sql, 'tables': tables} for sql, tables in self._scans.items()]
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        return {
+            'since': self.started_at,
+            'slow_query_ms': self.slow_query_ms,
+            'statements': statements[:top],
+            'distinct_statements': len(statements),
+            'total_queries': sum(s['count'] for s in statements),
+            'slow_queries': slow[::-1],
+            'full_scans': scans,
+        }
+
+    def reset(self):
+        """Remet les statistiques à zéro"""
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+            self._scans.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Curseur dont execute/executemany et la lecture des lignes sont chronométrés"""
+
+    _profiled = None  # (sql, paramètres) de la dernière instruction exécutée
+
+    def _measure(self, method, *args):
+        conn = self.connection
+        steps = conn.vm_steps
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            vm_steps = conn.vm_steps - steps
+            if method.__name__.startswith('fetch'):
+                if self._profiled is not None:
+                    conn.profiler.record_fetch(conn, *self._profiled, elapsed_ms, vm_steps)
+            else:
+                conn.profiler.record(conn, *self._profiled, elapsed_ms, vm_steps)
+
+    def execute(self, sql, parameters=()):
+        self._profiled = (sql, parameters)
+        return self._measure(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        # Plan calculé avec le premier jeu de paramètres
+        self._profiled = (sql, seq_of_parameters[0] if seq_of_parameters else ())
+        return self._measure(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._measure(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._measure(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._measure(super().fetchall)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connexion dont tous les curseurs (y compris conn.execute) sont instrumentés"""
+
+    profiler = None
+    vm_steps = 0  # Appels du gestionnaire de progression (1 appel = PROGRESS_STEP instructions)
+
+    def _count_vm_steps(self):
+        self.vm_steps += 1
+        return 0  # 0 = continuer l'exécution
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
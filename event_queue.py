@@ -0,0 +1,140 @@
+"""
+File d'attente d'ingestion des événements (clics et recherches)
+Les événements sont mis en mémoire puis écrits par lots par un thread d'arrière-plan
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+
+from database import now_epoch
+
+try:
+    from config import EVENT_FLUSH_SIZE, EVENT_FLUSH_INTERVAL_MS, EVENT_QUEUE_MAX_DEPTH
+except ImportError:
+    EVENT_FLUSH_SIZE = 100
+    EVENT_FLUSH_INTERVAL_MS = 500
+    EVENT_QUEUE_MAX_DEPTH = 50000
+
+
+class EventQueue:
+    """Tampon d'événements vidé avec executemany dans une seule transaction"""
+
+    def __init__(self, db, flush_size=EVENT_FLUSH_SIZE, flush_interval_ms=EVENT_FLUSH_INTERVAL_MS,
+                 max_depth=EVENT_QUEUE_MAX_DEPTH, on_flush=None):
+        self.db = db
+        self.on_flush = on_flush  # Appelé avec l'ensemble des user_id écrits après chaque lot
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._events = deque(maxlen=max_depth)  # Les plus anciens sont abandonnés si la file déborde
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # Un seul lot écrit à la fois
+        self._thread = None
+        self._stopping = False
+        self.flushed_count = 0
+        self.dropped_count = 0  # Événements abandonnés faute de place (file pleine)
+        self._dropped_unreported = 0  # Abandons pas encore signalés dans la console
+        atexit.register(self.shutdown)
+
+    def start(self):
+        """Démarre le thread d'écriture (appelé automatiquement au premier événement)"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='event-queue', daemon=True)
+                self._thread.start()
+        return self
+
+    def put_click(self, user_id, course, timestamp=None):
+        """Ajoute un clic à la file"""
+        self._put(('click', user_id, course, timestamp or now_epoch()))
+
+    def put_search(self, user_id, query, timestamp=None):
+        """Ajoute une recherche à la file"""
+        self._put(('search', user_id, query, timestamp or now_epoch()))
+
+    def _put(self, event):
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self._drop(1)  # append va abandonner le plus ancien
+            self._events.append(event)
+            if len(self._events) >= self.flush_size:
+                self._cond.notify()
+
+    def _drop(self, count):
+        """Compte des événements abandonnés (appelé sous self._cond) ; le premier abandon est signalé aussitôt"""
+        if not self._dropped_unreported:
+            print(f"⚠️ File des événements pleine ({self._events.maxlen}) : des événements sont abandonnés")
+        self.dropped_count += count
+        self._dropped_unreported += count
+
+    def depth(self):
+        """Nombre d'événements en attente d'écriture"""
+        return len(self._events)
+
+    def dropped(self):
+        """Nombre total d'événements abandonnés parce que la file était pleine"""
+        return self.dropped_count
+
+    def _drain(self):
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def flush(self):
+        """Écrit immédiatement tous les événements en attente"""
+        with self._write_lock:
+            events = self._drain()
+            if not events:
+                return 0
+            clicks = [(user_id, payload, ts) for kind, user_id, payload, ts in events if kind == 'click']
+            searches = [(user_id, payload, ts) for kind, user_id, payload, ts in events if kind == 'search']
+            try:
+                self.db.add_events_batch(clicks=clicks, searches=searches)
+            except Exception as e:
+                # On remet les événements en tête de file pour le prochain essai
+                print(f"❌ Écriture des événements impossible ({len(events)} en attente) : {e}")
+                with self._cond:
+                    # La file a pu se remplir entre-temps : extendleft abandonne alors les plus récents
+                    maxlen = self._events.maxlen
+                    if maxlen is not None and len(self._events) + len(events) > maxlen:
+                        self._drop(len(self._events) + len(events) - maxlen)
+                    self._events.extendleft(reversed(events))
+                return 0
+            self.flushed_count += len(events)
+            with self._cond:
+                dropped, self._dropped_unreported = self._dropped_unreported, 0
+            if dropped:
+                print(f"⚠️ {dropped} événements abandonnés (file pleine) depuis la dernière écriture réussie")
+        if self.on_flush is not None:
+            self.on_flush({user_id for kind, user_id, payload, ts in events})
+        return len(events)
+
+    def _run(self):
+        """Boucle du thread : écrit tous les N événements ou toutes les T millisecondes"""
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._events) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+            if not self.flush() and self.depth() and not stopping:
+                time.sleep(self.flush_interval)  # Échec d'écriture : on patiente avant de réessayer
+            if stopping:
+                return
+
+    def shutdown(self, timeout=5.0):
+        """Arrête le thread après avoir vidé la file (appelé à la sortie du processus)"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
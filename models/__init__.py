@@ -3,5 +3,12 @@ Models package for Course Recommendation System
 """
 
 from .recommender import CourseRecommender
+from .catalog import CourseCatalog
+from .course_lookup import CourseLookup
+from .hybrid_ranker import HybridRanker
+from .leaderboard import PopularityLeaderboard
+from .catalog_metadata import CatalogMetadata
+from .analytics_cube import AnalyticsCube
+from .course_json import CourseJsonFragments
 
-__all__ = ['CourseRecommender']
+__all__ = ['CourseRecommender', 'CourseCatalog', 'CourseLookup', 'HybridRanker', 'PopularityLeaderboard', 'CatalogMetadata', 'AnalyticsCube', 'CourseJsonFragments']
@@ -0,0 +1,172 @@
+"""
+Cube analytique du tableau de bord : nombre de cours et notes par catégorie × plateforme × niveau × cluster
+Calculé une fois par version du catalogue et du clustering, puis sauvegardé à côté des modèles (.pkl) :
+le tableau de bord lit des tranches du cube sans parcourir le catalogue ni relancer K-Means
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+from models.catalog import factorize
+
+# Axes du cube (dans cet ordre) ; la dernière case de chaque axe regroupe les valeurs manquantes
+DIMENSIONS = ('category', 'platform', 'level', 'cluster')
+CUBE_FORMAT = 1  # À incrémenter si la structure du fichier change
+
+
+class AnalyticsCube:
+    """Compteurs agrégés du catalogue, découpables selon n'importe quelle combinaison d'axes"""
+
+    def __init__(self, values, counts, rating_sums, rating_counts, catalog_version, clustering_version):
+        self.values = values                # axe -> liste des valeurs (index = code)
+        self.counts = counts                # nombre de cours par cellule
+        self.rating_sums = rating_sums      # somme des notes renseignées par cellule
+        self.rating_counts = rating_counts  # nombre de notes renseignées par cellule
+        self.catalog_version = catalog_version
+        self.clustering_version = clustering_version
+
+    @classmethod
+    def build(cls, catalog, clusters, catalog_version, clustering_version):
+        """Agrège le CourseCatalog en un seul passage (clusters : label de chaque ligne, aligné sur le catalogue)"""
+        codes, values = [], {}
+        for dimension in DIMENSIONS:
+            if dimension == 'cluster':
+                dimension_codes, uniques = factorize(np.asarray(clusters).tolist())
+            elif dimension in catalog:
+                dimension_codes, uniques = catalog.factorize(dimension)  # -1 = valeur manquante
+            else:
+                dimension_codes, uniques = np.full(len(catalog), -1), []
+            values[dimension] = uniques
+            codes.append(np.where(dimension_codes < 0, len(uniques), dimension_codes))
+
+        shape = tuple(len(values[d]) + 1 for d in DIMENSIONS)
+        cells = np.ravel_multi_index(codes, shape) if len(catalog) else np.empty(0, dtype=np.intp)
+        size = int(np.prod(shape))
+
+        ratings = catalog.numeric('rating').astype(np.float64) if 'rating' in catalog else np.full(len(catalog), np.nan)
+        rated = ~np.isnan(ratings)
+        counts = np.bincount(cells, minlength=size).reshape(shape)
+        rating_sums = np.bincount(cells[rated], weights=ratings[rated], minlength=size).reshape(shape)
+        rating_counts = np.bincount(cells[rated], minlength=size).reshape(shape)
+        return cls(values, counts, rating_sums, rating_counts, catalog_version, clustering_version)
+
+    # === PERSISTANCE ===
+
+    def save(self, path):
+        """Sauvegarde le cube (à côté des modèles entraînés)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'format': CUBE_FORMAT,
+                'catalog_version': self.catalog_version,
+                'clustering_version': self.clustering_version,
+                'values': self.values,
+                'counts': self.counts,
+                'rating_sums': self.rating_sums,
+                'rating_counts': self.rating_counts,
+            }, f)
+        print(f"💾 Cube analytique sauvegardé : {path}")
+
+    @classmethod
+    def load(cls, path, catalog_version, clustering_version):
+        """Charge le cube sauvegardé s'il correspond aux versions demandées, sinon None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Cube analytique illisible ({e}) : il sera recalculé")
+            return None
+        if (data.get('format') != CUBE_FORMAT or data.get('catalog_version') != catalog_version
+                or data.get('clustering_version') != clustering_version):
+            return None
+        return cls(data['values'], data['counts'], data['rating_sums'], data['rating_counts'],
+                   catalog_version, clustering_version)
+
+    # === LECTURE DE TRANCHES ===
+
+    def _selection(self, filters):
+        """Codes des valeurs filtrées {axe: code} (None si une valeur est inconnue : tranche vide)"""
+        selection = {}
+        for dimension in DIMENSIONS:
+            value = (filters or {}).get(dimension)
+            if value is None or value == '':
+                continue
+            values = self.values[dimension]
+            if dimension == 'cluster':
+                value = int(value)
+            if value not in values:
+                return None
+            selection[dimension] = values.index(value)
+        return selection
+
+    def _index(self, selection, keep=None):
+        """Indexeur numpy de la tranche (l'axe keep reste complet)"""
+        return tuple(
+            slice(selection[d], selection[d] + 1) if d in selection and d != keep else slice(None)
+            for d in DIMENSIONS
+        )
+
+    def _marginal(self, array, dimension, selection):
+        """Totaux par valeur de dimension dans la tranche (case des valeurs manquantes exclue)"""
+        axis = DIMENSIONS.index(dimension)
+        other_axes = tuple(i for i in range(len(DIMENSIONS)) if i != axis)
+        totals = array[self._index(selection, keep=dimension)].sum(axis=other_axes)[:-1]
+        if dimension in selection:
+            # Axe filtré : seule la valeur demandée garde son total
+            mask = np.zeros(len(totals), dtype=bool)
+            mask[selection[dimension]] = True
+            totals = np.where(mask, totals, 0)
+        return totals
+
+    def counts_by(self, dimension, filters=None, top=None):
+        """Nombre de cours par valeur de dimension, décroissant (comme value_counts)"""
+        selection = self._selection(filters)
+        if selection is None:
+            return {}
+        totals = self._marginal(self.counts, dimension, selection)
+        order = np.argsort(-totals, kind='stable')
+        values = self.values[dimension]
+        result = {values[code]: int(totals[code]) for code in order if totals[code] > 0}
+        return dict(list(result.items())[:top]) if top else result
+
+    def rating_means_by(self, dimension, filters=None):
+        """Note moyenne par valeur de dimension, triée par valeur (comme groupby().mean())"""
+        selection = self._selection(filters)
+        if selection is None:
+            return {}
+        sums = self._marginal(self.rating_sums, dimension, selection)
+        counts = self._marginal(self.rating_counts, dimension, selection)
+        values = self.values[dimension]
+        return {values[code]: float(sums[code] / counts[code])
+                for code in sorted(range(len(values)), key=lambda c: values[c]) if counts[code] > 0}
+
+    def cluster_counts(self, filters=None):
+        """Nombre de cours de chaque cluster (0, 1, 2, ...), zéro pour les clusters absents de la tranche"""
+        by_cluster = self.counts_by('cluster', filters)
+        return [by_cluster.get(cluster, 0) for cluster in sorted(self.values['cluster'])]
+
+    def summary(self, filters=None, top=None):
+        """Tranche complète pour /api/dashboard : total, note moyenne et répartition sur chaque axe"""
+        selection = self._selection(filters)
+        if selection is None:
+            total, rating_sum, rating_count = 0, 0.0, 0
+        else:
+            index = self._index(selection)
+            total = int(self.counts[index].sum())
+            rating_sum = float(self.rating_sums[index].sum())
+            rating_count = int(self.rating_counts[index].sum())
+        return {
+            'total_courses': total,
+            'avg_rating': round(rating_sum / rating_count, 2) if rating_count else 0,
+            'by_category': self.counts_by('category', filters, top),
+            'by_platform': self.counts_by('platform', filters, top),
+            'by_level': self.counts_by('level', filters, top),
+            'by_cluster': self.cluster_counts(filters),
+            'avg_rating_by_platform': self.rating_means_by('platform', filters),
+            'catalog_version': self.catalog_version,
+            'clustering_version': self.clustering_version,
+        }
@@ -0,0 +1,524 @@
+"""
+Catalogue de service en colonnes, en lecture seule et sans pandas
+Colonnes numériques en tableaux numpy, colonnes catégorielles codées en entiers (petite table de valeurs),
+textes dans un seul tampon UTF-8 avec tableau de décalages : les requêtes découpent, filtrent et trient
+des tableaux, pandas ne sert plus qu'au chargement et à l'entraînement.
+Ces mêmes tableaux forment l'instantané binaire (.npz) du catalogue normalisé, relu au démarrage sans analyser le CSV
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+# Colonnes texte à faible cardinalité : codées en entiers contre une table de valeurs
+CATEGORICAL_COLUMNS = ('category', 'platform', 'source_domain', 'level', 'price', 'partner', 'instructor', 'metadata')
+
+MISSING = float('nan')  # Valeur manquante renvoyée (comme to_dict sur le DataFrame)
+SNAPSHOT_FORMAT = 1  # À incrémenter si la structure de l'instantané .npz change
+
+# Niveau d'un cours d'après ses métadonnées : premier mot-clé trouvé, dans l'ordre de priorité
+LEVEL_KEYWORDS = (('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced'))
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def file_hash(path):
+    """Empreinte du contenu d'un fichier (détecte un CSV modifié depuis l'écriture de l'instantané)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def csv_separator(path):
+    """Séparateur d'un CSV d'après sa ligne d'en-tête (';' pour le format européen, ',' sinon)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+    return ';' if header.count(';') > header.count(',') else ','
+
+
+def extract_levels(metadata):
+    """Niveau de chaque chaîne de métadonnées (Series), vectorisé ; 'All Levels' si aucun mot-clé
+
+    Partagé par le chargement du catalogue et par le clustering, pour que leurs niveaux restent identiques.
+    Renvoie un tableau numpy (pandas n'est pas importé ici).
+    """
+    lowered = metadata.astype(object).where(metadata.notna(), '').astype(str).str.lower()
+    conditions = [lowered.str.contains(keyword, regex=False).to_numpy() for keyword, _ in LEVEL_KEYWORDS]
+    return np.select(conditions, [level for _, level in LEVEL_KEYWORDS], default='All Levels')
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+def factorize(values):
+    """Codes entiers (-1 = manquant) et valeurs distinctes dans l'ordre d'apparition, comme pd.factorize"""
+    table = {}
+    codes = [-1 if _is_missing(value) else table.setdefault(value, len(table)) for value in values]
+    return np.array(codes, dtype=np.intp), list(table)
+
+
+def _column_array(values):
+    """Tableau numpy d'une colonne reconstruite : numérique si possible, sinon objets (pas de conversion en texte)"""
+    array = np.array(values)
+    return array if array.dtype.kind in 'biuf' else np.array(values, dtype=object)
+
+
+class NumericColumn:
+    """Colonne numérique : tableau numpy"""
+
+    kind = 'numeric'
+
+    def __init__(self, values):
+        self.values = _read_only(np.array(values))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def take(self, rows):
+        return self.values[rows].tolist()  # tolist : types Python natifs
+
+    def missing(self, rows):
+        return np.isnan(self.values[rows]) if self.values.dtype.kind == 'f' else np.zeros(len(rows), dtype=bool)
+
+    def sort_keys(self, rows):
+        values = self.values[rows]
+        return values.astype(np.int64) if values.dtype.kind in 'bu' else values  # Clés négatables
+
+    def equals(self, value):
+        return self.values == value
+
+    def arrays(self):
+        return {'values': self.values}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['values'])
+
+    def patch(self, rows, values):
+        """Copie où seules les lignes rows reçoivent values (None si le type de la colonne doit changer)"""
+        source = np.array([MISSING if _is_missing(value) else value for value in values])
+        if source.dtype.kind not in 'biuf' or np.promote_types(source.dtype, self.values.dtype) != self.values.dtype:
+            return None
+        values = self.values.copy()
+        values[rows] = source
+        column = type(self).__new__(type(self))
+        column.values = _read_only(values)
+        return column
+
+
+class CategoricalColumn:
+    """Colonne catégorielle : codes entiers (-1 = manquant) et table des valeurs (index = code)"""
+
+    kind = 'categorical'
+
+    def __init__(self, values):
+        table = {}
+        codes = [-1 if _is_missing(value) else table.setdefault(value, len(table)) for value in values]
+        self._set(codes, list(table))
+
+    @classmethod
+    def from_codes(cls, codes, values):
+        """Depuis des codes déjà calculés (pd.Categorical, instantané)"""
+        column = cls.__new__(cls)
+        column._set(codes, list(values))
+        return column
+
+    def _set(self, codes, values):
+        self.values = tuple(values)
+        self.codes = _read_only(np.array(codes, dtype=np.int32))
+        # Table de décodage : le code -1 désigne la dernière case (valeur manquante)
+        self._decode = np.array(list(self.values) + [MISSING], dtype=object)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(len(value.encode('utf-8')) for value in self.values)
+
+    def take(self, rows):
+        return self._decode[self.codes[rows]].tolist()
+
+    def missing(self, rows):
+        return self.codes[rows] < 0
+
+    def sort_keys(self, rows):
+        # Rang de chaque valeur de la table dans l'ordre trié des valeurs
+        ranks = np.empty(len(self.values), dtype=np.int64)
+        ranks[sorted(range(len(self.values)), key=self.values.__getitem__)] = np.arange(len(self.values))
+        codes = self.codes[rows]
+        return np.where(codes >= 0, ranks[np.maximum(codes, 0)] if len(ranks) else 0, 0)
+
+    def code(self, value):
+        """Code d'une valeur (-2 si absente de la table : aucune ligne)"""
+        return self.values.index(value) if value in self.values else -2
+
+    def equals(self, value):
+        return self.codes == self.code(value)
+
+    def matches(self, pattern):
+        """Lignes dont la valeur contient le motif : évalué une fois par valeur de la table"""
+        hits = np.array([pattern.search(value) is not None for value in self.values] + [False], dtype=bool)
+        return hits[self.codes]
+
+    def arrays(self):
+        return {'codes': self.codes, 'table': np.array(self.values, dtype=str)}
+
+    def factorize(self):
+        """Codes renumérotés dans l'ordre d'apparition des seules valeurs présentes (comme pd.factorize)"""
+        used, first = np.unique(self.codes[self.codes >= 0], return_index=True)
+        used = used[np.argsort(first, kind='stable')]
+        remap = np.full(len(self.values) + 1, -1, dtype=np.intp)  # Dernière case : code -1 (manquant)
+        remap[used] = np.arange(len(used))
+        return remap[self.codes], [self.values[code] for code in used.tolist()]
+
+    def patch(self, rows, values):
+        """Copie où seuls les codes des lignes rows changent ; la table ne fait que s'allonger"""
+        if not all(isinstance(value, str) or _is_missing(value) for value in values):
+            return None
+        table = {value: code for code, value in enumerate(self.values)}
+        codes = self.codes.copy()
+        codes[rows] = [-1 if _is_missing(value) else table.setdefault(value, len(table)) for value in values]
+        return CategoricalColumn.from_codes(codes, list(table))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls.from_codes(arrays['codes'], arrays['table'].tolist())
+
+
+class StringColumn:
+    """Colonne texte : un seul tampon UTF-8, décalages de début/fin de chaque ligne et masque des manquants"""
+
+    kind = 'string'
+
+    def __init__(self, values):
+        missing = [_is_missing(value) for value in values]
+        encoded = [b'' if absent else value.encode('utf-8') for value, absent in zip(values, missing)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        self.buffer = b''.join(encoded)
+        self.offsets = _read_only(offsets)
+        self.is_missing = _read_only(np.array(missing, dtype=bool))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        column = cls.__new__(cls)
+        column.buffer = arrays['buffer'].tobytes()
+        column.offsets = _read_only(np.array(arrays['offsets'], dtype=np.int64))
+        column.is_missing = _read_only(np.array(arrays['missing'], dtype=bool))
+        return column
+
+    def arrays(self):
+        return {'buffer': np.frombuffer(self.buffer, dtype=np.uint8), 'offsets': self.offsets,
+                'missing': self.is_missing}
+
+    def patch(self, rows, values):
+        """Copie où seules les tranches du tampon des lignes rows (croissantes) sont remplacées"""
+        if not all(isinstance(value, str) or _is_missing(value) for value in values):
+            return None
+        is_missing = self.is_missing.copy()
+        is_missing[rows] = [_is_missing(value) for value in values]
+        parts, cursor = [], 0
+        deltas = np.zeros(len(self.offsets), dtype=np.int64)
+        for row, value, absent in zip(rows.tolist(), values, is_missing[rows].tolist()):
+            start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+            encoded = b'' if absent else value.encode('utf-8')
+            parts += [self.buffer[cursor:start], encoded]
+            cursor = end
+            deltas[row + 1] = len(encoded) - (end - start)
+        parts.append(self.buffer[cursor:])
+        column = StringColumn.__new__(StringColumn)
+        column.buffer = b''.join(parts)
+        column.offsets = _read_only(self.offsets + np.cumsum(deltas))  # Décalages suivants déplacés
+        column.is_missing = _read_only(is_missing)
+        return column
+
+    def __len__(self):
+        return len(self.is_missing)
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.nbytes + self.is_missing.nbytes
+
+    def take(self, rows):
+        rows = np.arange(len(self))[rows]
+        buffer = self.buffer
+        return [
+            MISSING if absent else buffer[start:end].decode('utf-8')
+            for start, end, absent in zip(self.offsets[rows].tolist(), self.offsets[rows + 1].tolist(),
+                                          self.is_missing[rows].tolist())
+        ]
+
+    def missing(self, rows):
+        return self.is_missing[rows]
+
+    def sort_keys(self, rows):
+        values = np.array(['' if _is_missing(value) else value for value in self.take(rows)], dtype=object)
+        return np.unique(values, return_inverse=True)[1].reshape(-1) if len(values) else np.empty(0, dtype=np.int64)
+
+    def equals(self, value):
+        return np.array([item == value for item in self.take(slice(None))], dtype=bool)
+
+    def matches(self, pattern, rows):
+        return np.array([not _is_missing(value) and pattern.search(value) is not None
+                         for value in self.take(rows)], dtype=bool)
+
+
+class ObjectColumn(NumericColumn):
+    """Colonne aux types mélangés : tableau d'objets Python (cas de repli, absent des instantanés)"""
+
+    kind = 'object'
+
+    def __init__(self, values):
+        self.values = _read_only(np.array(values, dtype=object))
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + sum(sys.getsizeof(value) for value in self.values.tolist())
+
+    def missing(self, rows):
+        return np.array([_is_missing(value) for value in self.values[rows]], dtype=bool)
+
+    def patch(self, rows, values):
+        source = np.empty(len(values), dtype=object)
+        source[:] = values  # Élément par élément (pas de diffusion des listes ou tuples)
+        values = self.values.copy()
+        values[rows] = source
+        column = ObjectColumn.__new__(ObjectColumn)
+        column.values = _read_only(values)
+        return column
+
+    def sort_keys(self, rows):
+        values = np.array(['' if _is_missing(value) else str(value) for value in self.values[rows]], dtype=object)
+        return np.unique(values, return_inverse=True)[1].reshape(-1) if len(values) else np.empty(0, dtype=np.int64)
+
+
+COLUMN_KINDS = {column.kind: column for column in (NumericColumn, CategoricalColumn, StringColumn)}
+
+
+def _make_column(name, values):
+    """Choisit la représentation d'une colonne selon ses valeurs"""
+    if isinstance(values, (NumericColumn, CategoricalColumn, StringColumn)):
+        return values
+    array = np.asarray(values)
+    if array.dtype.kind in 'biuf':
+        return NumericColumn(array)
+    values = array.tolist()
+    if all(isinstance(value, str) or _is_missing(value) for value in values):
+        return CategoricalColumn(values) if name in CATEGORICAL_COLUMNS else StringColumn(values)
+    return ObjectColumn(values)
+
+
+class CourseCatalog:
+    """Catalogue des cours en colonnes, en lecture seule : lignes, tranches, filtres et tris par positions"""
+
+    def __init__(self, columns, version=None, key='course_id'):
+        """columns : {nom: valeurs} (séquences de même longueur, dans l'ordre des colonnes du catalogue)"""
+        self.version = version
+        self.columns = tuple(columns)
+        self._columns = {name: _make_column(name, values) for name, values in columns.items()}
+        self._length = len(next(iter(self._columns.values()))) if self._columns else 0
+
+        # Index course_id -> ligne (recherche dichotomique)
+        self.key = key
+        if key in self._columns:
+            key_values = np.asarray(self._columns[key].values, dtype=np.int64)
+            self._key_order = _read_only(np.argsort(key_values, kind='stable'))
+            self._sorted_keys = _read_only(key_values[self._key_order])
+        else:
+            self._key_order = self._sorted_keys = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _column_data(series):
+        """Données d'une colonne du DataFrame (pd.Categorical : ses codes et sa table sont repris tels quels)"""
+        if hasattr(series, 'cat'):
+            return CategoricalColumn.from_codes(series.cat.codes.to_numpy(), series.cat.categories.tolist())
+        return series.to_numpy()
+
+    @classmethod
+    def from_dataframe(cls, df, version=None):
+        """Construit le catalogue depuis le DataFrame chargé (pandas n'est pas importé ici)"""
+        return cls({column: cls._column_data(df[column]) for column in df.columns}, version=version)
+
+    def update(self, changes, version=None):
+        """Nouveau catalogue où les cellules changes ({colonne: {ligne: valeur}}) sont modifiées
+
+        Seules les colonnes touchées sont recopiées, et seules les lignes modifiées y sont réécrites (valeurs,
+        codes ou tranches du tampon texte) ; les autres colonnes sont partagées. Ce catalogue reste inchangé
+        pour les requêtes qui le lisent encore. Une colonne inconnue est ajoutée (manquante sur les autres lignes).
+        """
+        patched = dict(self._columns)
+        for column, cells in changes.items():
+            rows = np.array(sorted(cells), dtype=np.intp)
+            values = [cells[row] for row in rows.tolist()]
+            data = patched[column].patch(rows, values) if column in patched else None
+            if data is None:  # Nouvelle colonne ou type changé : colonne reconstruite
+                merged = patched[column].take(slice(None)) if column in patched else [MISSING] * self._length
+                for row, value in zip(rows.tolist(), values):
+                    merged[row] = MISSING if _is_missing(value) else value
+                data = _make_column(column, _column_array(merged))
+            patched[column] = data
+
+        if self.key in changes:
+            return CourseCatalog(patched, version=version, key=self.key)  # Clé modifiée : index reconstruit
+        catalog = CourseCatalog.__new__(CourseCatalog)
+        catalog.__dict__.update(self.__dict__)  # Index des clés partagé (course_id inchangé)
+        catalog.columns = tuple(patched)
+        catalog._columns = patched
+        catalog.version = version
+        return catalog
+
+    def column_kind(self, column):
+        """Représentation d'une colonne : 'numeric', 'categorical', 'string' ou 'object'"""
+        return self._columns[column].kind
+
+    # === INSTANTANÉ BINAIRE (.npz) ===
+
+    def save(self, path, **meta):
+        """Écrit les tableaux de chaque colonne dans un .npz non compressé (écriture atomique)
+
+        meta : identifiants stockés avec l'instantané et vérifiés par load (source, schéma, ...)
+        """
+        arrays, columns = {}, []
+        for index, column in enumerate(self.columns):
+            data = self._columns[column]
+            if data.kind not in COLUMN_KINDS:
+                raise ValueError(f"Colonne '{column}' non sérialisable ({data.kind})")
+            columns.append({'name': column, 'kind': data.kind})
+            arrays.update({f'{index}.{part}': array for part, array in data.arrays().items()})
+        header = {'format': SNAPSHOT_FORMAT, 'version': self.version, 'key': self.key, 'rows': self._length,
+                  'columns': columns, **meta}
+        arrays['header'] = np.array(json.dumps(header, sort_keys=True))
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, path)  # Les autres workers lisent l'ancien fichier ou le nouveau, jamais un fichier partiel
+
+    @classmethod
+    def load(cls, path, **meta):
+        """Charge un instantané s'il existe et correspond au format et aux identifiants meta, sinon None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                header = json.loads(str(data['header']))
+                if header.get('format') != SNAPSHOT_FORMAT or any(header.get(k) != v for k, v in meta.items()):
+                    return None
+                columns = {}
+                for index, column in enumerate(header['columns']):
+                    arrays = {name.split('.', 1)[1]: data[name] for name in data.files
+                              if name.startswith(f'{index}.')}
+                    columns[column['name']] = COLUMN_KINDS[column['kind']].from_arrays(arrays)
+        except Exception as e:
+            print(f"⚠️ Instantané du catalogue illisible ({e}) : lecture du CSV")
+            return None
+        return cls(columns, version=header['version'], key=header['key'])
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, column):
+        return column in self._columns
+
+    def memory_usage(self):
+        """Octets occupés par colonne (tampons, codes et tables de valeurs)"""
+        return {column: self._columns[column].nbytes for column in self.columns}
+
+    def _rows(self, rows):
+        """Positions (tableau d'entiers) depuis None (tout le catalogue), une tranche ou des positions"""
+        if rows is None:
+            return np.arange(self._length)
+        if isinstance(rows, slice):
+            return np.arange(self._length)[rows]
+        return np.asarray(rows, dtype=np.intp)
+
+    # === LIGNES ET COLONNES ===
+
+    def take(self, column, rows=None):
+        """Valeurs Python d'une colonne pour des lignes (NaN pour les valeurs manquantes)"""
+        return self._columns[column].take(self._rows(rows))
+
+    def numeric(self, column, rows=None):
+        """Tableau numpy d'une colonne numérique (lecture seule si rows est None)"""
+        values = self._columns[column].values
+        return values if rows is None else values[self._rows(rows)]
+
+    def categories(self, column):
+        """Table des valeurs d'une colonne catégorielle (index = code)"""
+        return self._columns[column].values
+
+    def codes(self, column):
+        """Codes entiers d'une colonne catégorielle (-1 = manquant)"""
+        return self._columns[column].codes
+
+    def factorize(self, column):
+        """Codes (-1 = manquant) et valeurs présentes d'une colonne, dans l'ordre d'apparition (comme pd.factorize)"""
+        data = self._columns[column]
+        if isinstance(data, CategoricalColumn):
+            return data.factorize()  # Depuis les codes, sans décoder les valeurs
+        return factorize(data.take(slice(None)))
+
+    def records(self, rows=None):
+        """Lignes en dictionnaires {colonne: valeur}, comme DataFrame.iloc[rows].to_dict('records')"""
+        rows = self._rows(rows)
+        values = [self._columns[column].take(rows) for column in self.columns]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+    def row(self, position):
+        """Une ligne en dictionnaire"""
+        return self.records([position])[0]
+
+    def locate(self, course_ids):
+        """Lignes pour des course_id (-1 si inconnus)"""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        if not len(self._sorted_keys):
+            return np.full(len(course_ids), -1, dtype=np.intp)
+        pos = np.minimum(np.searchsorted(self._sorted_keys, course_ids), len(self._sorted_keys) - 1)
+        return np.where(self._sorted_keys[pos] == course_ids, self._key_order[pos], -1)
+
+    # === FILTRES ET TRIS ===
+
+    def filter(self, equals=None, rows=None):
+        """Lignes (ordre du catalogue) dont chaque colonne vaut la valeur demandée ({colonne: valeur})"""
+        selected = np.zeros(self._length, dtype=bool)
+        selected[self._rows(rows)] = True
+        for column, value in (equals or {}).items():
+            if column not in self._columns:
+                return np.empty(0, dtype=np.intp)
+            selected &= self._columns[column].equals(value)
+        return np.flatnonzero(selected)
+
+    def contains(self, column, pattern, rows=None, case=True):
+        """Lignes dont le texte contient l'expression régulière pattern (comme Series.str.contains)"""
+        rows = self._rows(rows)
+        compiled = re.compile(pattern, 0 if case else re.IGNORECASE)
+        data = self._columns[column]
+        if isinstance(data, CategoricalColumn):
+            return rows[data.matches(compiled)[rows]]
+        return rows[data.matches(compiled, rows)] if len(rows) else rows
+
+    def sort(self, column, rows=None, descending=True):
+        """Lignes triées par colonne (tri stable, valeurs manquantes en dernier, comme sort_values)"""
+        rows = self._rows(rows)
+        data = self._columns[column]
+        missing = data.missing(rows)
+        present = rows[~missing]
+        keys = data.sort_keys(present)
+        order = np.argsort(-keys if descending else keys, kind='stable')
+        return np.concatenate([present[order], rows[missing]])
@@ -0,0 +1,82 @@
+"""
+Métadonnées du catalogue (catégories, plateformes, niveaux, statistiques) calculées une fois par version
+Objet immuable : reconstruit au rechargement du catalogue, jamais modifié sur place
+"""
+
+import json
+from types import MappingProxyType
+
+import numpy as np
+
+
+class CatalogMetadata:
+    """Listes de filtres et statistiques d'une version du catalogue, avec leur JSON pré-encodé"""
+
+    __slots__ = ('version', 'categories', 'platforms', 'levels', 'stats', 'stats_json', 'etag')
+
+    def __init__(self, version, categories, platforms, levels, stats):
+        set_field = object.__setattr__  # Seul __init__ affecte les champs
+        set_field(self, 'version', version)
+        set_field(self, 'categories', tuple(categories))
+        set_field(self, 'platforms', tuple(platforms))
+        set_field(self, 'levels', tuple(levels))
+        set_field(self, 'stats', MappingProxyType({
+            key: MappingProxyType(dict(value)) if isinstance(value, dict) else value
+            for key, value in stats.items()
+        }))
+        # Même encodage que jsonify (clés triées, compact) : servi tel quel par /api/stats
+        set_field(self, 'stats_json', (json.dumps(stats, sort_keys=True, separators=(',', ':')) + '\n').encode())
+        set_field(self, 'etag', version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CatalogMetadata est immuable')
+
+    def __delattr__(self, name):
+        raise AttributeError('CatalogMetadata est immuable')
+
+    @classmethod
+    def from_catalog(cls, catalog, version):
+        """Calcule les listes et statistiques en un passage sur les codes des colonnes du catalogue (CourseCatalog)"""
+        def counts(column):
+            # Ordre décroissant du nombre de cours, à égalité ordre de la table d'une colonne catégorielle
+            # (ordre d'apparition sinon), comme value_counts ; les valeurs inutilisées de la table sont ignorées
+            if column not in catalog:
+                return {}
+            if catalog.column_kind(column) == 'categorical':
+                codes, values = catalog.codes(column), catalog.categories(column)
+            else:
+                codes, values = catalog.factorize(column)
+            totals = np.bincount(codes[codes >= 0], minlength=len(values))
+            return {values[code]: int(totals[code])
+                    for code in np.argsort(-totals, kind='stable').tolist() if totals[code] > 0}
+
+        def present(column):
+            # Valeurs présentes dans l'ordre d'apparition (comme unique())
+            return catalog.factorize(column)[1] if column in catalog else []
+
+        category_counts = counts('category')
+        avg_rating = 0
+        if 'rating' in catalog:
+            ratings = catalog.numeric('rating').astype(np.float64)
+            rated = ratings[~np.isnan(ratings)]  # Notes renseignées (comme mean() de pandas)
+            avg_rating = float(round(rated.mean(), 2)) if len(rated) else float('nan')
+        stats = {
+            'total_courses': len(catalog),
+            'platforms': counts('platform'),
+            'categories': category_counts,
+            'levels': counts('level'),
+            'avg_rating': avg_rating,
+            'free_courses': len(catalog),
+        }
+        return cls(
+            version,
+            categories=sorted(category_counts),
+            platforms=present('platform'),
+            levels=present('level'),
+            stats=stats,
+        )
+
+    def stats_dict(self):
+        """Copie modifiable des statistiques (même forme que l'ancien get_stats)"""
+        return {key: dict(value) if isinstance(value, MappingProxyType) else value
+                for key, value in self.stats.items()}
@@ -9,7 +9,11 @@ import os   # Gestion des fichiers
 import io   # Gestion des entrées/sorties
 
 # Configuration UTF-8 pour éviter les erreurs d'encodage
-if hasattr(sys.stdout, 'buffer'):
+# reconfigure modifie le flux existant : le remplacer par un nouveau TextIOWrapper fermerait le flux
+# déjà enveloppé par models/recommender.py (importé avant, dans l'application)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+elif hasattr(sys.stdout, 'buffer'):
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 # Ajouter le répertoire parent au chemin de recherche
@@ -26,6 +30,18 @@ from sklearn.decomposition import PCA  # Réduction de dimensionnalité (visuali
 from sklearn.preprocessing import StandardScaler  # Normalisation des données
 import json  # Manipulation de fichiers JSON
 
+from models.catalog import csv_separator, extract_levels  # Séparateur du CSV, niveaux depuis les métadonnées
+
+# Version de l'algorithme (caractéristiques, paramètres K-Means) : à incrémenter s'il change,
+# pour invalider les résultats dérivés sauvegardés (cube analytique du tableau de bord)
+CLUSTERING_ALGORITHM_VERSION = 1
+CLUSTERING_RANDOM_STATE = 42  # Graine aléatoire pour reproductibilité
+
+
+def clustering_version(n_clusters=24):
+    """Identifiant des résultats du clustering (déterministes pour un catalogue donné)"""
+    return f"kmeans-v{CLUSTERING_ALGORITHM_VERSION}-k{n_clusters}-rs{CLUSTERING_RANDOM_STATE}"
+
 
 # === CLASSE DE CLUSTERING ===
 class CourseClustering:
@@ -42,15 +58,16 @@ class CourseClustering:
         self.cluster_centers_2d = None  # Centres des clusters en 2D
         self.courses_2d = None  # Coordonnées 2D des cours
         
+    @property
+    def version(self):
+        """Identifiant des résultats de ce clustering"""
+        return clustering_version(self.n_clusters)
+        
     def load_data(self, filepath='processed_data/final_courses_shuffled.csv'):
         """Charger les données des cours depuis un fichier CSV"""
         print(f"📂 Chargement des données : {filepath}")
-        try:
-            # Essayer de lire le CSV avec le séparateur par défaut (virgule)
-            self.df = pd.read_csv(filepath)
-        except:
-            # Si échec, essayer avec le point-virgule (format européen)
-            self.df = pd.read_csv(filepath, sep=';')
+        # Séparateur (virgule ou point-virgule européen) lu dans l'en-tête : une seule analyse du fichier
+        self.df = pd.read_csv(filepath, sep=csv_separator(filepath))
         
         # === VÉRIFICATION ET CRÉATION DES COLONNES MANQUANTES ===
         # Créer un ID unique pour chaque cours si absent
@@ -63,30 +80,11 @@ class CourseClustering:
         
         # Extraire le niveau depuis les métadonnées si absent
         if 'level' not in self.df.columns and 'metadata' in self.df.columns:
-            self.df['level'] = self.df['metadata'].apply(self._extract_level)
+            self.df['level'] = pd.Series(extract_levels(self.df['metadata']), index=self.df.index)
             
         print(f"   ✅ {len(self.df)} cours chargés")
         return self  # Retourner self pour permettre le chaînage de méthodes
         
-    def _extract_level(self, metadata):
-        """Extraire le niveau du cours depuis les métadonnées"""
-        # Si pas de métadonnées, retourner niveau par défaut
-        if pd.isna(metadata):
-            return 'All Levels'
-        
-        # Convertir en minuscules pour la recherche
-        metadata = str(metadata).lower()
-        
-        # Chercher les mots-clés de niveau
-        if 'beginner' in metadata:
-            return 'Beginner'  # Débutant
-        elif 'intermediate' in metadata:
-            return 'Intermediate'  # Intermédiaire
-        elif 'advanced' in metadata:
-            return 'Advanced'  # Avancé
-        
-        return 'All Levels'  # Par défaut : tous niveaux
-        
     def prepare_features(self):
         """Préparer les caractéristiques (features) pour le clustering"""
         print("🔧 Préparation des caractéristiques (Optimisé pour 14 clusters)...")
@@ -150,7 +148,7 @@ class CourseClustering:
         # K-Means : algorithme qui regroupe les cours similaires
         self.kmeans = KMeans(
             n_clusters=self.n_clusters,  # Nombre de groupes à créer
-            random_state=42,  # Graine aléatoire pour reproductibilité
+            random_state=CLUSTERING_RANDOM_STATE,  # Graine aléatoire pour reproductibilité
             n_init=10  # Nombre d'initialisations (prend la meilleure)
         )
         # fit_predict : entraîner et prédire les labels en même temps
@@ -163,7 +161,7 @@ class CourseClustering:
         print("📊 Réduction en 2D avec PCA...")
         self.pca = PCA(
             n_components=2,  # Réduire à 2 dimensions (x, y)
-            random_state=42  # Reproductibilité
+            random_state=CLUSTERING_RANDOM_STATE  # Reproductibilité
         )
         # Transformer tous les cours en coordonnées 2D
         self.courses_2d = self.pca.fit_transform(self.feature_matrix)
@@ -0,0 +1,85 @@
+"""
+Fragments JSON pré-encodés des cours (un par ligne du catalogue)
+Chaque cours est sérialisé une seule fois au chargement ; une réponse d'API concatène les fragments
+et n'encode que les champs propres à la requête (score de similarité, rang)
+"""
+
+import json
+import math
+
+# Champs ajoutés par requête : insérés à leur place dans l'ordre alphabétique des clés (comme jsonify)
+EXTRA_FIELDS = ('rank', 'similarity_score')
+
+_encode = json.JSONEncoder(ensure_ascii=True, separators=(',', ':')).encode
+
+
+def encode_value(value):
+    """Encode une valeur JSON (NaN et infinis -> null : le JSON standard ne les accepte pas)"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return b'null'
+    return _encode(value).encode()
+
+
+class RawJSON(bytes):
+    """Octets déjà encodés en JSON, insérés tels quels par encode_object"""
+
+
+def encode_object(**fields):
+    """Objet JSON compact à clés triées ; les valeurs RawJSON ne sont pas ré-encodées"""
+    parts = [
+        _encode(key).encode() + b':' + (value if isinstance(value, RawJSON) else encode_value(value))
+        for key, value in sorted(fields.items())
+    ]
+    return b'{' + b','.join(parts) + b'}\n'
+
+
+class CourseJsonFragments:
+    """Cours du catalogue pré-encodés ; chaque cours est découpé autour des champs de EXTRA_FIELDS"""
+
+    def __init__(self, catalog, version=None):
+        """catalog : CourseCatalog (colonnes et valeurs Python de chaque ligne)"""
+        self.version = version
+        self.columns = sorted(column for column in catalog.columns if column not in EXTRA_FIELDS)
+        self._keys = [_encode(column).encode() + b':' for column in self.columns]
+        # Position de chaque champ par requête parmi les colonnes triées
+        self._splits = [sum(1 for column in self.columns if column < field) for field in EXTRA_FIELDS]
+        self._segments = [self._encode_row(values) for values in self._column_values(catalog, None)]
+
+    def _column_values(self, catalog, rows):
+        """Valeurs des lignes rows (None : toutes), ligne par ligne, en types Python natifs"""
+        return zip(*[catalog.take(column, rows) for column in self.columns])
+
+    def _encode_row(self, values):
+        """Segments d'un cours : colonnes avant 'rank', entre 'rank' et 'similarity_score', après"""
+        pairs = [key + encode_value(value) for key, value in zip(self._keys, values)]
+        bounds = [0] + self._splits + [len(pairs)]
+        return tuple(b','.join(pairs[start:end]) for start, end in zip(bounds, bounds[1:]))
+
+    def refresh(self, catalog, rows, version=None):
+        """Ré-encode seulement les lignes modifiées (mêmes colonnes)"""
+        rows = list(rows)
+        for row, values in zip(rows, self._column_values(catalog, rows)):
+            self._segments[row] = self._encode_row(values)
+        self.version = version
+        return self
+
+    def course(self, row, rank=None, similarity_score=None):
+        """Un cours en JSON, avec ses champs propres à la requête s'ils sont fournis"""
+        before, middle, after = self._segments[row]
+        parts = [before]
+        if rank is not None:
+            parts.append(b'"rank":' + encode_value(rank))
+        parts.append(middle)
+        if similarity_score is not None:
+            parts.append(b'"similarity_score":' + encode_value(similarity_score))
+        parts.append(after)
+        return b'{' + b','.join(part for part in parts if part) + b'}'
+
+    def courses(self, rows, similarity_scores=None):
+        """Tableau JSON de cours (RawJSON) ; avec des scores, chaque cours reçoit aussi son rang (1, 2, ...)"""
+        if similarity_scores is None:
+            items = [self.course(row) for row in rows]
+        else:
+            items = [self.course(row, rank, score)
+                     for rank, (row, score) in enumerate(zip(rows, similarity_scores), start=1)]
+        return RawJSON(b'[' + b','.join(items) + b']')
@@ -0,0 +1,83 @@
+"""
+Table de correspondance compacte course_id -> attributs du catalogue
+Les attributs (catégorie, niveau, plateforme) sont codés en entiers pour agréger les clics sans texte
+"""
+
+import numpy as np
+
+
+class CourseLookup:
+    """Correspondance course_id -> codes entiers de catégorie, niveau et plateforme"""
+    
+    # Dimensions des préférences : nom dans le dictionnaire -> colonne du catalogue
+    DIMENSIONS = {'categories': 'category', 'levels': 'level', 'platforms': 'platform'}
+    
+    def __init__(self, course_ids, columns):
+        """course_ids : identifiants des cours ; columns : {colonne: valeurs alignées sur course_ids}"""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        order = np.argsort(course_ids, kind='stable')
+        self.course_ids = course_ids[order]  # Trié pour la recherche dichotomique
+        self.row_order = order  # Position d'origine (ligne du catalogue) de chaque entrée triée
+        self.codes = {}   # dimension -> tableau int16 (-1 = valeur manquante)
+        self.values = {}  # dimension -> liste des valeurs (index = code)
+        
+        for dimension, column in self.DIMENSIONS.items():
+            table = {}
+            raw = columns.get(column)
+            if raw is None:
+                raw = [None] * len(course_ids)
+            codes = np.array([
+                table.setdefault(v, len(table)) if isinstance(v, str) and v else -1
+                for v in raw
+            ], dtype=np.int16)
+            self.codes[dimension] = codes[order]
+            self.values[dimension] = list(table)
+            
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Construit la table depuis le catalogue en colonnes (CourseCatalog)"""
+        columns = {col: catalog.take(col) for col in cls.DIMENSIONS.values() if col in catalog}
+        return cls(catalog.numeric('course_id'), columns)
+        
+    def __len__(self):
+        return len(self.course_ids)
+        
+    def positions(self, course_ids):
+        """Positions dans la table pour des course_id (-1 si inconnus)"""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        pos = np.searchsorted(self.course_ids, course_ids)
+        pos = np.minimum(pos, max(len(self.course_ids) - 1, 0))
+        found = len(self.course_ids) > 0 and self.course_ids[pos] == course_ids
+        return np.where(found, pos, -1)
+        
+    def rows(self, course_ids):
+        """Lignes du catalogue (ordre d'origine) pour des course_id (-1 si inconnus)"""
+        pos = self.positions(course_ids)
+        return np.where(pos >= 0, self.row_order[np.maximum(pos, 0)], -1) if len(pos) else pos
+        
+    def attributes(self, course_id):
+        """Attributs texte d'un cours : {'category': ..., 'level': ..., 'platform': ...}"""
+        pos = int(self.positions([course_id])[0])
+        attrs = {}
+        for dimension, column in self.DIMENSIONS.items():
+            code = int(self.codes[dimension][pos]) if pos >= 0 else -1
+            attrs[column] = self.values[dimension][code] if code >= 0 else None
+        return attrs
+        
+    def aggregate(self, course_ids, counts=None):
+        """Agrège des clics (course_id, nombre) en préférences {dimension: {valeur: nombre}}"""
+        pos = self.positions(course_ids)
+        weights = np.ones(len(pos), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        known = pos >= 0
+        pos, weights = pos[known], weights[known]
+        
+        prefs = {}
+        for dimension, codes in self.codes.items():
+            row_codes = codes[pos]
+            valid = row_codes >= 0
+            totals = np.bincount(row_codes[valid], weights=weights[valid], minlength=len(self.values[dimension]))
+            order = np.argsort(-totals, kind='stable')
+            prefs[dimension] = {
+                self.values[dimension][code]: int(totals[code]) for code in order if totals[code] > 0
+            }
+        return prefs
@@ -0,0 +1,127 @@
+"""
+Classement hybride des recommandations de l'accueil (recherches, catégories préférées, popularité)
+Dédoublonnage et calcul des scores sur des tableaux numpy, sans boucle Python par cours
+"""
+
+import numpy as np
+
+# Codes des sources de candidats (ordre de priorité : le premier vu l'emporte)
+REASON_SEARCH = 0    # Résultat d'une recherche récente
+REASON_CATEGORY = 1  # Cours populaire d'une catégorie préférée
+REASON_DISCOVER = 2  # Nouvel utilisateur : catégorie à découvrir
+REASON_POPULAR = 3   # Cours populaire (complément)
+
+# Libellés affichés sur les cartes (le paramètre est la requête ou la catégorie de la source)
+REASON_LABELS = {
+    REASON_SEARCH: "Basé sur votre recherche: '{}'",
+    REASON_CATEGORY: "Car vous aimez: {}",
+    REASON_DISCOVER: "Découvrez: {}",
+    REASON_POPULAR: "Cours populaire",
+}
+
+# Score de base heuristique par source (hors résultats de recherche déjà notés)
+BASE_SCORES = np.array([85.0, 70.0, 50.0, 60.0])
+CATEGORY_INTEREST_WEIGHT = 25.0  # 70 + part des clics dans la catégorie * 25 (70 à 95)
+QUALITY_PIVOT = 4.0              # Bonus de qualité : +10 points par point de note au-dessus de 4.0
+MAX_SEARCH_PENALTY = 15.0        # Diversification : jusqu'à -15 points pour un utilisateur très actif
+SCORE_MIN, SCORE_MAX = 40.0, 99.0
+
+
+class HybridRanker:
+    """Fusionne les candidats de plusieurs sources et calcule leurs scores de pertinence"""
+
+    def __init__(self, course_lookup, ratings):
+        """course_lookup : CourseLookup du catalogue ; ratings : notes alignées sur les lignes du catalogue"""
+        self.lookup = course_lookup
+        ratings = np.nan_to_num(np.asarray(ratings, dtype=np.float64), nan=0.0)
+        self.ratings = ratings[course_lookup.row_order]  # Alignées sur l'ordre trié de la table
+        self.category_codes = course_lookup.codes['categories']
+        self.category_values = course_lookup.values['categories']
+
+    @classmethod
+    def from_catalog(cls, catalog, course_lookup):
+        """Construit le classeur depuis le catalogue en colonnes (CourseCatalog)"""
+        ratings = catalog.numeric('rating') if 'rating' in catalog else np.zeros(len(catalog))
+        return cls(course_lookup, ratings)
+
+    def collect(self, sources, cap=None, candidates=None):
+        """Ajoute les candidats de chaque source (dédoublonnés, le premier vu l'emporte)
+
+        sources : liste de (course_ids, reason_code, label, similarity) — similarity en % ou None
+        cap : nombre maximal de candidats après ajout (les suivants sont ignorés)
+        """
+        ids = [] if candidates is None else [candidates['course_ids']]
+        reasons = [] if candidates is None else [candidates['reasons']]
+        labels = [] if candidates is None else [candidates['labels']]
+        sims = [] if candidates is None else [candidates['similarity']]
+        for course_ids, reason, label, similarity in sources:
+            course_ids = np.asarray(course_ids, dtype=np.int64)
+            ids.append(course_ids)
+            reasons.append(np.full(len(course_ids), reason, dtype=np.int8))
+            labels.append(np.full(len(course_ids), label, dtype=object))
+            sims.append(np.full(len(course_ids), np.nan) if similarity is None
+                        else np.asarray(similarity, dtype=np.float64))
+        if not ids:
+            return self.empty()
+
+        ids = np.concatenate(ids)
+        # Première occurrence de chaque cours, dans l'ordre d'arrivée
+        _, first = np.unique(ids, return_index=True)
+        keep = np.sort(first)[:cap]
+        return {
+            'course_ids': ids[keep],
+            'reasons': np.concatenate(reasons)[keep],
+            'labels': np.concatenate(labels)[keep],
+            'similarity': np.concatenate(sims)[keep],
+        }
+
+    def empty(self):
+        return {
+            'course_ids': np.empty(0, dtype=np.int64),
+            'reasons': np.empty(0, dtype=np.int8),
+            'labels': np.empty(0, dtype=object),
+            'similarity': np.empty(0, dtype=np.float64),
+        }
+
+    def base_scores(self, candidates, category_counts):
+        """Scores avant bruit aléatoire : similarité ajustée, intérêt pour la catégorie, bonus de qualité"""
+        pos = self.lookup.positions(candidates['course_ids'])
+        known = pos >= 0
+        pos = np.maximum(pos, 0)
+        reasons = candidates['reasons'].astype(np.intp)
+        similarity = candidates['similarity']
+        total_clicks = sum(category_counts.values()) or 1
+
+        # Part des clics de l'utilisateur dans la catégorie de chaque cours
+        interest_by_code = np.array([category_counts.get(value, 0) for value in self.category_values] + [0],
+                                    dtype=np.float64) / total_clicks
+        codes = np.where(known, self.category_codes[pos], -1)  # -1 -> dernière case (intérêt nul)
+        interest_ratio = interest_by_code[codes]
+
+        quality_bonus = np.where(known, np.maximum(0.0, (self.ratings[pos] - QUALITY_PIVOT) * 10), 0.0)
+        heuristic = BASE_SCORES[reasons] + np.where(reasons == REASON_CATEGORY,
+                                                    interest_ratio * CATEGORY_INTEREST_WEIGHT, 0.0) + quality_bonus
+
+        # Résultats de recherche notés (similarité non nulle) : score du moteur, ramené en % si <= 1
+        scored = np.nan_to_num(similarity, nan=0.0) != 0
+        search_score = np.where(similarity <= 1, similarity * 100, similarity)
+        if total_clicks > 5:
+            # Une seule recherche pèse moins lourd si l'utilisateur a beaucoup d'autres intérêts
+            search_score = search_score - min(total_clicks * 0.5, MAX_SEARCH_PENALTY)
+        return np.where(scored, search_score, heuristic)
+
+    def reason_texts(self, candidates):
+        """Libellés des raisons affichés sur les cartes"""
+        return [REASON_LABELS[int(code)].format(label)
+                for code, label in zip(candidates['reasons'], candidates['labels'])]
+
+    def top(self, base_scores, n=20, jitter=2.0, rng=None):
+        """Ajoute le bruit aléatoire, borne les scores entre 40 et 99 et retourne (indices, scores) des n meilleurs"""
+        base_scores = np.asarray(base_scores, dtype=np.float64)
+        if jitter:
+            noise = (rng or np.random).uniform(-jitter, jitter, len(base_scores))
+            base_scores = base_scores + noise
+        scores = np.round(np.clip(base_scores, SCORE_MIN, SCORE_MAX), 1)
+        # Tri stable décroissant : à score égal, l'ordre d'arrivée des candidats est conservé
+        order = np.argsort(-scores, kind='stable')[:n]
+        return order, scores[order]
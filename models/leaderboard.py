@@ -0,0 +1,116 @@
+"""
+Classements de popularité précalculés (global et par catégorie)
+Chaque classement est un tableau de positions de lignes du catalogue triées par score décroissant :
+obtenir les n cours les plus populaires revient à découper un tableau, sans copie ni tri du catalogue
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def catalog_fingerprint(df):
+    """Empreinte du contenu du catalogue (change dès qu'une valeur change)"""
+    if df is None or df.empty:
+        return 'empty'
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(','.join(map(str, df.columns)).encode())
+    return digest.hexdigest()[:16]
+
+
+def advance_fingerprint(version, changes):
+    """Version suivante après une modification : ancienne version + empreinte de la modification
+
+    changes : (ligne, colonne, valeur) de chaque cellule modifiée. Coût proportionnel à la modification
+    (le catalogue n'est pas relu). La version dépend de l'historique des modifications et pas seulement du
+    contenu : deux chemins vers un même contenu donnent deux versions, ce qui ne coûte qu'une reconstruction
+    de cache.
+    """
+    digest = hashlib.sha1(str(version).encode())
+    for row, column, value in changes:
+        digest.update(f'\x00{row}\x00{column}\x00{value!r}'.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()[:16]
+
+
+class PopularityLeaderboard:
+    """Positions des cours triées par popularité décroissante, pour tout le catalogue et par catégorie
+
+    Tri stable : à score égal, l'ordre du catalogue est conservé ; les scores manquants sont en dernier.
+    """
+
+    def __init__(self, catalog, version=None):
+        """catalog : CourseCatalog de la version classée"""
+        self.sort_column = 'popularity_score' if 'popularity_score' in catalog else 'rating'
+        self.version = version or catalog.version
+        self._keys = np.empty(0)        # -score par ligne (ordre croissant = popularité décroissante)
+        self._categories = []           # catégorie de chaque ligne (pour les déplacements entre classements)
+        self.global_order = np.empty(0, dtype=np.intp)
+        self.by_category = {}           # catégorie -> positions triées
+        self._build(catalog)
+
+    def _build(self, catalog):
+        self._keys = -catalog.numeric(self.sort_column).astype(np.float64)
+        self._categories = catalog.take('category') if 'category' in catalog else [None] * len(catalog)
+        self.global_order = np.argsort(self._keys, kind='stable')
+
+        # Les classements par catégorie se déduisent du classement global (déjà trié) : un seul tri
+        if 'category' in catalog:
+            codes, uniques = catalog.factorize('category')
+        else:
+            codes, uniques = np.full(len(catalog), -1), []
+        codes = codes[self.global_order]
+        self.by_category = {
+            category: self.global_order[codes == code] for code, category in enumerate(uniques)
+        }
+
+    def top(self, n=10, category=None):
+        """Positions (lignes du catalogue) des n cours les plus populaires, éventuellement d'une catégorie"""
+        order = self.by_category.get(category, np.empty(0, dtype=np.intp)) if category else self.global_order
+        return order[:max(n, 0)]
+
+    def _reinsert(self, order, rows):
+        """Retire rows d'un classement puis les réinsère à leur place (même résultat qu'un tri complet)"""
+        order = order[~np.isin(order, rows)]
+        for row in rows:
+            keys = self._keys[order]
+            key = self._keys[row]
+            # Bornes du groupe d'égalité, puis position par numéro de ligne (tri stable)
+            left = np.searchsorted(keys, key, side='left')
+            right = np.searchsorted(keys, key, side='right')
+            position = left + np.searchsorted(order[left:right], row)
+            order = np.insert(order, position, row)
+        return order
+
+    def apply_delta(self, catalog, rows, version=None):
+        """Met à jour les classements après modification des lignes rows du catalogue (sans tout retrier)
+
+        Seuls le classement global et ceux des catégories touchées (ancienne et nouvelle) sont modifiés.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.intp))
+        if not len(rows):
+            return self
+        old_categories = {self._categories[row] for row in rows}
+
+        self._keys[rows] = -catalog.numeric(self.sort_column, rows).astype(np.float64)
+        if 'category' in catalog:
+            for row, category in zip(rows.tolist(), catalog.take('category', rows)):
+                self._categories[row] = category
+        new_categories = {self._categories[row] for row in rows}
+
+        self.global_order = self._reinsert(self.global_order, rows)
+        for category in old_categories | new_categories:
+            if not isinstance(category, str):
+                continue  # Catégorie manquante : présente seulement dans le classement global
+            members = [row for row in rows if self._categories[row] == category]
+            order = self.by_category.get(category, np.empty(0, dtype=np.intp))
+            order = order[~np.isin(order, rows)]
+            order = self._reinsert(order, members) if members else order
+            if len(order):
+                self.by_category[category] = order
+            else:
+                self.by_category.pop(category, None)
+
+        self.version = version or catalog.version
+        return self
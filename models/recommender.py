@@ -20,6 +20,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd  # Manipulation de données (DataFrames)
 import numpy as np   # Calculs numériques (vecteurs, matrices)
 import pickle  # Sauvegarde/chargement de modèles
+import re
+
+from models.catalog import CourseCatalog, csv_separator, extract_levels, file_hash  # Catalogue de service en colonnes (sans pandas)
+from models.course_lookup import CourseLookup  # Table course_id -> attributs codés (agrégation des clics)
+from models.hybrid_ranker import (  # Classement vectorisé du fil personnalisé de l'accueil
+    HybridRanker, REASON_SEARCH, REASON_CATEGORY, REASON_DISCOVER, REASON_POPULAR
+)
+from models.leaderboard import PopularityLeaderboard, advance_fingerprint, catalog_fingerprint  # Classements de popularité précalculés
+from models.catalog_metadata import CatalogMetadata  # Filtres et statistiques du catalogue (immuables)
+from models.course_json import CourseJsonFragments, RawJSON  # JSON des cours pré-encodé (réponses d'API)
 
 # Bibliothèques de Machine Learning
 from sklearn.feature_extraction.text import TfidfVectorizer  # Vectorisation de texte (TF-IDF)
@@ -34,6 +44,52 @@ TFIDF_NGRAM_RANGE = (1, 2)  # Unigrammes (1 mot) et bigrammes (2 mots)
 TFIDF_MIN_DF = 2  # Mot doit apparaître dans au moins 2 documents
 TFIDF_MAX_DF = 0.95  # Ignorer les mots trop fréquents (>95% des documents)
 
+# Colonnes du CSV lues au chargement et leur type (les colonnes absentes de cette liste ne sont pas lues)
+# 'category' : colonnes à faible cardinalité stockées en codes entiers (pd.Categorical)
+CATALOG_DTYPES = {
+    'id': 'int64',
+    'title': 'str',
+    'partner': 'category',
+    'rating': 'float64',
+    'metadata': 'category',
+    'link': 'str',
+    'category': 'category',
+    'source_domain': 'category',
+    'duration_hours': 'float64',
+    'title_clean': 'str',
+    'popularity_score': 'float64',
+    'price': 'category',
+}
+# Anciens noms de colonnes -> noms utilisés par l'application (renommage, sans copie)
+COLUMN_ALIASES = {
+    'id': 'course_id',  # ID du cours
+    'partner': 'instructor',  # Partenaire → Instructeur
+    'link': 'url',  # Lien → URL
+    'source_domain': 'platform',  # Domaine source → Plateforme
+    'title_clean': 'combined_text'  # Titre nettoyé → Texte combiné
+}
+# Version de la normalisation du catalogue : à incrémenter si CATALOG_DTYPES, COLUMN_ALIASES ou les colonnes
+# dérivées changent (les instantanés binaires existants sont alors ignorés)
+CATALOG_SCHEMA_VERSION = 1
+
+# Mots-clés du titre -> catégorie (la première catégorie dont un mot-clé apparaît l'emporte)
+TITLE_CATEGORY_KEYWORDS = {
+    'Data Science': ['data science', 'data analytics', 'data analysis', 'big data'],
+    'Machine Learning': ['machine learning', 'ml ', 'deep learning', 'neural network'],
+    'Programming': ['python', 'java', 'javascript', 'programming', 'coding', 'developer'],
+    'Web Development': ['web development', 'web design', 'html', 'css', 'react', 'angular', 'vue'],
+    'Business': ['business', 'management', 'marketing', 'finance', 'accounting', 'entrepreneurship'],
+    'Design': ['design', 'photoshop', 'illustrator', 'ui', 'ux', 'graphic'],
+    'IT & Software': ['software', 'cloud', 'aws', 'azure', 'devops', 'docker', 'kubernetes'],
+    'Health & Fitness': ['health', 'fitness', 'yoga', 'nutrition', 'medical', 'healthcare'],
+    'Personal Development': ['leadership', 'productivity', 'communication', 'career'],
+}
+
+
+def snapshot_path(filepath):
+    """Chemin de l'instantané binaire d'un CSV du catalogue (même nom, extension .npz)"""
+    return os.path.splitext(filepath)[0] + '.npz'
+
 
 # === CLASSE DE RECOMMANDATION ===
 class CourseRecommender:
@@ -41,122 +97,162 @@ class CourseRecommender:
     
     def __init__(self):
         """Initialiser le système de recommandation"""
-        self.df = None  # DataFrame contenant les cours
+        self.df = None  # DataFrame des cours pour l'entraînement (construit à la demande depuis le catalogue)
         self.tfidf_vectorizer = None  # Vectoriseur TF-IDF (texte → nombres)
         self.tfidf_matrix = None  # Matrice TF-IDF de tous les cours
         self.similarity_matrix = None  # Matrice de similarité entre tous les cours
         self.is_trained = False  # Indicateur si le modèle est entraîné
+        self.course_lookup = None  # Table course_id -> catégorie/niveau/plateforme (codes entiers)
+        self.hybrid_ranker = None  # Classement du fil personnalisé (construit à la demande)
+        self.leaderboard = None  # Classements de popularité (global et par catégorie)
+        self.catalog_version = None  # Empreinte du catalogue chargé, avancée à chaque update_courses
+        self.metadata = None  # Catégories, plateformes, niveaux et statistiques de cette version
+        self.course_json = None  # Fragments JSON pré-encodés de chaque cours
+        self.catalog = None  # Catalogue en colonnes servi aux requêtes (lignes, filtres, tris)
+        self.data_path = None  # CSV source du catalogue chargé
+        self.source_hash = None  # Empreinte du fichier CSV (validité de l'instantané binaire)
+        self.source_version = None  # Version du catalogue tel que lu (avant update_courses)
+        self.loaded_from_snapshot = False  # Catalogue chargé depuis l'instantané .npz plutôt que le CSV
         
     def load_data(self, filepath=None):
-        """Charger les données des cours depuis un fichier CSV"""
+        """Charger les données des cours : instantané binaire (.npz) s'il est à jour, sinon le fichier CSV"""
         if filepath is None:
             filepath = DATA_PATH  # Utiliser le chemin par défaut
             
         print(f"📂 Chargement des données : {filepath}")
         
         try:
-            # === LECTURE DU CSV ===
-            try:
-                # Essayer avec le séparateur par défaut (virgule)
-                self.df = pd.read_csv(filepath)
-            except:
-                # Si échec, essayer avec le point-virgule (format européen)
-                self.df = pd.read_csv(filepath, sep=';')
-            
-            # === STANDARDISATION DES NOMS DE COLONNES ===
-            # Mapper les anciens noms vers les nouveaux noms
-            column_mapping = {
-                'id': 'course_id',  # ID du cours
-                'partner': 'instructor',  # Partenaire → Instructeur
-                'link': 'url',  # Lien → URL
-                'source_domain': 'platform',  # Domaine source → Plateforme
-                'title_clean': 'combined_text'  # Titre nettoyé → Texte combiné
-            }
-            
-            # Appliquer le mapping si les colonnes existent
-            for old_col, new_col in column_mapping.items():
-                if old_col in self.df.columns and new_col not in self.df.columns:
-                    self.df[new_col] = self.df[old_col]
-            
-            # === CRÉATION DES COLONNES MANQUANTES ===
-            # S'assurer que course_id existe
-            if 'course_id' not in self.df.columns:
-                self.df['course_id'] = range(len(self.df))  # Créer des IDs (0, 1, 2, ...)
-            
-            # Créer la catégorie à partir du titre si elle n'existe pas
-            if 'category' not in self.df.columns:
-                self.df['category'] = self.df['title'].apply(self._extract_category_from_title)
-            
-            # Extraire le niveau à partir des métadonnées
-            if 'level' not in self.df.columns and 'metadata' in self.df.columns:
-                self.df['level'] = self.df['metadata'].apply(self._extract_level)
-            
-            # Définir le niveau par défaut s'il n'existe pas
-            if 'level' not in self.df.columns:
-                self.df['level'] = 'All Levels'  # Tous niveaux par défaut
-            
-            # Définir le prix (Coursera = Gratuit avec abonnement)
-            if 'price' not in self.df.columns:
-                self.df['price'] = 'Free'  # Gratuit par défaut
+            self.data_path = filepath
+            self.source_hash = file_hash(filepath)
             
-            # Mettre le nom de la plateforme en majuscule (Coursera, Udemy)
-            if 'platform' in self.df.columns:
-                self.df['platform'] = self.df['platform'].str.capitalize()
+            # === INSTANTANÉ BINAIRE ===
+            # Colonnes déjà normalisées : ni analyse du CSV ni colonnes dérivées à recalculer
+            catalog = CourseCatalog.load(snapshot_path(filepath), source=self.source_hash,
+                                         schema=CATALOG_SCHEMA_VERSION)
+            self.loaded_from_snapshot = catalog is not None
+            if catalog is not None:
+                self.catalog_version = catalog.version
+            else:
+                df = self._read_csv(filepath)
+                self.catalog_version = catalog_fingerprint(df)
+                catalog = CourseCatalog.from_dataframe(df, version=self.catalog_version)
+                
+            # Le catalogue en colonnes sert toutes les requêtes : le DataFrame n'est pas conservé
+            # (reconstruit par get_dataframe seulement pour l'entraînement)
+            self.catalog = catalog
+            self.df = None
+            self.source_version = self.catalog_version
+            self.course_lookup = None  # Sera reconstruite pour ce nouveau catalogue
+            self.hybrid_ranker = None
+            self.leaderboard = None  # Recalculé pour cette version du catalogue
+            self.metadata = CatalogMetadata.from_catalog(catalog, self.catalog_version)
+            self.course_json = CourseJsonFragments(catalog, version=self.catalog_version)
                 
-            print(f"   ✅ {len(self.df)} cours chargés")
+            source = 'instantané binaire' if self.loaded_from_snapshot else 'CSV'
+            print(f"   ✅ {len(catalog)} cours chargés ({source})")
             return True  # Succès
         except FileNotFoundError:
             print(f"   ❌ Fichier non trouvé : {filepath}")
             return False  # Échec
-    
-    def _extract_category_from_title(self, title):
-        """Extraire la catégorie du titre du cours"""
-        if pd.isna(title):
-            return 'General'
-        
-        title_lower = str(title).lower()
-        
-        # Dictionnaire de mots-clés pour les catégories
-        categories = {
-            'Data Science': ['data science', 'data analytics', 'data analysis', 'big data'],
-            'Machine Learning': ['machine learning', 'ml ', 'deep learning', 'neural network'],
-            'Programming': ['python', 'java', 'javascript', 'programming', 'coding', 'developer'],
-            'Web Development': ['web development', 'web design', 'html', 'css', 'react', 'angular', 'vue'],
-            'Business': ['business', 'management', 'marketing', 'finance', 'accounting', 'entrepreneurship'],
-            'Design': ['design', 'photoshop', 'illustrator', 'ui', 'ux', 'graphic'],
-            'IT & Software': ['software', 'cloud', 'aws', 'azure', 'devops', 'docker', 'kubernetes'],
-            'Health & Fitness': ['health', 'fitness', 'yoga', 'nutrition', 'medical', 'healthcare'],
-            'Personal Development': ['leadership', 'productivity', 'communication', 'career'],
-        }
-        
-        for category, keywords in categories.items():
-            for keyword in keywords:
-                if keyword in title_lower:
-                    return category
+            
+    def _read_csv(self, filepath):
+        """Lire et normaliser le CSV du catalogue (noms de colonnes, colonnes dérivées, types)"""
+        # === LECTURE DU CSV ===
+        # Seules les colonnes utiles sont lues, avec leur type déclaré (pas d'inférence) ;
+        # le séparateur (virgule ou point-virgule européen) est lu dans l'en-tête : une seule analyse
+        df = pd.read_csv(
+            filepath,
+            sep=csv_separator(filepath),
+            usecols=lambda column: column in CATALOG_DTYPES or column in COLUMN_ALIASES.values(),
+            dtype=CATALOG_DTYPES,
+        )
         
-        return 'General'
+        # === STANDARDISATION DES NOMS DE COLONNES ===
+        # Renommer les anciens noms vers les nouveaux (une seule colonne par donnée, pas de copie)
+        df = df.rename(columns={
+            old_col: new_col for old_col, new_col in COLUMN_ALIASES.items()
+            if old_col in df.columns and new_col not in df.columns
+        })
+        
+        # === CRÉATION DES COLONNES MANQUANTES ===
+        # S'assurer que course_id existe
+        if 'course_id' not in df.columns:
+            df['course_id'] = range(len(df))  # Créer des IDs (0, 1, 2, ...)
+        
+        # Créer la catégorie à partir du titre si elle n'existe pas
+        if 'category' not in df.columns:
+            df['category'] = self._extract_categories(df['title'])
+        
+        # Extraire le niveau à partir des métadonnées
+        if 'level' not in df.columns and 'metadata' in df.columns:
+            df['level'] = pd.Series(extract_levels(df['metadata']), index=df.index).astype('category')
+        
+        # Définir le niveau par défaut s'il n'existe pas
+        if 'level' not in df.columns:
+            df['level'] = 'All Levels'  # Tous niveaux par défaut
+        
+        # Définir le prix (Coursera = Gratuit avec abonnement)
+        if 'price' not in df.columns:
+            df['price'] = 'Free'  # Gratuit par défaut
+        
+        # Mettre le nom de la plateforme en majuscule (Coursera, Udemy)
+        if 'platform' in df.columns:
+            df['platform'] = df['platform'].str.capitalize().astype('category')
+        return df
+        
+    @staticmethod
+    def _dataframe_from_catalog(catalog):
+        """DataFrame du catalogue (mêmes colonnes et types que _read_csv) depuis le catalogue en colonnes"""
+        columns = {}
+        for column in catalog.columns:
+            kind = catalog.column_kind(column)
+            if kind == 'categorical':
+                columns[column] = pd.Categorical.from_codes(np.array(catalog.codes(column)),
+                                                            categories=list(catalog.categories(column)))
+            elif kind == 'numeric':
+                columns[column] = np.array(catalog.numeric(column))  # Copie modifiable
+            elif kind == 'string':
+                columns[column] = pd.array(catalog.take(column), dtype='str')
+            else:
+                columns[column] = catalog.take(column)  # Types mélangés : objets Python
+        return pd.DataFrame(columns)
+        
+    def get_dataframe(self):
+        """Obtenir le DataFrame des cours (entraînement), construit depuis le catalogue courant au premier appel"""
+        if self.df is None and self.catalog is not None:
+            self.df = self._dataframe_from_catalog(self.catalog)
+        return self.df
+        
+    def save_snapshot(self):
+        """Écrire l'instantané binaire du catalogue normalisé à côté du CSV (chargement rapide au démarrage)"""
+        catalog = self.get_catalog()
+        if catalog is None or self.catalog_version != self.source_version:
+            return False  # Rien de chargé, ou catalogue modifié depuis la lecture : ne correspond plus au CSV
+        path = snapshot_path(self.data_path)
+        catalog.save(path, source=self.source_hash, schema=CATALOG_SCHEMA_VERSION)
+        print(f"💾 Instantané du catalogue sauvegardé : {path}")
+        return True
+    
+    @staticmethod
+    def _extract_categories(titles):
+        """Extraire la catégorie de chaque titre (mots-clés de TITLE_CATEGORY_KEYWORDS, sinon 'General')"""
+        lowered = titles.fillna('').astype(str).str.lower()
+        conditions = [
+            lowered.str.contains('|'.join(map(re.escape, keywords)), na=False).to_numpy()
+            for keywords in TITLE_CATEGORY_KEYWORDS.values()
+        ]
+        categories = np.select(conditions, list(TITLE_CATEGORY_KEYWORDS), default='General')
+        return pd.Series(categories, index=titles.index).astype('category')
     
-    def _extract_level(self, metadata):
-        """Extraire le niveau de la chaîne de métadonnées"""
-        if pd.isna(metadata):
-            return 'All Levels'
-        metadata = str(metadata).lower()
-        if 'beginner' in metadata:
-            return 'Beginner'
-        elif 'intermediate' in metadata:
-            return 'Intermediate'
-        elif 'advanced' in metadata:
-            return 'Advanced'
-        return 'All Levels'
-            
     def prepare_data(self):
         """Préparer les données pour le modèle de recommandation"""
         print("🔄 Préparation des données...")
+        self.get_dataframe()  # DataFrame d'entraînement (le catalogue chargé n'en garde pas)
         
         # === CRÉATION DU TEXTE COMBINÉ ===
         # Combiner titre, catégorie et niveau en un seul texte pour TF-IDF
         if 'combined_text' not in self.df.columns or self.df['combined_text'].isna().any():
-            text_columns = ['title', 'category', 'level', 'partner']  # Colonnes à combiner
+            text_columns = ['title', 'category', 'level', 'instructor']  # Colonnes à combiner
             # Appliquer sur chaque ligne (row)
             self.df['combined_text'] = self.df.apply(
                 lambda row: ' '.join([str(row[col]) for col in text_columns if col in row.index and pd.notna(row[col])]),
@@ -223,202 +319,429 @@ class CourseRecommender:
         
         return True
         
+    def get_catalog(self):
+        """Obtenir le catalogue en colonnes (lecture seule) de la version courante (None si rien n'est chargé)"""
+        return self.catalog
+        
     def get_course_by_id(self, course_id):
         """Obtenir un cours par son ID"""
-        if self.df is None:
+        idx = self.get_course_index(course_id)
+        return None if idx is None else self.get_catalog().row(idx)
+        
+    def records(self, rows):
+        """Lignes du catalogue (positions) en dictionnaires, comme df.iloc[rows].to_dict('records')"""
+        return self.get_catalog().records(rows)
+        
+    def get_courses_by_ids(self, course_ids):
+        """Obtenir plusieurs cours par leurs IDs (même ordre, IDs inconnus ignorés)"""
+        catalog = self.get_catalog()
+        if catalog is None or not len(course_ids):
+            return []
+        rows = catalog.locate(course_ids)
+        return catalog.records(rows[rows >= 0])
+        
+    def get_course_lookup(self):
+        """Obtenir la table course_id -> attributs codés du catalogue chargé"""
+        if self.catalog is None:
             return None
-            
-        if 'course_id' in self.df.columns:
-            matches = self.df[self.df['course_id'] == course_id]
-            if len(matches) > 0:
-                return matches.iloc[0].to_dict()
-                
-        if course_id < len(self.df):
-            return self.df.iloc[course_id].to_dict()
-            
-        return None
+        if self.course_lookup is None:
+            self.course_lookup = CourseLookup.from_catalog(self.catalog)
+        return self.course_lookup
+        
+    def get_hybrid_ranker(self):
+        """Obtenir le classeur hybride (scores vectorisés) du catalogue chargé"""
+        if self.catalog is None:
+            return None
+        if self.hybrid_ranker is None:
+            self.hybrid_ranker = HybridRanker.from_catalog(self.catalog, self.get_course_lookup())
+        return self.hybrid_ranker
         
     def get_course_index(self, course_id):
         """Obtenir l'index du cours par son ID"""
-        if 'course_id' in self.df.columns:
-            matches = self.df[self.df['course_id'] == course_id]
-            if len(matches) > 0:
-                return matches.index[0]
+        catalog = self.get_catalog()
+        if catalog is None:
+            return None
+            
+        row = int(catalog.locate([course_id])[0])
+        if row >= 0:
+            return row
         
-        if course_id < len(self.df):
-            return course_id
+        if 0 <= course_id < len(catalog):
+            return int(course_id)  # Repli : l'ID est pris comme position
             
         return None
         
-    def recommend_similar(self, course_id, n=10):
-        """Recommander des cours similaires à un cours donné"""
+    @staticmethod
+    def similarity_percentages(scores):
+        """Similarités (0-1) en pourcentages arrondis à 0.1, comme affichés et renvoyés par l'API"""
+        return [round(score * 100, 1) for score in np.asarray(scores).tolist()]
+        
+    def _ranked_records(self, rows, scores):
+        """Cours (dictionnaires) avec leur score de similarité en % et leur rang (1, 2, 3, ...)"""
+        courses = self.records(rows)
+        for rank, (course, score) in enumerate(zip(courses, self.similarity_percentages(scores)), start=1):
+            course['similarity_score'] = score
+            course['rank'] = rank
+        return courses
+        
+    def similar_rows(self, course_id, n=10):
+        """Lignes des n cours les plus similaires à un cours et leurs similarités (0-1)"""
+        empty = (np.empty(0, dtype=np.intp), np.empty(0))
         # Vérifier si le modèle est entraîné
         if not self.is_trained:
-            return []  # Retourner liste vide si pas entraîné
+            return empty
             
         # === TROUVER L'INDEX DU COURS ===
         idx = self.get_course_index(course_id)
         if idx is None or idx >= len(self.similarity_matrix):
-            return []  # Cours non trouvé
+            return empty  # Cours non trouvé
             
-        # === CALCULER LES SCORES DE SIMILARITÉ ===
-        # enumerate : obtenir (index, score) pour chaque cours
-        sim_scores = list(enumerate(self.similarity_matrix[idx]))
-        # Trier par score de similarité (décroissant)
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        # Exclure le cours lui-même et garder les n meilleurs
-        sim_scores = [s for s in sim_scores if s[0] != idx][:n]
-        
-        # === CRÉER LA LISTE DES RECOMMANDATIONS ===
-        recommendations = []
-        for i, (course_idx, score) in enumerate(sim_scores):
-            # Récupérer les données du cours
-            course = self.df.iloc[course_idx].to_dict()
-            # Ajouter le score de similarité (en pourcentage)
-            course['similarity_score'] = round(score * 100, 1)
-            # Ajouter le rang (1, 2, 3, ...)
-            course['rank'] = i + 1
-            recommendations.append(course)
-            
-        return recommendations  # Retourner la liste des recommandations
+        # === TRIER PAR SIMILARITÉ ===
+        # Tri stable décroissant (à score égal, l'ordre du catalogue est conservé), sans le cours lui-même
+        sim_scores = np.asarray(self.similarity_matrix[idx])
+        order = np.argsort(-sim_scores, kind='stable')
+        order = order[order != idx][:n]
+        return order, sim_scores[order]
         
-    def recommend_by_query(self, query, n=10, filters=None):
-        """Recommander des cours basés sur une requête textuelle (recherche)"""
-        # Vérifier si le modèle est entraîné
-        if not self.is_trained:
-            return []  # Retourner liste vide si pas entraîné
-            
+    def recommend_similar(self, course_id, n=10):
+        """Recommander des cours similaires à un cours donné"""
+        return self._ranked_records(*self.similar_rows(course_id, n))
+        
+    def query_similarity(self, query):
+        """Similarité cosinus entre une requête et tous les cours (tableau aligné sur les lignes du catalogue)"""
         # === VECTORISER LA REQUÊTE ===
         # Transformer la requête en vecteur TF-IDF (même format que les cours)
         query_vector = self.tfidf_vectorizer.transform([query.lower()])
-        # Calculer la similarité entre la requête et tous les cours
-        sim_scores = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+        # Les lignes TF-IDF et la requête sont normalisées (L2) : le cosinus est un simple produit matrice-vecteur
+        sim_scores = np.asarray((self.tfidf_matrix @ query_vector.T).todense()).ravel()
         
         # === VÉRIFICATION DE SYNCHRONISATION ===
         # S'assurer que les scores correspondent au nombre de cours
-        if len(sim_scores) != len(self.df):
-            print(f"⚠️ Le modèle n'est pas synchronisé avec les données ({len(sim_scores)} vs {len(self.df)}). Utilisation de scores de repli.")
+        n_courses = len(self.catalog)
+        if len(sim_scores) != n_courses:
+            print(f"⚠️ Le modèle n'est pas synchronisé avec les données ({len(sim_scores)} vs {n_courses}). Utilisation de scores de repli.")
             # Ajuster les scores si désynchronisé
-            if len(sim_scores) < len(self.df):
+            if len(sim_scores) < n_courses:
                 # Remplir avec des zéros si le modèle est en retard
-                padded_scores = np.zeros(len(self.df))
+                padded_scores = np.zeros(n_courses)
                 padded_scores[:len(sim_scores)] = sim_scores
                 sim_scores = padded_scores
             else:
                 # Tronquer si le modèle est en avance
-                sim_scores = sim_scores[:len(self.df)]
-
-        # === FILTRAGE ===
-        results_df = self.df.copy()  # Copie du DataFrame
-        results_df['similarity_score'] = sim_scores  # Ajouter les scores
-        
-        # Appliquer les filtres si fournis
-        if filters:
-            if filters.get('platform'):  # Filtrer par plateforme (Coursera, Udemy)
-                results_df = results_df[results_df['platform'] == filters['platform']]
-            if filters.get('category'):  # Filtrer par catégorie
-                results_df = results_df[results_df['category'] == filters['category']]
-            if filters.get('level'):  # Filtrer par niveau
-                results_df = results_df[results_df['level'] == filters['level']]
+                sim_scores = sim_scores[:n_courses]
                 
+        return sim_scores
+        
+    def query_rows(self, query, n=10, filters=None):
+        """Lignes des n cours les plus proches d'une requête textuelle et leurs similarités (0-1)
+        
+        Filtres plateforme/catégorie/niveau appliqués via les codes du catalogue (pas de copie du DataFrame)
+        """
+        # Vérifier si le modèle est entraîné
+        if not self.is_trained:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+            
+        sim_scores = self.query_similarity(query)
+        rows = self.filter_rows(filters, search=False)
+        
         # === TRI ET SÉLECTION ===
-        # Trier par score de similarité (décroissant) et garder les n meilleurs
-        results_df = results_df.sort_values('similarity_score', ascending=False).head(n)
-        
-        # === CRÉATION DE LA LISTE DES RECOMMANDATIONS ===
-        recommendations = []
-        for i, (_, row) in enumerate(results_df.iterrows()):
-            course = row.to_dict()  # Convertir en dictionnaire
-            # Convertir le score en pourcentage
-            course['similarity_score'] = round(course['similarity_score'] * 100, 1)
-            course['rank'] = i + 1  # Ajouter le rang
-            recommendations.append(course)
+        # Trier par score de similarité (décroissant, tri stable) et garder les n meilleurs
+        order = rows[np.argsort(-sim_scores[rows], kind='stable')][:n]
+        return order, sim_scores[order]
+        
+    def recommend_by_query(self, query, n=10, filters=None):
+        """Recommander des cours basés sur une requête textuelle (recherche)"""
+        return self._ranked_records(*self.query_rows(query, n, filters))
+        
+    def get_leaderboard(self):
+        """Obtenir les classements de popularité de la version courante du catalogue (calculés une fois)"""
+        if self.catalog is None:
+            return None
+        if self.leaderboard is None or self.leaderboard.version != self.catalog_version:
+            self.leaderboard = PopularityLeaderboard(self.catalog, version=self.catalog_version)
+        return self.leaderboard
+        
+    def update_courses(self, updates):
+        """Appliquer des modifications au catalogue chargé : {course_id: {colonne: valeur}}
+        
+        Les classements de popularité sont mis à jour seulement pour les cours et catégories touchés.
+        Retourne le nombre de cours modifiés (les IDs inconnus sont ignorés).
+        """
+        catalog = self.get_catalog()
+        if catalog is None or not updates:
+            return 0
             
-        return recommendations  # Retourner la liste des recommandations
+        course_ids = list(updates)
+        rows = catalog.locate(course_ids)
+        changes, changed, cells = {}, [], []  # changes : colonne -> {ligne: valeur}
+        for course_id, row in zip(course_ids, rows):
+            if row < 0:
+                continue
+            for column, value in updates[course_id].items():
+                changes.setdefault(column, {})[int(row)] = value
+                cells.append((int(row), column, value))
+            changed.append(int(row))
+        if not changed:
+            return 0
+            
+        # Les structures dérivées des colonnes modifiées sont reconstruites à la demande
+        columns = set(changes)
+        if columns & {catalog.key, *CourseLookup.DIMENSIONS.values()}:
+            self.course_lookup = None  # Les détenteurs de l'ancienne table doivent rappeler get_course_lookup()
+        self.hybrid_ranker = None  # Notes alignées sur le catalogue
+        self.df = None  # DataFrame d'entraînement périmé : reconstruit depuis le catalogue si besoin
+        
+        # Version avancée d'après les seules cellules modifiées (le catalogue entier n'est pas rehaché)
+        self.catalog_version = advance_fingerprint(self.catalog_version, cells)
+        # Catalogue en lecture seule : nouvelle version où seules les cellules modifiées sont réécrites
+        catalog = self.catalog = catalog.update(changes, version=self.catalog_version)
+        if self.leaderboard is not None:
+            self.leaderboard.apply_delta(catalog, changed, version=self.catalog_version)
+        if self.course_json is not None and not columns - set(self.course_json.columns):
+            self.course_json.refresh(catalog, changed, version=self.catalog_version)
+        else:
+            self.course_json = None  # Nouvelle colonne : fragments reconstruits à la demande
+        return len(changed)
         
     def get_popular_courses(self, n=10, category=None):
-        """Obtenir les cours populaires"""
-        if self.df is None:
+        """Obtenir les cours populaires (tranche du classement précalculé)"""
+        leaderboard = self.get_leaderboard()
+        if leaderboard is None:
             return []
+        return self.records(leaderboard.top(n, category))
+        
+    def get_popular_course_ids(self, n=10, category=None):
+        """Obtenir les IDs des cours populaires (même ordre que get_popular_courses, sans dictionnaires)"""
+        leaderboard = self.get_leaderboard()
+        if leaderboard is None:
+            return np.empty(0, dtype=np.int64)
+        return self.get_catalog().numeric('course_id')[leaderboard.top(n, category)]
+        
+    def recommend_for_user(self, preferences, recent_searches):
+        """Fil personnalisé : candidats (recherches, catégories préférées, popularité) et scores de base
+        
+        Retourne {'course_ids': array, 'base_scores': array, 'reasons': [libellés]} ; le bruit aléatoire,
+        le bornage et la sélection des 20 meilleurs sont appliqués à l'affichage (HybridRanker.top)
+        """
+        ranker = self.get_hybrid_ranker()
+        if ranker is None:
+            return {'course_ids': np.empty(0, dtype=np.int64), 'base_scores': np.empty(0), 'reasons': []}
             
-        results_df = self.df.copy()
-        
-        if category:
-            results_df = results_df[results_df['category'] == category]
-            
-        if 'popularity_score' in results_df.columns:
-            results_df = results_df.sort_values('popularity_score', ascending=False)
+        # 1. Résultats des deux dernières recherches (intentions explicites)
+        sources = []
+        for query in recent_searches[:2]:
+            if query:
+                recs = self.recommend_by_query(query, n=3)
+                sources.append(([c['course_id'] for c in recs], REASON_SEARCH, query,
+                                [c['similarity_score'] for c in recs]))
+                
+        # 2. Cours populaires des catégories préférées, en proportion des clics (au moins 2 par catégorie)
+        cat_counts = preferences.get('categories', {})
+        if cat_counts:
+            sorted_cats = sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+            total_top_clicks = sum(count for cat, count in sorted_cats)
+            for cat, count in sorted_cats:
+                n_to_fetch = max(2, round(count / total_top_clicks * 20))
+                sources.append((self.get_popular_course_ids(n_to_fetch, cat), REASON_CATEGORY, cat, None))
+            candidates = ranker.collect(sources, cap=30)
         else:
-            results_df = results_df.sort_values('rating', ascending=False)
+            # Nouvel utilisateur sans clics : quelques catégories à découvrir
+            for cat in self.get_categories()[:3]:
+                sources.append((self.get_popular_course_ids(4, cat), REASON_DISCOVER, cat, None))
+            candidates = ranker.collect(sources)
+            
+        # 3. Complément avec les cours populaires si nécessaire
+        if len(candidates['course_ids']) < 15:
+            candidates = ranker.collect([(self.get_popular_course_ids(25), REASON_POPULAR, '', None)],
+                                        cap=25, candidates=candidates)
             
-        return results_df.head(n).to_dict('records')
+        return {
+            'course_ids': candidates['course_ids'],
+            'base_scores': ranker.base_scores(candidates, cat_counts),
+            'reasons': ranker.reason_texts(candidates),
+        }
+        
+    def catalog_rows(self, sort_by='rating', filters=None):
+        """Lignes des cours filtrés, triées par la colonne sort_by (décroissant, tri stable)"""
+        rows = self.filter_rows(filters)
+        catalog = self.get_catalog()
+        if catalog is not None and sort_by in catalog and len(rows):
+            rows = catalog.sort(sort_by, rows, descending=True)
+        return rows
         
     def get_all_courses(self, page=1, per_page=12, sort_by='rating', filters=None):
         """Obtenir tous les cours avec pagination"""
-        if self.df is None:
+        if self.catalog is None:
             return {'courses': [], 'total': 0, 'pages': 0}
             
-        results_df = self.df.copy()
-        
-        if filters:
-            if filters.get('platform'):
-                results_df = results_df[results_df['platform'] == filters['platform']]
-            if filters.get('category'):
-                results_df = results_df[results_df['category'] == filters['category']]
-            if filters.get('level'):
-                results_df = results_df[results_df['level'] == filters['level']]
-            if filters.get('search'):
-                search_term = filters['search'].lower()
-                results_df = results_df[
-                    results_df['title'].str.lower().str.contains(search_term, na=False)
-                ]
-                
-        if sort_by in results_df.columns:
-            results_df = results_df.sort_values(sort_by, ascending=False)
-            
-        total = len(results_df)
+        rows = self.catalog_rows(sort_by, filters)
+        total = len(rows)
         total_pages = (total + per_page - 1) // per_page
         start = (page - 1) * per_page
         end = start + per_page
         
         return {
-            'courses': results_df.iloc[start:end].to_dict('records'),
+            'courses': self.records(rows[start:end]),
             'total': total,
             'pages': total_pages,
             'current_page': page
         }
         
+    def filter_rows(self, filters=None, search=True):
+        """Lignes du catalogue (ordre d'origine) qui satisfont les filtres, via les codes du catalogue en colonnes
+        
+        search=False ignore le filtre texte sur le titre (comme recommend_by_query)
+        """
+        catalog = self.get_catalog()
+        if catalog is None:
+            return np.empty(0, dtype=np.intp)
+            
+        filters = filters or {}
+        rows = catalog.filter({column: filters[column] for column in CourseLookup.DIMENSIONS.values()
+                               if filters.get(column)})
+        
+        if search and filters.get('search') and len(rows):
+            rows = catalog.contains('title', filters['search'].lower(), rows, case=False)
+        return rows
+        
+    def rank_course_ids(self, query, filters=None, rng=None):
+        """Tri « recommandation » du catalogue : tous les cours filtrés classés par pertinence pour un profil
+        
+        query : profil textuel de l'utilisateur (recherches + catégories) ; vide -> ordre aléatoire (découverte)
+        Retourne {'course_ids': array, 'scores': array ou None} (scores en %, None pour l'ordre aléatoire)
+        """
+        rng = rng or np.random
+        rows = self.filter_rows(filters)
+        scores = None
+        
+        if query.strip() and self.is_trained and len(rows):
+            sim_pct = np.round(self.query_similarity(query) * 100, 1)  # Similarité en % (comme recommend_by_query)
+            # Normalisation par le meilleur score du catalogue filtré (hors recherche), avec un seuil minimal
+            # pour éviter de booster du bruit
+            max_sim = max(float(sim_pct[self.filter_rows(filters, search=False)].max()), 0.1)
+            
+            raw_sim = sim_pct[rows]
+            raw_sim[raw_sim < 0.01] = 0  # Score trop faible : considéré comme nul
+            catalog = self.get_catalog()
+            ratings = np.nan_to_num(catalog.numeric('rating', rows).astype(np.float64), nan=0.0) \
+                if 'rating' in catalog else np.zeros(len(rows))
+            
+            # Score = Base 50 + (sqrt(Normalisé) * 40) + (Bonus Note) + petit facteur aléatoire
+            # La racine carrée remonte les scores moyens vers le haut
+            rating_bonus = np.where(ratings > 3.0, (ratings - 3.0) * 3, 0.0)
+            scaled = 50 + np.sqrt(raw_sim / max_sim) * 40 + rating_bonus + rng.uniform(-1.5, 1.5, len(rows))
+            scores = np.where(raw_sim > 0, np.round(np.clip(scaled, 40.0, 99.5), 1), 0.0)
+            
+            # Tri par score décroissant ; à score égal, meilleure note d'abord
+            order = np.lexsort((-ratings, -scores))
+            scores = scores[order]
+        else:
+            # Repli : ordre aléatoire si pas d'historique utilisateur (découverte, « Serendipity »)
+            order = rng.permutation(len(rows))
+            
+        course_ids = self.get_catalog().numeric('course_id', rows[order]) if len(rows) else np.empty(0, dtype=np.int64)
+        return {'course_ids': course_ids, 'scores': scores}
+        
+    def page_of_ranking(self, ranking, page=1, per_page=12):
+        """Une page d'un classement (rank_course_ids) : seules ses lignes sont converties en dictionnaires"""
+        total = len(ranking['course_ids'])
+        start = max((page - 1) * per_page, 0)
+        end = max(start + per_page, 0) if page > 0 else 0
+        courses = self.get_courses_by_ids(ranking['course_ids'][start:end])
+        if ranking['scores'] is not None:
+            for course, score in zip(courses, ranking['scores'][start:end]):
+                course['similarity_score'] = float(score)
+                
+        return {
+            'courses': courses,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page
+        }
+        
+    def rank_courses(self, query, page=1, per_page=12, filters=None, rng=None):
+        """Une page du tri « recommandation » (classement recalculé à chaque appel)"""
+        if self.catalog is None:
+            return {'courses': [], 'total': 0, 'pages': 0}
+        return self.page_of_ranking(self.rank_course_ids(query, filters, rng), page, per_page)
+        
+    def get_metadata(self):
+        """Obtenir les métadonnées (immuables) de la version courante du catalogue"""
+        if self.catalog is None:
+            return None
+        if self.metadata is None or self.metadata.version != self.catalog_version:
+            self.metadata = CatalogMetadata.from_catalog(self.catalog, self.catalog_version)
+        return self.metadata
+        
+    def get_course_json(self):
+        """Obtenir les fragments JSON pré-encodés de la version courante du catalogue"""
+        if self.catalog is None:
+            return None
+        if self.course_json is None or self.course_json.version != self.catalog_version:
+            self.course_json = CourseJsonFragments(self.get_catalog(), version=self.catalog_version)
+        return self.course_json
+        
+    def courses_json(self, rows, scores=None):
+        """Tableau JSON (octets) des cours rows ; avec des similarités (0-1), ajoute score en % et rang"""
+        fragments = self.get_course_json()
+        if fragments is None:
+            return RawJSON(b'[]')
+        return fragments.courses(rows, None if scores is None else self.similarity_percentages(scores))
+        
+    def get_learning_path(self, category):
+        """Parcours d'apprentissage d'une catégorie : le cours le mieux noté de chaque niveau (Débutant → Avancé)
+        
+        Même sélection que CourseClustering.get_learning_path, servie par le catalogue en colonnes
+        """
+        catalog = self.get_catalog()
+        if catalog is None or 'category' not in catalog or 'level' not in catalog:
+            return []
+            
+        # Catégories qui contiennent le texte demandé (insensible à la casse)
+        rows = catalog.contains('category', category, case=False)
+        path = []
+        for level in ['Beginner', 'Intermediate', 'Advanced']:
+            level_rows = catalog.filter({'level': level}, rows)
+            if not len(level_rows):
+                continue
+            # Meilleure note du niveau (à note égale, premier dans l'ordre du catalogue)
+            if 'rating' in catalog:
+                level_rows = catalog.sort('rating', level_rows, descending=True)
+            course = catalog.row(level_rows[0])
+            path.append({
+                'step': len(path) + 1,  # Numéro de l'étape (1, 2, 3)
+                'level': level,
+                'course_id': int(course.get('course_id', 0)),
+                'title': str(course['title']),
+                'rating': float(course.get('rating', 0)),
+                'duration': float(course.get('duration_hours', 0)),
+                'category': category
+            })
+        return path
+        
     def get_categories(self):
         """Obtenir la liste des catégories"""
-        if self.df is None:
+        if self.catalog is None:
             return []
-        return sorted(self.df['category'].dropna().unique().tolist())
+        return list(self.get_metadata().categories)
         
     def get_platforms(self):
         """Obtenir la liste des plateformes"""
-        if self.df is None:
+        if self.catalog is None:
             return []
-        return self.df['platform'].dropna().unique().tolist()
+        return list(self.get_metadata().platforms)
         
     def get_levels(self):
         """Obtenir la liste des niveaux"""
-        if self.df is None:
+        if self.catalog is None:
             return []
-        return self.df['level'].dropna().unique().tolist()
+        return list(self.get_metadata().levels)
         
     def get_stats(self):
         """Obtenir les statistiques du jeu de données"""
-        if self.df is None:
+        if self.catalog is None:
             return {}
-            
-        return {
-            'total_courses': len(self.df),
-            'platforms': self.df['platform'].value_counts().to_dict() if 'platform' in self.df.columns else {},
-            'categories': self.df['category'].value_counts().to_dict() if 'category' in self.df.columns else {},
-            'levels': self.df['level'].value_counts().to_dict() if 'level' in self.df.columns else {},
-            'avg_rating': round(self.df['rating'].mean(), 2) if 'rating' in self.df.columns else 0,
-            'free_courses': len(self.df),
-        }
+        return self.get_metadata().stats_dict()
         
     def save_model(self, filepath='models/recommender.pkl'):
         """Sauvegarder le modèle"""
@@ -448,10 +771,10 @@ class CourseRecommender:
             self.tfidf_matrix = model_data['tfidf_matrix']
             self.similarity_matrix = model_data['similarity_matrix']
             
-            # Vérifier la cohérence avec self.df s'il existe
-            if self.df is not None:
-                if self.tfidf_matrix.shape[0] != len(self.df):
-                    print(f"⚠️ Le modèle à {filepath} n'est pas synchronisé avec les données : matrice {self.tfidf_matrix.shape[0]} lignes, CSV {len(self.df)} lignes.")
+            # Vérifier la cohérence avec le catalogue s'il est chargé
+            if self.catalog is not None:
+                if self.tfidf_matrix.shape[0] != len(self.catalog):
+                    print(f"⚠️ Le modèle à {filepath} n'est pas synchronisé avec les données : matrice {self.tfidf_matrix.shape[0]} lignes, CSV {len(self.catalog)} lignes.")
                     return False
                     
             self.is_trained = True
@@ -466,6 +789,7 @@ if __name__ == "__main__":
     recommender = CourseRecommender()
     if recommender.train():
         recommender.save_model()
+        recommender.save_snapshot()  # Catalogue normalisé en .npz : chargement rapide côté serveur
         
         # Test
         recs = recommender.recommend_by_query("python programming", n=5)
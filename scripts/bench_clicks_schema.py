@@ -0,0 +1,145 @@
+"""
+Benchmark : ancienne table clicks (attributs texte copiés) vs table compacte (user_id, course_id, timestamp)
+Compare la taille du fichier SQLite et le temps d'agrégation des préférences d'un utilisateur actif.
+
+Usage : python scripts/bench_clicks_schema.py [n_clicks] [n_users]
+"""
+
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models.course_lookup import CourseLookup
+
+N_COURSES = 2000
+CATEGORIES = [f'Category {i}' for i in range(40)]
+LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'All Levels']
+PLATFORMS = ['Coursera', 'Udemy']
+BATCH = 200_000
+
+
+def synthetic_catalog(rng):
+    course_ids = np.arange(1, N_COURSES + 1)
+    return course_ids, {
+        'title': [f'Synthetic course number {i} about some topic' for i in course_ids],
+        'category': [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), N_COURSES)],
+        'level': [LEVELS[i] for i in rng.integers(0, len(LEVELS), N_COURSES)],
+        'platform': [PLATFORMS[i] for i in rng.integers(0, len(PLATFORMS), N_COURSES)],
+    }
+
+
+def synthetic_clicks(rng, n_clicks, n_users):
+    """Génère les clics par lots ; l'utilisateur 1 est un utilisateur très actif (~1 % des clics)"""
+    ts0 = int(time.time()) - 180 * 86400
+    for start in range(0, n_clicks, BATCH):
+        size = min(BATCH, n_clicks - start)
+        users = rng.integers(2, n_users + 1, size)
+        users[rng.random(size) < 0.01] = 1
+        courses = rng.integers(1, N_COURSES + 1, size)
+        ts = ts0 + np.sort(rng.integers(0, 180 * 86400, size))
+        yield users, courses, ts
+
+
+def build_legacy(path, catalog, clicks):
+    course_ids, cols = catalog
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE clicks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL, course_id INTEGER NOT NULL,
+            course_title TEXT, category TEXT, level TEXT, platform TEXT,
+            timestamp INTEGER NOT NULL
+        )
+    ''')
+    for users, courses, ts in clicks:
+        idx = courses - 1
+        conn.executemany('INSERT INTO clicks (user_id, course_id, course_title, category, level, platform, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)', (
+            (int(u), int(c), cols['title'][i], cols['category'][i], cols['level'][i], cols['platform'][i], int(t))
+            for u, c, i, t in zip(users, courses, idx, ts)
+        ))
+        conn.commit()
+    conn.execute('CREATE INDEX idx_clicks_user_ts ON clicks (user_id, timestamp)')
+    conn.execute('CREATE INDEX idx_clicks_user_category ON clicks (user_id, category)')
+    conn.commit()
+    return conn
+
+
+def build_compact(path, clicks):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE clicks (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL, course_id INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL
+        )
+    ''')
+    for users, courses, ts in clicks:
+        conn.executemany('INSERT INTO clicks (user_id, course_id, timestamp) VALUES (?, ?, ?)',
+                         zip(users.tolist(), courses.tolist(), ts.tolist()))
+        conn.commit()
+    conn.execute('CREATE INDEX idx_clicks_user_ts ON clicks (user_id, timestamp)')
+    conn.commit()
+    return conn
+
+
+def aggregate_legacy(conn, user_id):
+    prefs = {}
+    for dimension, column in CourseLookup.DIMENSIONS.items():
+        rows = conn.execute(f'''
+            SELECT {column}, COUNT(*) AS count FROM clicks
+            WHERE user_id = ? AND {column} IS NOT NULL
+            GROUP BY {column} ORDER BY count DESC
+        ''', (user_id,)).fetchall()
+        prefs[dimension] = dict(rows)
+    return prefs
+
+
+def aggregate_compact(conn, lookup, user_id):
+    rows = conn.execute('SELECT course_id, COUNT(*) FROM clicks WHERE user_id = ? GROUP BY course_id', (user_id,)).fetchall()
+    ids, counts = zip(*rows) if rows else ((), ())
+    return lookup.aggregate(ids, counts)
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    n_clicks = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    catalog = synthetic_catalog(np.random.default_rng(0))
+    lookup = CourseLookup(catalog[0], catalog[1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        compact_path = os.path.join(tmp, 'compact.db')
+
+        print(f"Building synthetic databases with {n_clicks:,} clicks ({n_users:,} users)...")
+        legacy = build_legacy(legacy_path, catalog, synthetic_clicks(np.random.default_rng(1), n_clicks, n_users))
+        compact = build_compact(compact_path, synthetic_clicks(np.random.default_rng(1), n_clicks, n_users))
+
+        legacy_time, legacy_prefs = best_of(lambda: aggregate_legacy(legacy, 1))
+        compact_time, compact_prefs = best_of(lambda: aggregate_compact(compact, lookup, 1))
+        assert legacy_prefs == compact_prefs, "Les deux agrégations doivent être identiques"
+
+        heavy_clicks = sum(legacy_prefs['platforms'].values())
+        print(f"\n{'':<10}{'file size':>14}{'aggregation (user 1, ' + format(heavy_clicks, ',') + ' clicks)':>44}")
+        for name, path, seconds in [('legacy', legacy_path, legacy_time), ('compact', compact_path, compact_time)]:
+            print(f"{name:<10}{os.path.getsize(path) / 1e6:>11.1f} MB{seconds * 1000:>41.1f} ms")
+        legacy.close()
+        compact.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark : sérialisation des réponses d'API qui renvoient des cours
+Compare l'ancien chemin (lignes -> dictionnaires -> jsonify) aux fragments JSON pré-encodés
+(models/course_json.py) sur les formes de réponse de /api/search, /api/recommend, /api/courses
+et /api/popular : débit (Mo/s), latence moyenne et p99 par réponse.
+
+Usage : python scripts/bench_course_json.py [iterations]
+"""
+
+import sys
+import os
+import json
+import math
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask, jsonify
+
+from models.recommender import CourseRecommender
+from models.course_json import CourseJsonFragments, encode_object
+
+QUERIES = ['python', 'machine learning', 'data science', 'web development', 'marketing', 'excel']
+
+
+def legacy_records(recommender, rows, scores=None):
+    """Ancien chemin : to_dict par ligne, puis score et rang ajoutés à chaque dictionnaire"""
+    courses = recommender.get_dataframe().iloc[rows].to_dict('records')
+    if scores is not None:
+        for rank, (course, score) in enumerate(zip(courses, scores.tolist()), start=1):
+            course['similarity_score'] = round(score * 100, 1)
+            course['rank'] = rank
+    return courses
+
+
+def workloads(recommender, iterations):
+    """Réponses à encoder : (endpoint, champs simples, clé de la liste de cours, lignes, similarités)"""
+    rng = np.random.default_rng(0)
+    cases = []
+    for k in range(iterations):
+        query = QUERIES[k % len(QUERIES)]
+        rows, scores = recommender.query_rows(query, 20)
+        cases.append(('search', {'query': query, 'count': len(rows)}, 'recommendations', rows, scores))
+
+        course_ids = recommender.get_catalog().numeric('course_id')
+        course_id = int(course_ids[rng.integers(len(course_ids))])
+        rows, scores = recommender.similar_rows(course_id, 6)
+        cases.append(('recommend', {'course_id': course_id, 'count': len(rows)}, 'recommendations', rows, scores))
+
+        rows = recommender.catalog_rows('rating')
+        page = int(rng.integers(1, 10))
+        page_rows = rows[(page - 1) * 20:page * 20]
+        cases.append(('courses', {'total': len(rows), 'pages': (len(rows) + 19) // 20, 'current_page': page},
+                      'courses', page_rows, None))
+
+        rows = recommender.get_leaderboard().top(10)
+        cases.append(('popular', {'count': len(rows)}, 'courses', rows, None))
+    return cases
+
+
+def normalize(value):
+    """NaN -> None (l'ancien chemin émettait NaN, invalide en JSON standard)"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    return value
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    recommender = CourseRecommender()
+    recommender.load_data()
+    if not recommender.load_model():
+        recommender.train()
+
+    app = Flask(__name__)
+    app.json.compact = True  # Comme en production (FLASK_DEBUG désactivé)
+
+    start = time.perf_counter()
+    CourseJsonFragments(recommender.get_catalog())  # Coût unique au chargement du catalogue
+    print(f"Fragments built for {len(recommender.get_catalog())} courses in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    cases = workloads(recommender, iterations)
+    results = {}
+    with app.app_context():
+        for name, fields, key, rows, scores in cases:
+            t0 = time.perf_counter()
+            old_body = jsonify({**fields, key: legacy_records(recommender, rows, scores)}).get_data()
+            t1 = time.perf_counter()
+            new_body = encode_object(**fields, **{key: recommender.courses_json(rows, scores)})
+            t2 = time.perf_counter()
+
+            if normalize(json.loads(old_body)) != json.loads(new_body):
+                raise AssertionError(f"{name}: pre-encoded response differs from jsonify")
+            stats = results.setdefault(name, {'old': [], 'new': [], 'bytes': 0})
+            stats['old'].append(t1 - t0)
+            stats['new'].append(t2 - t1)
+            stats['bytes'] += len(new_body)
+
+    print(f"{'endpoint':<10} {'mean old':>10} {'mean new':>10} {'p99 old':>10} {'p99 new':>10}"
+          f" {'MB/s old':>9} {'MB/s new':>9} {'speedup':>8}")
+    for name, stats in results.items():
+        old, new = np.array(stats['old']), np.array(stats['new'])
+        megabytes = stats['bytes'] / 1e6
+        print(f"{name:<10} {old.mean() * 1e6:>8.0f}us {new.mean() * 1e6:>8.0f}us"
+              f" {np.percentile(old, 99) * 1e6:>8.0f}us {np.percentile(new, 99) * 1e6:>8.0f}us"
+              f" {megabytes / old.sum():>9.1f} {megabytes / new.sum():>9.1f} {old.mean() / new.mean():>7.1f}x")
+    print("\nAll responses decode to the same JSON (NaN now encoded as null).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark : nettoyage des textes et normalisation des catégories/niveaux (utils/data_cleaner.py)
+Compare l'ancien chemin (re.sub successifs et boucle sur les mappings, ligne par ligne via .apply)
+aux opérations vectorisées sur motifs précompilés, sur un catalogue synthétique : débit (lignes/s)
+par étape, et vérification que les colonnes produites sont identiques.
+
+Usage : python scripts/bench_data_cleaner.py [lignes]
+"""
+
+import sys
+import os
+import re
+import io
+import time
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from utils.data_cleaner import DataCleaner
+
+WORDS = ['Python', 'data', 'science', 'machine', 'learning', 'for', 'everybody', 'Développement', 'web',
+         'cloud', 'AWS', 'security', 'marketing', 'finance', 'introduction', 'to', 'advanced', '&amp;',
+         '<b>new</b>', 'café', '—', '2024', 'course', 'bootcamp', 'Deep', 'networks', '\xa0', 'SQL']
+CATEGORIES = ['Data Science', 'data-science', 'Machine Learning', 'ML Ops', 'Artificial Intelligence',
+              'Cyber Security', 'Business Strategy', 'Digital Marketing', 'Cooking', 'Photography',
+              'Web-Development', 'AI basics', 'Personal Development', 'Music Theory', 'Health']
+LEVELS = ['Beginner', 'Débutant', 'Intermediate', 'Expert level', 'All Levels', 'Mixed', 'Introductory',
+          'Beginner Level', 'Advanced', 'Not specified']
+
+
+def synthetic_catalog(rows, seed=0):
+    """Titres et descriptions bruités (entités, balises, non-ASCII), catégories et niveaux variés"""
+    rng = np.random.default_rng(seed)
+
+    def texts(low, high, missing):
+        vocabulary = np.array(WORDS, dtype=object)
+        lengths = rng.integers(low, high, rows)
+        words = rng.choice(vocabulary, lengths.sum())
+        values = [' '.join(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])]
+        return [None if drop else value for value, drop in zip(values, rng.random(rows) < missing)]
+
+    # Quelques dizaines de catégories distinctes (avec variantes), comme un export multi-plateformes
+    categories = [f"{rng.choice(CATEGORIES)} {suffix}" if suffix else str(rng.choice(CATEGORIES))
+                  for suffix in rng.choice(['', '', 'I', 'II', 'Essentials', 'for Beginners'], 300)]
+    return pd.DataFrame({
+        'title': texts(1, 8, 0.01),
+        'description': texts(0, 30, 0.2),
+        'category': pd.Series(rng.choice(np.array(categories + [None], dtype=object), rows)),
+        'level': pd.Series(rng.choice(np.array(LEVELS + [None], dtype=object), rows)),
+    }).astype('str')
+
+
+def legacy_clean_text(text):
+    """Ancien clean_text : quatre re.sub par texte"""
+    if pd.isna(text) or not isinstance(text, str):
+        return ''
+    text = re.sub(r'&[a-z]+;', ' ', text)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\x00-\x7F\xC0-\xFF]+', ' ', text)
+    return text.strip()
+
+
+def legacy_mapping(mapping, fallback):
+    """Ancienne normalisation : chaque clé du mapping testée sur chaque ligne"""
+    def normalize(value):
+        if pd.isna(value):
+            return fallback(None)
+        lower = str(value).lower().strip()
+        for key, mapped in mapping.items():
+            if key in lower:
+                return mapped
+        return fallback(value)
+    return normalize
+
+
+def legacy_steps(df):
+    """Anciennes étapes, colonne par colonne"""
+    def descriptions():
+        frame = pd.DataFrame({'title': df['title'], 'description': df['description'].apply(legacy_clean_text)})
+        return frame.apply(
+            lambda x: x['title'] if pd.isna(x['description']) or x['description'] == '' else x['description'],
+            axis=1)
+    return {
+        'titles': lambda: df['title'].apply(legacy_clean_text),
+        'descriptions': descriptions,
+        'categories': lambda: df['category'].apply(legacy_mapping(
+            DataCleaner.CATEGORY_MAPPING, lambda cat: cat.title() if isinstance(cat, str) else 'Other')),
+        'levels': lambda: df['level'].apply(legacy_mapping(DataCleaner.LEVEL_MAPPING, lambda level: 'All Levels')),
+    }
+
+
+def current_steps(df):
+    """Étapes actuelles de DataCleaner, sur une copie du catalogue à chaque mesure"""
+    def run(method, column):
+        def step():
+            cleaner = DataCleaner(df.copy(), verbose=False)
+            getattr(cleaner, method)()
+            return cleaner.df[column]
+        return step
+    return {
+        'titles': lambda: DataCleaner(verbose=False).clean_text_series(df['title']),
+        'descriptions': run('clean_descriptions', 'description'),
+        'categories': run('normalize_categories', 'category'),
+        'levels': run('normalize_levels', 'level'),
+    }
+
+
+def timed(step):
+    start = time.perf_counter()
+    result = step()
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    print(f"Generating {rows} synthetic courses...")
+    df = synthetic_catalog(rows)
+    print(f"  {df['category'].nunique()} distinct categories, {df['level'].nunique()} distinct levels\n")
+
+    legacy, current = legacy_steps(df), current_steps(df)
+    print(f"{'step':<14} {'old':>9} {'new':>9} {'old rows/s':>12} {'new rows/s':>12} {'speedup':>8}")
+    total_old = total_new = 0.0
+    for name in legacy:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected, old = timed(legacy[name])
+            result, new = timed(current[name])
+        if expected.tolist() != result.tolist():
+            raise AssertionError(f"{name}: vectorized result differs from the legacy path")
+        total_old, total_new = total_old + old, total_new + new
+        print(f"{name:<14} {old:>8.2f}s {new:>8.2f}s {rows / old:>12,.0f} {rows / new:>12,.0f} {old / new:>7.1f}x")
+    print(f"{'total':<14} {total_old:>8.2f}s {total_new:>8.2f}s {rows / total_old:>12,.0f}"
+          f" {rows / total_new:>12,.0f} {total_old / total_new:>7.1f}x")
+    print("\nAll steps produce identical columns.")
+
+
+if __name__ == "__main__":
+    main()
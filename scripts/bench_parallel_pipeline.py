@@ -0,0 +1,98 @@
+"""
+Benchmark : nettoyage et feature engineering en parallèle (utils/parallel.py)
+Exécute DataCleaner.clean_all puis FeatureEngineer.engineer_all sur un catalogue brut synthétique avec
+n_jobs = 1, 2, 4, ... jusqu'au nombre de cœurs : durée, accélération par rapport à la série, et
+vérification que les CSV produits sont identiques octet pour octet à ceux de l'exécution en série.
+
+Usage : python scripts/bench_parallel_pipeline.py [lignes]
+"""
+
+import sys
+import os
+import io
+import time
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from utils.data_cleaner import DataCleaner
+from utils.feature_engineering import FeatureEngineer
+
+WORDS = ['Python', 'data', 'science', 'machine', 'learning', 'for', 'everybody', 'Développement', 'web',
+         'cloud', 'AWS', 'security', 'marketing', 'finance', 'introduction', 'to', 'advanced', '&amp;',
+         '<b>new</b>', 'café', '—', '2024', 'course', 'https://example.com/x', 'Deep', 'networks', 'SQL']
+CATEGORIES = ['Data Science', 'data-science', 'Machine Learning', 'ML Ops', 'Artificial Intelligence',
+              'Cyber Security', 'Business Strategy', 'Digital Marketing', 'Cooking', 'Photography', None]
+LEVELS = ['Beginner', 'Débutant', 'Intermediate', 'Expert level', 'All Levels', 'Mixed', None]
+PRICES = ['Free', '19.99$', 'Subscription', 'gratuit', 'Paid', None, '0', '$49', 'abonnement mensuel']
+REVIEWS = ['1,234', '2.5k', '1M', '12 reviews', None, 'abc', '42']
+
+
+def synthetic_raw_catalog(rows, seed=0):
+    """Catalogue brut au format de config.DATASET_COLUMNS (doublons, valeurs manquantes, HTML, ...)"""
+    rng = np.random.default_rng(seed)
+
+    def texts(low, high, missing):
+        lengths = rng.integers(low, high, rows)
+        words = rng.choice(np.array(WORDS, dtype=object), lengths.sum())
+        values = [' '.join(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])]
+        return [None if drop else value for value, drop in zip(values, rng.random(rows) < missing)]
+
+    def pick(values):
+        return rng.choice(np.array(values, dtype=object), rows)
+
+    titles = texts(2, 9, 0.01)
+    for row in rng.choice(rows, rows // 10):
+        titles[row] = titles[rng.integers(rows)]  # Doublons
+    return pd.DataFrame({
+        'title': titles,
+        'description': texts(0, 40, 0.2),
+        'category': pick(CATEGORIES),
+        'level': pick(LEVELS),
+        'rating': pick(['4,5', '3.2', '9', None, 'x', '4.7']),
+        'num_reviews': pick(REVIEWS),
+        'price': pick(PRICES),
+        'platform': pick(['Coursera', 'Udemy', None]),
+        'skills': texts(0, 6, 0.3),
+        'instructor': pick(['Andrew Ng', 'IBM', None]),
+        'language': pick(['English', 'French', None]),
+        'url': [f'https://example.com/course/{row}' for row in range(rows)],
+    })
+
+
+def run_pipeline(raw, n_jobs):
+    """Nettoyage puis feature engineering ; renvoie la durée et les deux CSV produits"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        cleaner = DataCleaner(raw.copy()).clean_all(n_jobs=n_jobs)
+        clean_csv = cleaner.df.to_csv(index=False)
+        engineer = FeatureEngineer(cleaner.df).engineer_all(n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+    return elapsed, clean_csv, engineer.df.to_csv(index=False)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    cores = os.cpu_count() or 1
+    jobs = [1] + [2 ** k for k in range(1, max(cores, 2).bit_length()) if 2 ** k <= max(cores, 2)]
+
+    print(f"Generating {rows} raw courses ({cores} CPU cores available)...\n")
+    raw = synthetic_raw_catalog(rows)
+
+    print(f"{'n_jobs':>6} {'time':>9} {'speedup':>8}  output")
+    serial = None
+    for n_jobs in jobs:
+        elapsed, clean_csv, features_csv = run_pipeline(raw, n_jobs)
+        if serial is None:
+            serial = (elapsed, clean_csv, features_csv)
+        elif (clean_csv, features_csv) != serial[1:]:
+            raise AssertionError(f"n_jobs={n_jobs}: output differs from the serial run")
+        print(f"{n_jobs:>6} {elapsed:>8.2f}s {serial[0] / elapsed:>7.1f}x  "
+              f"{'serial' if n_jobs == 1 else 'identical to serial'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark : moteurs de stockage de UserManager (SQLite vs mémoire)
+Même charge (inscriptions, clics, recherches, favoris, profils) sur chaque moteur, pour séparer
+le coût des E/S disque de celui de l'application web et du recommandeur.
+
+Usage : python scripts/bench_storage.py [n_users] [n_events]
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from user_manager import UserManager
+
+CATEGORIES = [f'Category {i}' for i in range(40)]
+LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'All Levels']
+PLATFORMS = ['Coursera', 'Udemy']
+N_COURSES = 2000
+
+
+def run(backend, db_path, n_users, n_events, seed=0):
+    rng = np.random.default_rng(seed)
+    manager = UserManager(db_path, use_event_queue=True, backend=backend)
+    timings = {}
+
+    start = time.perf_counter()
+    user_ids = []
+    for i in range(n_users):
+        manager.register(f'user{i}', f'user{i}@bench.local', 'password')
+        user_ids.append(manager.get_user_id(f'user{i}'))
+    timings['register'] = time.perf_counter() - start
+
+    users = rng.integers(0, n_users, n_events)
+    courses = rng.integers(1, N_COURSES + 1, n_events)
+    start = time.perf_counter()
+    for k in range(n_events):
+        user_id = user_ids[users[k]]
+        course_id = int(courses[k])
+        if k % 4 == 0:
+            manager.track_search(user_id, f'query {course_id % 50}')
+        else:
+            manager.track_click(user_id, {
+                'course_id': course_id,
+                'category': CATEGORIES[course_id % len(CATEGORIES)],
+                'level': LEVELS[course_id % len(LEVELS)],
+                'platform': PLATFORMS[course_id % len(PLATFORMS)],
+            })
+        if k % 20 == 0:
+            manager.add_favorite(user_id, course_id)
+    manager.flush_events()
+    timings['track'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in user_ids:
+        manager.get_profile_snapshot(user_id)
+    timings['snapshot'] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_events = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    print(f"Workload: {n_users} users, {n_events} events\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'sqlite': run('sqlite', os.path.join(tmp, 'bench.db'), n_users, n_events),
+            'memory': run('memory', None, n_users, n_events),
+        }
+
+    print(f"\n{'step':<10} {'sqlite (s)':>12} {'memory (s)':>12} {'ratio':>8}")
+    for step in results['sqlite']:
+        sqlite_s, memory_s = results['sqlite'][step], results['memory'][step]
+        ratio = sqlite_s / memory_s if memory_s > 0 else float('inf')
+        print(f"{step:<10} {sqlite_s:>12.3f} {memory_s:>12.3f} {ratio:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Compaction des tables d'événements : les clics et recherches plus anciens que la fenêtre
+de rétention sont repliés en agrégats journaliers (click_rollups, search_rollups) puis supprimés.
+À lancer périodiquement (cron).
+
+Usage : python scripts/compact_events.py [db_path] [retention_days]
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, EVENT_RETENTION_DAYS
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/recommandations.db'
+    retention_days = int(sys.argv[2]) if len(sys.argv) > 2 else EVENT_RETENTION_DAYS
+
+    db = Database(db_path)
+    print(f"Compacting events older than {retention_days} days in {db_path}...")
+    start = time.perf_counter()
+    compacted = db.compact_events(retention_days)
+    elapsed = time.perf_counter() - start
+    for table, count in compacted.items():
+        print(f"   {table}: {count} rows folded into daily rollups")
+    print(f"Done in {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
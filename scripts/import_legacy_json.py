@@ -0,0 +1,280 @@
+"""
+Import des anciens fichiers JSON (processed_data/users.json et user_behaviors.json) dans SQLite.
+
+- Lecture en flux : les fichiers sont parcourus par morceaux, élément par élément,
+  sans jamais être chargés entièrement en mémoire (exports de plusieurs Go).
+- Chargement par lots : executemany dans de grandes transactions, index des tables
+  d'événements supprimés pendant le chargement puis reconstruits à la fin.
+- Reprise idempotente : la position atteinte pour chaque utilisateur est enregistrée
+  (table import_progress) dans la même transaction que les lignes importées.
+
+Usage : python scripts/import_legacy_json.py [db_path] [users_json] [behaviors_json] [batch_rows]
+"""
+
+import sys
+import os
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, iso_to_epoch
+
+DEFAULT_USERS_PATH = 'processed_data/users.json'
+DEFAULT_BEHAVIORS_PATH = 'processed_data/user_behaviors.json'
+CHUNK_SIZE = 1 << 20  # 1 Mo lu à la fois
+BATCH_ROWS = 50000    # Lignes insérées par transaction
+
+
+class JsonStream:
+    """Lecteur JSON incrémental : parcourt objets et tableaux sans charger tout le fichier"""
+
+    WHITESPACE = ' \t\n\r'
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Lit le morceau suivant (en libérant la partie déjà consommée du tampon)"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Fin de fichier JSON inattendue")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu à la position {self.pos}")
+        self.pos += 1
+
+    def read_value(self):
+        """Décode la valeur suivante (un élément complet : objet, chaîne, nombre...)"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Une valeur qui touche la fin du tampon peut être tronquée (ex: un nombre)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+
+    def iter_object(self):
+        """Parcourt un objet : produit chaque clé, la valeur doit être lue par l'appelant"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+            char = self._peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"JSON invalide : ',' ou '}}' attendu à la position {self.pos}")
+
+    def iter_array(self):
+        """Parcourt un tableau élément par élément"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"JSON invalide : ',' ou ']' attendu à la position {self.pos}")
+
+
+class LegacyImporter:
+    """Importe comptes, recherches, clics et favoris des anciens fichiers JSON"""
+
+    def __init__(self, db, batch_rows=BATCH_ROWS):
+        self.db = db
+        self.batch_rows = batch_rows
+        self.conn = db.get_connection()
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.user_ids = {}
+        self.stats = {'users': 0, 'searches': 0, 'clicks': 0, 'favorites': 0, 'skipped_users': 0}
+
+    def import_users(self, path):
+        """Crée les comptes absents (les mots de passe sont déjà hashés en SHA256)"""
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            stream = JsonStream(f)
+            for username in stream.iter_object():
+                user = stream.read_value()
+                rows.append((
+                    username,
+                    user.get('email') or f'{username}@legacy.local',
+                    user.get('password', ''),
+                    user.get('created_at') or time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    user.get('last_login'),
+                ))
+                if len(rows) >= self.batch_rows:
+                    self._insert_users(rows)
+                    rows = []
+        self._insert_users(rows)
+
+    def _insert_users(self, rows):
+        if not rows:
+            return
+        cursor = self.conn.executemany('''
+            INSERT OR IGNORE INTO users (username, email, password, created_at, last_login)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        self.stats['users'] += max(cursor.rowcount, 0)
+        self.conn.commit()
+
+    def _user_id(self, username):
+        if username not in self.user_ids:
+            row = self.conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+            self.user_ids[username] = row['id'] if row else None
+        return self.user_ids[username]
+
+    def _progress(self, source, username):
+        row = self.conn.execute('''
+            SELECT searches_done, clicks_done, completed FROM import_progress
+            WHERE source = ? AND username = ?
+        ''', (source, username)).fetchone()
+        return dict(row) if row else {'searches_done': 0, 'clicks_done': 0, 'completed': 0}
+
+    def import_behaviors(self, path):
+        """Charge recherches, clics et favoris, utilisateur par utilisateur, en flux"""
+        source = os.path.abspath(path)
+        pending = {'searches': [], 'clicks': [], 'favorites': []}
+        progress = {}  # username -> position atteinte (à enregistrer avec le prochain commit)
+
+        def flush():
+            self._write_batch(source, pending, progress)
+            for rows in pending.values():
+                rows.clear()
+            progress.clear()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            stream = JsonStream(f)
+            for username in stream.iter_object():
+                user_id = self._user_id(username)
+                done = self._progress(source, username)
+                if user_id is None or done['completed']:
+                    # Compte inconnu ou déjà importé : on lit la valeur sans l'importer
+                    stream.read_value()
+                    self.stats['skipped_users'] += 1
+                    continue
+
+                state = progress.setdefault(username, dict(done))
+                for section in stream.iter_object():
+                    if section not in ('searches', 'clicks', 'favorites'):
+                        stream.read_value()  # views, preferences : non stockés / recalculés
+                        continue
+                    for index, item in enumerate(stream.iter_array()):
+                        if section == 'searches':
+                            if index < done['searches_done']:
+                                continue
+                            pending['searches'].append((user_id, item.get('query', ''), iso_to_epoch(item.get('timestamp'))))
+                            state['searches_done'] = index + 1
+                        elif section == 'clicks':
+                            if index < done['clicks_done']:
+                                continue
+                            pending['clicks'].append((user_id, item, iso_to_epoch(item.get('timestamp'))))
+                            state['clicks_done'] = index + 1
+                        else:
+                            course_id = item.get('course_id') if isinstance(item, dict) else item
+                            pending['favorites'].append((user_id, course_id, iso_to_epoch(None)))
+                        if sum(len(rows) for rows in pending.values()) >= self.batch_rows:
+                            flush()
+                            state = progress.setdefault(username, dict(state))
+                state['completed'] = 1
+                progress[username] = state
+        flush()
+
+    def _write_batch(self, source, pending, progress):
+        """Écrit un lot et la progression correspondante dans une seule transaction"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany('INSERT INTO searches (user_id, query, timestamp) VALUES (?, ?, ?)', pending['searches'])
+            cursor.executemany('INSERT INTO clicks (user_id, course_id, timestamp) VALUES (?, ?, ?)',
+                               [(user_id, course.get('course_id'), ts) for user_id, course, ts in pending['clicks']])
+            self.db._increment_pref_counters(cursor, [(user_id, course) for user_id, course, ts in pending['clicks']])
+            cursor.executemany('INSERT OR IGNORE INTO favorites (user_id, course_id, timestamp) VALUES (?, ?, ?)',
+                               [row for row in pending['favorites'] if row[1] is not None])
+            cursor.executemany('''
+                INSERT INTO import_progress (source, username, searches_done, clicks_done, completed)
+                VALUES (:source, :username, :searches_done, :clicks_done, :completed)
+                ON CONFLICT (source, username) DO UPDATE SET
+                    searches_done = excluded.searches_done,
+                    clicks_done = excluded.clicks_done,
+                    completed = excluded.completed
+            ''', [dict(state, source=source, username=username) for username, state in progress.items()])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.stats['searches'] += len(pending['searches'])
+        self.stats['clicks'] += len(pending['clicks'])
+        self.stats['favorites'] += len(pending['favorites'])
+
+    def run(self, users_path, behaviors_path):
+        start = time.perf_counter()
+        if users_path and os.path.exists(users_path):
+            print(f"👤 Import des comptes : {users_path}")
+            self.import_users(users_path)
+        if behaviors_path and os.path.exists(behaviors_path):
+            print(f"📥 Import des comportements : {behaviors_path} (index désactivés pendant le chargement)")
+            self.db.drop_event_indexes(self.conn)
+            try:
+                self.import_behaviors(behaviors_path)
+            finally:
+                print("🔧 Reconstruction des index...")
+                self.db.create_event_indexes(self.conn)
+        elapsed = time.perf_counter() - start
+        self.conn.close()
+
+        rows = self.stats['searches'] + self.stats['clicks'] + self.stats['favorites']
+        print(f"\n✅ Import terminé en {elapsed:.2f}s")
+        for key, value in self.stats.items():
+            print(f"   {key}: {value}")
+        print(f"   débit: {rows / elapsed if elapsed > 0 else 0:,.0f} lignes/s")
+        return self.stats
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/recommandations.db'
+    users_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_USERS_PATH
+    behaviors_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_BEHAVIORS_PATH
+    batch_rows = int(sys.argv[4]) if len(sys.argv) > 4 else BATCH_ROWS
+
+    importer = LegacyImporter(Database(db_path), batch_rows)
+    importer.run(users_path, behaviors_path)
+
+
+if __name__ == "__main__":
+    main()
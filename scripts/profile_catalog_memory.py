@@ -0,0 +1,120 @@
+"""
+Profil mémoire : catalogue chargé par un worker, avant/après les types déclarés
+Chaque mesure tourne dans un processus neuf (comme un worker du serveur) : RSS avant et après le
+chargement du catalogue (métadonnées, catalogue en colonnes, fragments JSON ; plus l'ancien DataFrame
+gardé en mémoire pour « legacy »), taille du DataFrame (memory_usage deep) et du catalogue en colonnes.
+« legacy » reproduit l'ancien chargement (toutes les colonnes, types inférés, alias copiés) ; le DataFrame
+mesuré pour « current » est celui de l'entraînement, construit après la mesure du RSS (un worker n'en garde pas).
+
+Usage : python scripts/profile_catalog_memory.py [chemin_csv]
+"""
+
+import sys
+import os
+import gc
+import json
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LEGACY_ALIASES = {'id': 'course_id', 'partner': 'instructor', 'link': 'url',
+                  'source_domain': 'platform', 'title_clean': 'combined_text'}
+
+
+def rss_bytes():
+    """Mémoire résidente du processus (Linux : /proc ; sinon pic via resource)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def legacy_load(filepath):
+    """Ancien CourseRecommender.load_data : lecture complète, alias copiés, textes en objets"""
+    import pandas as pd
+    from models.catalog import extract_levels
+
+    df = pd.read_csv(filepath)
+    for old_col, new_col in LEGACY_ALIASES.items():
+        if old_col in df.columns and new_col not in df.columns:
+            df[new_col] = df[old_col]
+    if 'level' not in df.columns and 'metadata' in df.columns:
+        df['level'] = pd.Series(extract_levels(df['metadata']), index=df.index).astype(object)
+    if 'platform' in df.columns:
+        df['platform'] = df['platform'].str.capitalize()
+    return df
+
+
+def worker(mode, filepath):
+    """Mesure dans le processus courant ; affiche un objet JSON"""
+    from models.recommender import CourseRecommender  # Importé avant la mesure : seul le catalogue compte
+    from models.catalog import CourseCatalog
+    from models.leaderboard import catalog_fingerprint
+
+    recommender = CourseRecommender()
+    gc.collect()
+    before = rss_bytes()
+    if mode == 'legacy':
+        # Mêmes structures dérivées que load_data, construites sur l'ancien DataFrame
+        recommender.df = legacy_load(filepath)
+        recommender.catalog_version = catalog_fingerprint(recommender.df)
+        recommender.catalog = CourseCatalog.from_dataframe(recommender.df, version=recommender.catalog_version)
+        recommender.get_metadata()
+        recommender.get_course_json()
+    else:
+        recommender.load_data(filepath)
+    catalog = recommender.get_catalog()
+    gc.collect()
+    after = rss_bytes()
+    df = recommender.get_dataframe()
+
+    print(json.dumps({
+        'rss_before': before,
+        'rss_after': after,
+        'dataframe': int(df.memory_usage(deep=True).sum()),
+        'columns': {column: int(size) for column, size in df.memory_usage(deep=True, index=False).items()},
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+        'catalog': int(sum(catalog.memory_usage().values())),
+    }))
+
+
+def measure(mode, filepath):
+    """Lance un worker neuf et lit sa mesure (dernière ligne de sa sortie)"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', mode, filepath],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def mb(n):
+    return f"{n / 1e6:8.2f} MB"
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--worker':
+        worker(sys.argv[2], sys.argv[3])
+        return
+
+    from models.recommender import DATA_PATH
+    filepath = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+
+    legacy, current = measure('legacy', filepath), measure('current', filepath)
+    print(f"Catalog memory per worker ({filepath})\n")
+    print(f"{'':<26} {'legacy':>11} {'current':>11}")
+    for label, key in [('RSS growth on load', None), ('DataFrame (deep)', 'dataframe'),
+                       ('Columnar catalog', 'catalog')]:
+        old = legacy['rss_after'] - legacy['rss_before'] if key is None else legacy[key]
+        new = current['rss_after'] - current['rss_before'] if key is None else current[key]
+        print(f"{label:<26} {mb(old):>11} {mb(new):>11}")
+
+    print(f"\n{'column':<18} {'legacy':>11} {'current':>11}  dtype")
+    for column in sorted(set(legacy['columns']) | set(current['columns'])):
+        old = mb(legacy['columns'][column]) if column in legacy['columns'] else '-'
+        new = mb(current['columns'][column]) if column in current['columns'] else '-'
+        print(f"{column:<18} {old:>11} {new:>11}  {current['dtypes'].get(column, 'not loaded')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Reconstruit la table user_pref_counters depuis l'historique des clics.
+Utile après un import ou une modification manuelle de la table clicks.
+Les clics ne stockent que course_id : le catalogue est chargé pour retrouver
+catégorie, niveau et plateforme.
+
+Usage : python scripts/rebuild_pref_counters.py [db_path] [username] [catalog_csv]
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from models.recommender import CourseRecommender
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/recommandations.db'
+    username = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] else None
+    catalog_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    recommender = CourseRecommender()
+    if not recommender.load_data(catalog_path):
+        return
+
+    db = Database(db_path)
+    db.set_course_lookup(recommender.get_course_lookup())
+    print(f"Rebuilding preference counters in {db_path}" + (f" for {username}" if username else "") + "...")
+    count = db.rebuild_pref_counters(username)
+    if count is None:
+        print(f"Error: unknown user '{username}', nothing rebuilt.", file=sys.stderr)
+        sys.exit(1)
+    print(f"Done: {count} counter rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Moteurs de stockage des utilisateurs et de leurs comportements
+"""
+
+from .base import StorageBackend
+from .memory import MemoryStorage
+
+try:
+    from config import STORAGE_BACKEND
+except ImportError:
+    STORAGE_BACKEND = 'sqlite'
+
+
+def create_storage(backend=STORAGE_BACKEND, db_path='data/recommandations.db'):
+    """Instancie le moteur demandé : 'sqlite' (fichier, par défaut) ou 'memory' (benchmarks)"""
+    if backend == 'sqlite':
+        from database import Database  # Import différé : database importe storage.base
+        return Database(db_path)
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f"Moteur de stockage inconnu : {backend!r} (attendu : 'sqlite' ou 'memory')")
+
+
+__all__ = ['StorageBackend', 'MemoryStorage', 'create_storage']
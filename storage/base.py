@@ -0,0 +1,156 @@
+"""
+Interface commune des moteurs de stockage des utilisateurs et de leurs comportements
+"""
+
+import hashlib
+from abc import ABC, abstractmethod
+
+try:
+    from config import SAVED_PATHS_PAGE_SIZE
+except ImportError:
+    SAVED_PATHS_PAGE_SIZE = 10
+
+
+class StorageBackend(ABC):
+    """Contrat attendu par UserManager : comptes, événements, favoris, parcours et agrégations
+
+    Toutes les méthodes « par utilisateur » acceptent un user_id (int) ou un nom d'utilisateur.
+    """
+
+    # Dimensions des préférences : nom dans le dictionnaire -> clé du cours
+    PREF_DIMENSIONS = {'categories': 'category', 'levels': 'level', 'platforms': 'platform'}
+
+    course_lookup = None  # Table course_id -> attributs codés (fournie par le catalogue)
+
+    def set_course_lookup(self, course_lookup):
+        """Fournit la table course_id -> attributs codés construite depuis le catalogue chargé"""
+        self.course_lookup = course_lookup
+
+    def hash_password(self, password):
+        """Hash un mot de passe avec SHA256"""
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    @staticmethod
+    def path_header(path_data):
+        """En-tête d'un parcours : (nombre d'étapes, durée totale en heures)"""
+        if not isinstance(path_data, list):
+            return 0, 0.0
+        total_duration = 0.0
+        for step in path_data:
+            try:
+                total_duration += float(step.get('duration') or 0)
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return len(path_data), round(total_duration, 2)
+
+    # === Comptes ===
+
+    @abstractmethod
+    def register_user(self, username, email, password):
+        """Crée un compte ; retourne (succès, message)"""
+
+    @abstractmethod
+    def login_user(self, username, password):
+        """Vérifie les identifiants ; retourne (succès, message)"""
+
+    @abstractmethod
+    def get_user(self, username):
+        """Retourne {id, username, email, created_at, last_login} ou None"""
+
+    def get_user_id(self, username):
+        """Récupère l'ID d'un utilisateur"""
+        user = self.get_user(username)
+        return user['id'] if user else None
+
+    @abstractmethod
+    def resolve_user_id(self, user):
+        """Accepte un user_id (int) ou un nom d'utilisateur ; retourne l'ID ou None"""
+
+    @abstractmethod
+    def get_total_users(self):
+        """Nombre total d'utilisateurs"""
+
+    # === Événements ===
+
+    @abstractmethod
+    def add_search(self, user, query):
+        """Enregistre une recherche"""
+
+    @abstractmethod
+    def add_click(self, user, course):
+        """Enregistre un clic sur un cours (dictionnaire avec course_id, category, level, platform)"""
+
+    @abstractmethod
+    def add_events_batch(self, clicks=(), searches=()):
+        """Enregistre un lot : clicks = [(user_id, course, timestamp)], searches = [(user_id, query, timestamp)]"""
+
+    # === Favoris ===
+
+    @abstractmethod
+    def add_favorite(self, user, course_id):
+        """Ajoute un favori ; False s'il existe déjà"""
+
+    @abstractmethod
+    def remove_favorite(self, user, course_id):
+        """Supprime un favori ; False s'il n'existait pas"""
+
+    @abstractmethod
+    def get_favorites(self, user):
+        """Liste des IDs des cours favoris"""
+
+    # === Parcours enregistrés ===
+
+    @abstractmethod
+    def add_saved_path(self, user, category, path_data):
+        """Enregistre un parcours (path_data sérialisable en JSON)"""
+
+    @abstractmethod
+    def get_saved_paths(self, user):
+        """Parcours de l'utilisateur (path_data décodé), du plus récent au plus ancien"""
+
+    @abstractmethod
+    def get_saved_path_headers(self, user, limit=SAVED_PATHS_PAGE_SIZE, before=None):
+        """Page d'en-têtes {id, category, steps, total_duration, timestamp}, du plus récent au plus ancien
+
+        Pagination par clé : before = (timestamp, id) du dernier en-tête de la page précédente.
+        Retourne {'paths': [...], 'next': (timestamp, id) ou None}.
+        """
+
+    @abstractmethod
+    def get_saved_path(self, user, path_id):
+        """Un parcours complet (path_data décodé) s'il appartient à l'utilisateur, sinon None"""
+
+    # === Agrégations ===
+
+    @abstractmethod
+    def get_recent_searches(self, user, limit=10):
+        """Recherches récentes, de la plus récente à la plus ancienne"""
+
+    @abstractmethod
+    def get_user_preferences(self, user):
+        """Compteurs {'categories': {...}, 'levels': {...}, 'platforms': {...}}"""
+
+    def get_top_categories(self, user, limit=5):
+        """Récupère les catégories préférées d'un utilisateur"""
+        categories = self.get_user_preferences(user)['categories']
+        sorted_cats = sorted(categories.items(), key=lambda x: x[1], reverse=True)
+        return [cat[0] for cat in sorted_cats[:limit]]
+
+    @abstractmethod
+    def get_user_stats(self, user):
+        """Compteurs d'activité, top 3 des catégories et 5 dernières recherches"""
+
+    @abstractmethod
+    def get_profile_snapshot(self, user, recent_limit=10):
+        """Profil complet lu de façon cohérente ; None si l'utilisateur n'existe pas
+
+        saved_paths ne contient que la première page d'en-têtes (suite : saved_paths_next).
+        """
+
+    def get_query_profile(self, top=20):
+        """Résumé de l'instrumentation des requêtes ; None si le moteur n'en dispose pas"""
+        return None
+
+    @abstractmethod
+    def rebuild_pref_counters(self, user=None):
+        """Recalcule les compteurs de préférences depuis les clics (requiert course_lookup)"""
@@ -0,0 +1,315 @@
+"""
+Moteur de stockage en mémoire (tests de charge, benchmarks)
+Même comportement que le moteur SQLite, sans aucune entrée/sortie disque
+"""
+
+import heapq
+import json
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+
+from .base import StorageBackend, SAVED_PATHS_PAGE_SIZE
+
+
+class _UserLog:
+    """Journaux d'événements compacts d'un utilisateur (tableaux typés, pas de dict par événement)"""
+
+    __slots__ = ('click_courses', 'click_ts', 'search_queries', 'search_ts', 'prefs', 'favorites', 'saved_paths')
+
+    def __init__(self):
+        self.click_courses = array('q')
+        self.click_ts = array('q')
+        self.search_queries = array('l')  # Index dans la table des requêtes (chaînes internées)
+        self.search_ts = array('q')
+        self.prefs = {'categories': Counter(), 'levels': Counter(), 'platforms': Counter()}
+        self.favorites = {}  # course_id -> timestamp (ordre d'insertion conservé)
+        self.saved_paths = []
+
+
+class MemoryStorage(StorageBackend):
+    """Stockage en mémoire protégé par un verrou (un seul processus, données perdues à l'arrêt)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = []  # Index = user_id - 1
+        self._ids_by_name = {}
+        self._emails = set()
+        self._logs = {}  # user_id -> _UserLog
+        self._queries = []  # Requêtes distinctes
+        self._query_ids = {}
+        self._next_path_id = 1
+
+    def _log(self, user_id):
+        log = self._logs.get(user_id)
+        if log is None:
+            log = self._logs[user_id] = _UserLog()
+        return log
+
+    def _intern_query(self, query):
+        query_id = self._query_ids.get(query)
+        if query_id is None:
+            query_id = self._query_ids[query] = len(self._queries)
+            self._queries.append(query)
+        return query_id
+
+    # === Comptes ===
+
+    def register_user(self, username, email, password):
+        """Enregistre un nouvel utilisateur"""
+        with self._lock:
+            if username in self._ids_by_name:
+                return False, "Ce nom d'utilisateur existe déjà"
+            if email in self._emails:
+                return False, "Cet email existe déjà"
+            user_id = len(self._users) + 1
+            self._users.append({
+                'id': user_id,
+                'username': username,
+                'email': email,
+                'password': self.hash_password(password),
+                'created_at': datetime.now().isoformat(),
+                'last_login': None,
+            })
+            self._ids_by_name[username] = user_id
+            self._emails.add(email)
+            return True, "Inscription réussie"
+
+    def login_user(self, username, password):
+        """Authentifie un utilisateur"""
+        with self._lock:
+            user_id = self._ids_by_name.get(username)
+            if user_id and self._users[user_id - 1]['password'] == self.hash_password(password):
+                self._users[user_id - 1]['last_login'] = datetime.now().isoformat()
+                return True, "Connexion réussie"
+        return False, "Nom d'utilisateur ou mot de passe incorrect"
+
+    def _public_user(self, user_id):
+        user = dict(self._users[user_id - 1])
+        del user['password']
+        return user
+
+    def get_user(self, username):
+        """Récupère les informations d'un utilisateur"""
+        with self._lock:
+            user_id = self._ids_by_name.get(username)
+            return self._public_user(user_id) if user_id else None
+
+    def resolve_user_id(self, user):
+        """Accepte un user_id (int) ou un nom d'utilisateur"""
+        if user is None or isinstance(user, int):
+            return user
+        return self._ids_by_name.get(user)
+
+    def get_total_users(self):
+        """Récupère le nombre total d'utilisateurs"""
+        return len(self._users)
+
+    # === Événements ===
+
+    def add_search(self, user, query):
+        """Enregistre une recherche"""
+        user_id = self.resolve_user_id(user)
+        if user_id:
+            self.add_events_batch(searches=[(user_id, query, int(time.time()))])
+
+    def add_click(self, user, course):
+        """Enregistre un clic sur un cours"""
+        user_id = self.resolve_user_id(user)
+        if user_id:
+            self.add_events_batch(clicks=[(user_id, course, int(time.time()))])
+
+    def add_events_batch(self, clicks=(), searches=()):
+        """Enregistre un lot de clics et de recherches (atomique vis-à-vis des lecteurs)"""
+        with self._lock:
+            for user_id, query, ts in searches:
+                log = self._log(user_id)
+                log.search_queries.append(self._intern_query(query))
+                log.search_ts.append(int(ts))
+            for user_id, course, ts in clicks:
+                log = self._log(user_id)
+                log.click_courses.append(int(course.get('course_id')))
+                log.click_ts.append(int(ts))
+                for dimension, key in self.PREF_DIMENSIONS.items():
+                    value = course.get(key)
+                    if isinstance(value, str) and value:
+                        log.prefs[dimension][value] += 1
+
+    # === Favoris ===
+
+    def add_favorite(self, user, course_id):
+        """Ajoute un cours aux favoris"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return False
+        with self._lock:
+            favorites = self._log(user_id).favorites
+            if course_id in favorites:
+                return False  # Déjà en favoris
+            favorites[course_id] = int(time.time())
+            return True
+
+    def remove_favorite(self, user, course_id):
+        """Supprime un cours des favoris"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return False
+        with self._lock:
+            return self._log(user_id).favorites.pop(course_id, None) is not None
+
+    def get_favorites(self, user):
+        """Récupère la liste des IDs des cours favoris"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return []
+        with self._lock:
+            return list(self._log(user_id).favorites)
+
+    # === Parcours enregistrés ===
+
+    def add_saved_path(self, user, category, path_data):
+        """Enregistre un parcours pour l'utilisateur (sérialisé comme en base)"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return False
+        steps, total_duration = self.path_header(path_data)
+        with self._lock:
+            self._log(user_id).saved_paths.append({
+                'id': self._next_path_id,
+                'user_id': user_id,
+                'category': category,
+                'path_data': json.dumps(path_data),
+                'timestamp': datetime.now().isoformat(),
+                'steps': steps,
+                'total_duration': total_duration,
+            })
+            self._next_path_id += 1
+        return True
+
+    def _decode_saved_path(self, row):
+        path = dict(row)
+        path['path_data'] = json.loads(path['path_data'])
+        return path
+
+    def _query_saved_path_headers(self, log, limit, before=None):
+        """Page d'en-têtes par clé (timestamp, id), même contrat que le moteur SQLite"""
+        rows = sorted(log.saved_paths, key=lambda row: (row['timestamp'], row['id']), reverse=True)
+        if before:
+            rows = [row for row in rows if (row['timestamp'], row['id']) < tuple(before)]
+        paths = [{key: row[key] for key in ('id', 'category', 'steps', 'total_duration', 'timestamp')}
+                 for row in rows[:limit]]
+        next_key = (paths[-1]['timestamp'], paths[-1]['id']) if len(rows) > limit else None
+        return {'paths': paths, 'next': next_key}
+
+    def get_saved_paths(self, user):
+        """Récupère les parcours enregistrés de l'utilisateur"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return []
+        with self._lock:
+            return [self._decode_saved_path(row) for row in reversed(self._log(user_id).saved_paths)]
+
+    def get_saved_path_headers(self, user, limit=SAVED_PATHS_PAGE_SIZE, before=None):
+        """Récupère une page d'en-têtes de parcours (sans décoder path_data)"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return {'paths': [], 'next': None}
+        with self._lock:
+            return self._query_saved_path_headers(self._log(user_id), limit, before)
+
+    def get_saved_path(self, user, path_id):
+        """Récupère et décode un parcours de l'utilisateur"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return None
+        with self._lock:
+            for row in self._log(user_id).saved_paths:
+                if row['id'] == path_id:
+                    return self._decode_saved_path(row)
+        return None
+
+    # === Agrégations ===
+
+    def _query_recent_searches(self, log, limit):
+        """Les `limit` recherches les plus récentes (horodatage puis ordre d'insertion décroissants)"""
+        latest = heapq.nlargest(limit, range(len(log.search_ts)), key=lambda i: (log.search_ts[i], i))
+        return [self._queries[log.search_queries[i]] for i in latest]
+
+    def _query_preferences(self, log):
+        return {dimension: dict(counts.most_common()) for dimension, counts in log.prefs.items()}
+
+    def _query_stats(self, log, preferences, recent_searches):
+        sorted_cats = sorted(preferences['categories'].items(), key=lambda x: x[1], reverse=True)
+        return {
+            'total_searches': len(log.search_ts),
+            'total_clicks': len(log.click_ts),
+            'total_favorites': len(log.favorites),
+            'top_categories': [cat[0] for cat in sorted_cats[:3]],
+            'recent_searches': recent_searches[:5],
+        }
+
+    def get_recent_searches(self, user, limit=10):
+        """Récupère les recherches récentes d'un utilisateur"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return []
+        with self._lock:
+            return self._query_recent_searches(self._log(user_id), limit)
+
+    def get_user_preferences(self, user):
+        """Compteurs de préférences maintenus à l'écriture"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return {'categories': {}, 'levels': {}, 'platforms': {}}
+        with self._lock:
+            return self._query_preferences(self._log(user_id))
+
+    def get_user_stats(self, user):
+        """Récupère les statistiques d'un utilisateur"""
+        user_id = self.resolve_user_id(user)
+        if not user_id:
+            return {}
+        with self._lock:
+            log = self._log(user_id)
+            return self._query_stats(log, self._query_preferences(log), self._query_recent_searches(log, 5))
+
+    def get_profile_snapshot(self, user, recent_limit=10):
+        """Récupère tout le profil d'un utilisateur sous un seul verrou (état cohérent)"""
+        user_id = self.resolve_user_id(user)
+        with self._lock:
+            if not user_id or user_id > len(self._users):
+                return None
+            log = self._log(user_id)
+            preferences = self._query_preferences(log)
+            recent_searches = self._query_recent_searches(log, recent_limit)
+            saved_paths = self._query_saved_path_headers(log, SAVED_PATHS_PAGE_SIZE)
+            return {
+                'user': self._public_user(user_id),
+                'stats': self._query_stats(log, preferences, recent_searches),
+                'preferences': preferences,
+                'recent_searches': recent_searches,
+                'favorites': list(log.favorites),
+                'saved_paths': saved_paths['paths'],
+                'saved_paths_next': saved_paths['next'],
+            }
+
+    def rebuild_pref_counters(self, user=None):
+        """Recalcule les compteurs de préférences depuis les journaux de clics via course_lookup"""
+        if self.course_lookup is None:
+            raise RuntimeError("course_lookup requis : appeler set_course_lookup() avec le catalogue chargé")
+        with self._lock:
+            if user is None:
+                logs = list(self._logs.values())
+            else:
+                # Utilisateur inconnu : rien n'est recalculé (comme le backend SQLite)
+                user_id = self.resolve_user_id(user)
+                log = self._logs.get(user_id)
+                if log is None and not (isinstance(user_id, int) and 1 <= user_id <= len(self._users)):
+                    return None
+                logs = [log] if log is not None else []
+            for log in logs:
+                prefs = self.course_lookup.aggregate(log.click_courses.tolist())
+                log.prefs = {dimension: Counter(prefs.get(dimension, {})) for dimension in self.PREF_DIMENSIONS}
+            return sum(len(counts) for log in self._logs.values() for counts in log.prefs.values())
@@ -1,21 +1,53 @@
 """
-Système d'Authentification et de Suivi des Utilisateurs (Backend SQLite)
-Gère l'inscription, la connexion et le suivi comportemental des utilisateurs via SQLite
+Système d'Authentification et de Suivi des Utilisateurs
+Gère l'inscription, la connexion et le suivi comportemental des utilisateurs (SQLite ou mémoire)
 """
 
 # === IMPORTATIONS ===
-from database import Database  # Import de la classe de gestion de base de données SQLite
+from storage import create_storage  # Fabrique des moteurs de stockage (SQLite, mémoire)
+from event_queue import EventQueue  # File d'écriture différée des clics et recherches
+
+try:
+    from config import EVENT_QUEUE_ENABLED, STORAGE_BACKEND
+except ImportError:
+    EVENT_QUEUE_ENABLED = True
+    STORAGE_BACKEND = 'sqlite'
 
 # === CLASSE PRINCIPALE ===
 class UserManager:  # Contrôleur qui gère la logique utilisateur et interagit avec la BDD
-    """Gère les utilisateurs et le suivi de leur comportement via une base de données SQLite"""
+    """Gère les utilisateurs et le suivi de leur comportement via un moteur de stockage interchangeable"""
     
-    def __init__(self, db_path='data/recommandations.db'):
-        """Initialise le gestionnaire d'utilisateurs avec une connexion à la base de données"""
-        # Initialise la connexion à la base de données SQLite
-        # Le fichier DB sera créé automatiquement s'il n'existe pas
-        # db_path : chemin vers le fichier de base de données (par défaut : data/recommandations.db)
-        self.db = Database(db_path)  # Crée une instance de la classe Database
+    def __init__(self, db_path='data/recommandations.db', use_event_queue=EVENT_QUEUE_ENABLED,
+                 backend=STORAGE_BACKEND):
+        """Initialise le gestionnaire d'utilisateurs avec le moteur de stockage choisi"""
+        # backend : 'sqlite' (par défaut, fichier créé automatiquement s'il n'existe pas)
+        #           ou 'memory' (aucune E/S disque : benchmarks et tests de charge)
+        # db_path : chemin vers le fichier de base de données (ignoré par le moteur mémoire)
+        # Tout moteur implémente storage.StorageBackend : app.py n'a pas à changer
+        self.db = create_storage(backend, db_path)
+        # Fonctions appelées avec les user_id dont l'activité a changé (invalidation des caches)
+        self._activity_listeners = []
+        # File d'attente des événements : les clics/recherches sont écrits par lots en arrière-plan
+        # (pas d'INSERT + COMMIT sur le chemin de la réponse HTTP)
+        self.events = EventQueue(self.db, on_flush=self._notify_activity) if use_event_queue else None
+        
+    def set_course_lookup(self, course_lookup):
+        """Fournir la table course_id -> catégorie/niveau/plateforme construite depuis le catalogue"""
+        # La table clicks ne stocke que (user_id, course_id, timestamp) : les attributs des cours
+        # sont retrouvés en mémoire via cette table (codes entiers) lors des agrégations
+        self.db.set_course_lookup(course_lookup)
+        
+    def add_activity_listener(self, callback):
+        """Enregistrer une fonction appelée à chaque nouvelle activité d'un utilisateur"""
+        # callback(user_ids) reçoit un ensemble d'IDs : appelé au suivi d'un clic/recherche
+        # puis une seconde fois quand le lot correspondant est écrit en base (file d'attente)
+        # Exemple : invalider le fil personnalisé mis en cache pour ces utilisateurs
+        self._activity_listeners.append(callback)
+        
+    def _notify_activity(self, user_ids):
+        """Prévenir les écouteurs que l'activité de ces utilisateurs a changé"""
+        for callback in self._activity_listeners:
+            callback(user_ids)
         
     # === GESTION DES COMPTES UTILISATEURS ===
     # Ces méthodes gèrent l'authentification et la création de comptes
@@ -41,25 +73,65 @@ class UserManager:  # Contrôleur qui gère la logique utilisateur et interagit
         # Le mot de passe hashé n'est PAS inclus (sécurité)
         return self.db.get_user(username)
         
+    def get_user_id(self, username):
+        """Obtenir l'ID d'un utilisateur (résolu une fois puis mis en cache)"""
+        # À appeler une seule fois à la connexion : l'ID est ensuite stocké dans la session Flask
+        # Toutes les méthodes ci-dessous acceptent directement cet ID (int) à la place du nom
+        # Les appels par nom restent possibles grâce au petit cache LRU de la base de données
+        return self.db.resolve_user_id(username)
+        
     # === SUIVI COMPORTEMENTAL (TRACKING) ===
     # Ces méthodes enregistrent les actions de l'utilisateur pour personnaliser les recommandations
+    # Toutes les méthodes suivantes acceptent un user_id (int, recommandé) ou un nom d'utilisateur
     
-    def track_search(self, username, query):
+    def track_search(self, user, query):
         """Suivre une recherche utilisateur (enregistrement dans la table 'searches')"""
         # Enregistre le terme recherché avec un timestamp (horodatage)
         # Utilisé pour améliorer les futures recommandations (intentions explicites)
         # Exemple : si l'utilisateur cherche "Python", on lui recommandera des cours Python
-        self.db.add_search(username, query)
+        # L'écriture est différée (file d'attente) si elle est activée
+        user_id = self.db.resolve_user_id(user)
+        if not user_id:
+            return
+        if self.events is None:
+            self.db.add_search(user_id, query)
+        else:
+            self.events.put_search(user_id, query)
+        self._notify_activity({user_id})
         
-    def track_click(self, username, course):
+    def track_click(self, user, course):
         """Suivre le clic d'un utilisateur sur un cours (enregistrement dans la table 'clicks')"""
         # Enregistre l'interaction avec un cours spécifique
         # Stocke : course_id, category, platform, rating, timestamp
         # Permet de construire le profil d'intérêts de l'utilisateur (comportement implicite)
         # Exemple : si l'utilisateur clique souvent sur "Data Science", cette catégorie devient une préférence
-        self.db.add_click(username, course)
+        # L'écriture est différée (file d'attente) si elle est activée
+        user_id = self.db.resolve_user_id(user)
+        if not user_id:
+            return
+        if self.events is None:
+            self.db.add_click(user_id, course)
+        else:
+            self.events.put_click(user_id, course)
+        self._notify_activity({user_id})
+        
+    def flush_events(self):
+        """Écrire immédiatement les événements en attente dans la base de données"""
+        # Utilisé à l'arrêt du serveur et dans les scripts (le thread d'arrière-plan le fait sinon)
+        # Retourne le nombre d'événements écrits
+        return self.events.flush() if self.events is not None else 0
         
-    def track_view(self, username, course_id):
+    def get_event_queue_depth(self):
+        """Obtenir le nombre d'événements en attente d'écriture"""
+        # 0 si la file est désactivée (écriture synchrone)
+        return self.events.depth() if self.events is not None else 0
+        
+    def get_event_queue_dropped(self):
+        """Obtenir le nombre d'événements abandonnés parce que la file était pleine"""
+        # 0 si la file est désactivée (écriture synchrone)
+        return self.events.dropped() if self.events is not None else 0
+        
+    def track_view(self, user, course_id):
         """Suivre la vue d'un cours (consultation de la page de détail)"""
         # Actuellement non implémenté dans la base de données (pass = ne fait rien)
         # Nous utilisons les clics pour les préférences, le suivi des vues brutes peut être ajouté à la BD si nécessaire
@@ -69,56 +141,70 @@ class UserManager:  # Contrôleur qui gère la logique utilisateur et interagit
     # === GESTION DES FAVORIS ===
     # Permet aux utilisateurs de marquer des cours comme favoris (liste de souhaits)
     
-    def add_favorite(self, username, course_id):
+    def add_favorite(self, user, course_id):
         """Ajouter un cours aux favoris de l'utilisateur (table 'favorites')"""
-        # Insère une entrée dans la table 'favorites' avec username + course_id
+        # Insère une entrée dans la table 'favorites' avec user_id + course_id
         # Retourne True si succès, False si erreur (ex: déjà dans les favoris)
-        return self.db.add_favorite(username, course_id)
+        return self.db.add_favorite(user, course_id)
             
-    def remove_favorite(self, username, course_id):
+    def remove_favorite(self, user, course_id):
         """Retirer un cours des favoris de l'utilisateur"""
         # Supprime l'entrée correspondante de la table 'favorites'
         # Retourne True si succès, False si erreur
-        return self.db.remove_favorite(username, course_id)
+        return self.db.remove_favorite(user, course_id)
         
-    def get_favorites(self, username):
+    def get_favorites(self, user):
         """Obtenir la liste des cours favoris de l'utilisateur"""
         # Récupère tous les course_id marqués comme favoris pour cet utilisateur
         # Retourne une liste d'IDs de cours : [123, 456, 789, ...]
-        return self.db.get_favorites(username)
+        return self.db.get_favorites(user)
         
     # === ANALYSE DES PRÉFÉRENCES UTILISATEUR ===
     # Ces méthodes analysent le comportement pour identifier les intérêts de l'utilisateur
     
-    def get_preferences(self, username):
+    def get_preferences(self, user):
         """Obtenir les préférences de l'utilisateur basées sur son comportement"""
         # Analyse l'historique des clics pour déterminer les catégories favorites
         # Compte le nombre de clics par catégorie (ex: {"Data Science": 15, "Web Development": 8, ...})
         # Retourne un dictionnaire avec les compteurs par catégorie
         # Utilisé pour personnaliser les recommandations (plus de clics = plus d'intérêt)
-        return self.db.get_user_preferences(username)
+        return self.db.get_user_preferences(user)
         
-    def get_top_categories(self, username, n=5):
+    def get_top_categories(self, user, n=5):
         """Obtenir les catégories principales de l'utilisateur (top N)"""
         # Identifie les N catégories les plus consultées par l'utilisateur
         # Retourne une liste triée par ordre décroissant : ["Data Science", "AI", "Python", ...]
         # Paramètre n : nombre de catégories à retourner (par défaut 5)
-        return self.db.get_top_categories(username, n)
+        return self.db.get_top_categories(user, n)
         
-    def get_recent_searches(self, username, n=10):
+    def get_recent_searches(self, user, n=10):
         """Obtenir les recherches récentes de l'utilisateur (historique)"""
         # Récupère les N dernières recherches effectuées (triées par date décroissante)
         # Retourne une liste de chaînes : ["machine learning", "python", "data analysis", ...]
         # Utilisé pour les suggestions et les recommandations contextuelles
         # Paramètre n : nombre de recherches à retourner (par défaut 10)
-        return self.db.get_recent_searches(username, n)
+        return self.db.get_recent_searches(user, n)
         
-    def get_user_stats(self, username):
+    def get_user_stats(self, user):
         """Obtenir les statistiques d'activité de l'utilisateur"""
         # Récupère des métriques d'engagement : nombre de clics, recherches, favoris, etc.
         # Retourne un dictionnaire : {"total_clicks": 42, "total_searches": 18, "total_favorites": 5, ...}
         # Utilisé pour afficher le profil utilisateur et mesurer l'engagement
-        return self.db.get_user_stats(username)
+        return self.db.get_user_stats(user)
+        
+    def get_profile_snapshot(self, user):
+        """Obtenir tout le profil de l'utilisateur en une seule transaction"""
+        # Regroupe infos du compte, compteurs, préférences, recherches récentes, favoris et parcours
+        # Quelques requêtes combinées sur une seule connexion au lieu d'une dizaine
+        # Retourne un dictionnaire : {"user": {...}, "stats": {...}, "preferences": {...}, "recent_searches": [...], ...}
+        # Retourne None si l'utilisateur n'existe pas (ex: session après suppression du compte)
+        return self.db.get_profile_snapshot(user)
+        
+    def get_query_profile(self, top=20):
+        """Obtenir le résumé de l'instrumentation des requêtes de la base de données"""
+        # Latences par instruction (histogrammes), requêtes lentes avec leur plan d'exécution,
+        # parcours complets des tables d'événements ; None si DB_PROFILING est désactivé
+        return self.db.get_query_profile(top)
         
     def get_all_users_count(self):
         """Obtenir le nombre total d'utilisateurs inscrits dans le système"""
@@ -130,17 +216,29 @@ class UserManager:  # Contrôleur qui gère la logique utilisateur et interagit
     # === PARCOURS D'APPRENTISSAGE (LEARNING PATHS) ===
     # Permet de sauvegarder et récupérer des parcours d'apprentissage personnalisés
     
-    def save_path(self, username, category, path_data):
+    def save_path(self, user, category, path_data):
         """Sauvegarder un parcours d'apprentissage pour l'utilisateur"""
         # Sauvegarde un chemin d'apprentissage généré par le clustering pour consultation ultérieure
         # path_data : liste de cours organisés par niveau (Débutant -> Avancé), stockée au format JSON
         # Exemple : {"category": "Data Science", "courses": [{"id": 1, "title": "...", "level": "Beginner"}, ...]}
         # Permet à l'utilisateur de retrouver ses parcours sauvegardés dans son profil
-        return self.db.add_saved_path(username, category, path_data)
+        return self.db.add_saved_path(user, category, path_data)
         
-    def get_saved_paths(self, username):
+    def get_saved_paths(self, user):
         """Obtenir tous les parcours d'apprentissage sauvegardés par l'utilisateur"""
         # Récupère la liste de tous les parcours enregistrés (table 'saved_paths')
         # Retourne une liste de dictionnaires : [{"category": "...", "path_data": {...}, "created_at": "..."}, ...]
         # Utilisé pour afficher les parcours dans la page de profil
-        return self.db.get_saved_paths(username)
+        return self.db.get_saved_paths(user)
+        
+    def get_saved_path_headers(self, user, before=None):
+        """Obtenir une page d'en-têtes de parcours (catégorie, étapes, durée totale, date)"""
+        # Le JSON des parcours n'est pas lu : seules les colonnes d'en-tête sont parcourues
+        # Pagination par clé : before = (timestamp, id) du dernier en-tête affiché (None = première page)
+        # Retourne {"paths": [...], "next": (timestamp, id) ou None s'il n'y a plus de page}
+        return self.db.get_saved_path_headers(user, before=before)
+        
+    def get_saved_path(self, user, path_id):
+        """Obtenir le détail d'un parcours sauvegardé (décodé uniquement quand il est déplié)"""
+        # Retourne None si le parcours n'existe pas ou appartient à un autre utilisateur
+        return self.db.get_saved_path(user, path_id)
@@ -6,9 +6,15 @@ import sys
 import os
 
 # Configuration UTF-8 pour Windows
+# reconfigure modifie le flux existant : le remplacer par un nouveau TextIOWrapper fermerait le flux
+# d'un script qui importe ce module (benchmarks)
 import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+for stream_name in ('stdout', 'stderr'):
+    stream = getattr(sys, stream_name)
+    if hasattr(stream, 'reconfigure'):
+        stream.reconfigure(encoding='utf-8', errors='replace')
+    elif hasattr(stream, 'buffer'):
+        setattr(sys, stream_name, io.TextIOWrapper(stream.buffer, encoding='utf-8', errors='replace'))
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -16,6 +22,9 @@ import pandas as pd
 import numpy as np
 import re
 import string
+import hashlib
+import sqlite3
+import tempfile
 
 try:
     from config import RAW_DATA_PATH, CLEAN_DATA_PATH
@@ -23,6 +32,144 @@ except ImportError:
     RAW_DATA_PATH = 'data/courses_raw.csv'
     CLEAN_DATA_PATH = 'data/courses_clean.csv'
 
+try:
+    from config import CLEAN_CHUNK_SIZE, DEDUPE_MEMORY_LIMIT
+except ImportError:
+    CLEAN_CHUNK_SIZE = 100000
+    DEDUPE_MEMORY_LIMIT = 1000000
+
+try:
+    from config import PIPELINE_N_JOBS
+except ImportError:
+    PIPELINE_N_JOBS = 1
+
+from utils.parallel import resolve_n_jobs, run_sharded
+
+
+class SeenTitles:
+    """Empreintes (128 bits) des titres déjà rencontrés, pour dédoublonner un flux de morceaux
+    
+    En mémoire jusqu'à memory_limit titres, puis dans une base SQLite temporaire : la mémoire reste
+    bornée quel que soit le nombre de lignes du fichier.
+    """
+    
+    SQL_BATCH = 500  # Clés par requête IN (...) (limite des paramètres SQLite)
+    
+    def __init__(self, memory_limit=DEDUPE_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self._memory = set()
+        self._db = None
+        self._db_path = None
+        
+    @staticmethod
+    def _key(title):
+        """Empreinte d'un titre brut (même égalité que drop_duplicates : les titres manquants sont égaux)"""
+        text = 'n' if pd.isna(title) else 's' + str(title)
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        
+    def first_occurrences(self, titles):
+        """Masque des lignes dont le titre n'a encore jamais été vu (la première occurrence est gardée)"""
+        first = {}  # empreinte -> première position dans ce morceau
+        for position, title in enumerate(titles):
+            first.setdefault(self._key(title), position)
+            
+        new_keys = self._unseen(list(first))
+        self._add(new_keys)
+        
+        keep = np.zeros(len(titles), dtype=bool)
+        keep[[first[key] for key in new_keys]] = True
+        return keep
+        
+    def _unseen(self, keys):
+        if self._db is None:
+            return [key for key in keys if key not in self._memory]
+        seen = set()
+        for start in range(0, len(keys), self.SQL_BATCH):
+            batch = keys[start:start + self.SQL_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            seen.update(row[0] for row in self._db.execute(
+                f'SELECT key FROM seen WHERE key IN ({placeholders})', batch))
+        return [key for key in keys if key not in seen]
+        
+    def _add(self, keys):
+        if self._db is None:
+            self._memory.update(keys)
+            if len(self._memory) <= self.memory_limit:
+                return
+            # Seuil dépassé : l'ensemble passe sur disque
+            keys, self._memory = list(self._memory), set()
+            fd, self._db_path = tempfile.mkstemp(prefix='seen_titles_', suffix='.db')
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            self._db.execute('PRAGMA journal_mode = OFF')
+            self._db.execute('PRAGMA synchronous = OFF')
+            self._db.execute('CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID')
+            print(f"   💾 Plus de {self.memory_limit} titres distincts : dédoublonnage sur disque")
+        self._db.executemany('INSERT INTO seen (key) VALUES (?)', ((key,) for key in keys))
+        self._db.commit()
+        
+    @property
+    def on_disk(self):
+        return self._db is not None
+        
+    def close(self):
+        """Libère l'ensemble (et supprime la base temporaire)"""
+        self._memory = set()
+        if self._db is not None:
+            self._db.close()
+            os.remove(self._db_path)
+            self._db = None
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Motifs précompilés de clean_text
+# Entités et balises HTML en une seule alternance (une entité ne contient ni '<' ni '>' : même résultat
+# que les remplacements successifs entités -> balises)
+HTML_PATTERN = re.compile(r'&[a-z]+;|<[^>]+>')
+# Caractères non-ASCII sauf accents français
+NON_LATIN_PATTERN = re.compile(r'[^\x00-\x7F\xC0-\xFF]+')
+
+
+def normalize_text(text):
+    """Nettoyage d'une chaîne (corps de clean_text) ; chaque motif n'est appliqué que s'il peut trouver quelque chose"""
+    if '&' in text or '<' in text:
+        text = HTML_PATTERN.sub(' ', text)
+    # Espaces normalisés : split() coupe sur les mêmes blancs que \s et retire ceux des extrémités
+    text = ' '.join(text.split())
+    if not text.isascii():
+        text = NON_LATIN_PATTERN.sub(' ', text).strip()
+    return text
+
+
+class FirstKeyMatcher:
+    """Valeur de la première clé d'un mapping (ordre du dictionnaire) contenue dans un texte
+    
+    Une seule alternance compilée, dans une anticipation : finditer la teste à chaque position du texte et
+    l'alternance, ordonnée par priorité, y retient la meilleure clé. La plus prioritaire de ces clés est
+    celle que trouverait la boucle « for key in mapping: if key in text ».
+    """
+    
+    def __init__(self, mapping):
+        self.values = list(mapping.values())
+        self.priority = {key: rank for rank, key in enumerate(mapping)}
+        self.pattern = re.compile('(?=(' + '|'.join(re.escape(key) for key in mapping) + '))')
+        
+    def __call__(self, text):
+        ranks = [self.priority[match.group(1)] for match in self.pattern.finditer(text)]
+        return self.values[min(ranks)] if ranks else None
+
+
+def map_distinct(series, function):
+    """Applique function une fois par valeur distincte de series (et une fois aux valeurs manquantes)"""
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([function(value) for value in uniques] + [function(np.nan)], dtype=object)
+    return pd.Series(mapped[codes], index=series.index).infer_objects()  # Code -1 : valeur manquante
+
 
 class DataCleaner:
     """Classe pour nettoyer les données des cours"""
@@ -112,9 +259,17 @@ class DataCleaner:
         'mixed': 'All Levels',
     }
     
-    def __init__(self, df=None):
+    CATEGORY_MATCHER = FirstKeyMatcher(CATEGORY_MAPPING)
+    LEVEL_MATCHER = FirstKeyMatcher(LEVEL_MAPPING)
+    
+    def __init__(self, df=None, verbose=True):
         self.df = df if df is not None else pd.DataFrame()
         self.original_count = len(self.df)
+        self.verbose = verbose  # Messages de chaque étape (désactivés pour les morceaux du mode flux)
+        
+    def _log(self, message):
+        if self.verbose:
+            print(message)
         
     def load_data(self, filepath):
         """Charge les données depuis un fichier CSV"""
@@ -129,42 +284,33 @@ class DataCleaner:
         before = len(self.df)
         self.df = self.df.drop_duplicates(subset=['title'], keep='first')
         after = len(self.df)
-        print(f"🔄 Doublons supprimés: {before - after}")
+        self._log(f"🔄 Doublons supprimés: {before - after}")
         return self
         
     def clean_text(self, text):
         """Nettoie un texte"""
         if pd.isna(text) or not isinstance(text, str):
             return ''
-            
-        # Supprimer les caractères spéciaux HTML
-        text = re.sub(r'&[a-z]+;', ' ', text)
-        text = re.sub(r'<[^>]+>', ' ', text)
-        
-        # Normaliser les espaces
-        text = re.sub(r'\s+', ' ', text)
+        return normalize_text(text)
         
-        # Supprimer les caractères non-ASCII sauf accents français
-        text = re.sub(r'[^\x00-\x7F\xC0-\xFF]+', ' ', text)
-        
-        return text.strip()
+    def clean_text_series(self, series):
+        """clean_text sur une colonne entière, en une passe sur les valeurs (sans .apply ni pd.isna par ligne)"""
+        return pd.Series([normalize_text(value) if isinstance(value, str) else '' for value in series.tolist()],
+                         index=series.index)
         
     def clean_titles(self):
         """Nettoie les titres des cours"""
-        self.df['title'] = self.df['title'].apply(self.clean_text)
+        self.df['title'] = self.clean_text_series(self.df['title'])
         self.df = self.df[self.df['title'].str.len() > 5]  # Titres trop courts
-        print(f"✨ Titres nettoyés")
+        self._log(f"✨ Titres nettoyés")
         return self
         
     def clean_descriptions(self):
         """Nettoie les descriptions des cours"""
-        self.df['description'] = self.df['description'].apply(self.clean_text)
+        description = self.clean_text_series(self.df['description'])
         # Remplir les descriptions vides avec le titre
-        self.df['description'] = self.df.apply(
-            lambda x: x['title'] if pd.isna(x['description']) or x['description'] == '' else x['description'],
-            axis=1
-        )
-        print(f"✨ Descriptions nettoyées")
+        self.df['description'] = description.where(description != '', self.df['title'])
+        self._log(f"✨ Descriptions nettoyées")
         return self
         
     def normalize_categories(self):
@@ -172,14 +318,14 @@ class DataCleaner:
         def normalize_cat(cat):
             if pd.isna(cat):
                 return 'Other'
-            cat_lower = str(cat).lower().strip()
-            for key, value in self.CATEGORY_MAPPING.items():
-                if key in cat_lower:
-                    return value
+            value = self.CATEGORY_MATCHER(str(cat).lower().strip())
+            if value is not None:
+                return value
             return cat.title() if isinstance(cat, str) else 'Other'
             
-        self.df['category'] = self.df['category'].apply(normalize_cat)
-        print(f"📁 Catégories normalisées: {self.df['category'].nunique()} catégories uniques")
+        # Une recherche par catégorie distincte, pas par ligne
+        self.df['category'] = map_distinct(self.df['category'], normalize_cat)
+        self._log(f"📁 Catégories normalisées: {self.df['category'].nunique()} catégories uniques")
         return self
         
     def normalize_levels(self):
@@ -187,14 +333,10 @@ class DataCleaner:
         def normalize_level(level):
             if pd.isna(level):
                 return 'All Levels'
-            level_lower = str(level).lower().strip()
-            for key, value in self.LEVEL_MAPPING.items():
-                if key in level_lower:
-                    return value
-            return 'All Levels'
+            return self.LEVEL_MATCHER(str(level).lower().strip()) or 'All Levels'
             
-        self.df['level'] = self.df['level'].apply(normalize_level)
-        print(f"📊 Niveaux normalisés")
+        self.df['level'] = map_distinct(self.df['level'], normalize_level)
+        self._log(f"📊 Niveaux normalisés")
         return self
         
     def clean_ratings(self):
@@ -209,7 +351,7 @@ class DataCleaner:
                 return 0.0
                 
         self.df['rating'] = self.df['rating'].apply(clean_rating)
-        print(f"⭐ Ratings nettoyés")
+        self._log(f"⭐ Ratings nettoyés")
         return self
         
     def clean_num_reviews(self):
@@ -232,7 +374,7 @@ class DataCleaner:
             return 0
             
         self.df['num_reviews'] = self.df['num_reviews'].apply(clean_reviews)
-        print(f"📝 Reviews nettoyés")
+        self._log(f"📝 Reviews nettoyés")
         return self
         
     def clean_prices(self):
@@ -252,7 +394,7 @@ class DataCleaner:
                 return 'Paid'
                 
         self.df['price'] = self.df['price'].apply(clean_price)
-        print(f"💰 Prix normalisés")
+        self._log(f"💰 Prix normalisés")
         return self
         
     def handle_missing_values(self):
@@ -280,30 +422,42 @@ class DataCleaner:
         # Supprimer les lignes sans titre
         self.df = self.df[self.df['title'].str.len() > 0]
         
-        print(f"🔧 Valeurs manquantes traitées")
+        self._log(f"🔧 Valeurs manquantes traitées")
+        return self
+        
+    def add_numeric_id(self, start=1):
+        """Ajoute un ID numérique pour chaque cours (start : ID du premier, pour la suite d'un flux)"""
+        self.df['course_id'] = range(start, start + len(self.df))
+        self._log(f"🔢 IDs numériques ajoutés")
         return self
         
-    def add_numeric_id(self):
-        """Ajoute un ID numérique pour chaque cours"""
-        self.df['course_id'] = range(1, len(self.df) + 1)
-        print(f"🔢 IDs numériques ajoutés")
+    def clean_rows(self):
+        """Étapes ligne par ligne (sans état global) : les mêmes en mode batch et pour chaque morceau du flux"""
+        for step in (self.clean_titles, self.clean_descriptions, self.normalize_categories,
+                     self.normalize_levels, self.clean_ratings, self.clean_num_reviews,
+                     self.clean_prices, self.handle_missing_values):
+            if self.df.empty:
+                break  # Plus aucune ligne à nettoyer (morceau entièrement filtré)
+            step()
         return self
         
-    def clean_all(self):
-        """Exécute toutes les étapes de nettoyage"""
+    def clean_all(self, n_jobs=1):
+        """Exécute toutes les étapes de nettoyage
+        
+        n_jobs > 1 (-1 : tous les cœurs) : étapes ligne par ligne réparties par tranches de lignes sur un pool
+        de processus. Le dédoublonnage (avant) et les IDs (après) restent globaux : résultat identique à la série.
+        """
         print("\n" + "="*60)
         print("   🧹 NETTOYAGE DES DONNÉES")
         print("="*60 + "\n")
         
         self.remove_duplicates()
-        self.clean_titles()
-        self.clean_descriptions()
-        self.normalize_categories()
-        self.normalize_levels()
-        self.clean_ratings()
-        self.clean_num_reviews()
-        self.clean_prices()
-        self.handle_missing_values()
+        n_jobs = resolve_n_jobs(n_jobs)
+        if n_jobs > 1:
+            self.df = run_sharded(_clean_shard, self.df, n_jobs)
+            self._log(f"⚙️ Étapes ligne par ligne exécutées sur {n_jobs} processus")
+        else:
+            self.clean_rows()
         self.add_numeric_id()
         
         print(f"\n✅ Nettoyage terminé:")
@@ -313,6 +467,66 @@ class DataCleaner:
         
         return self
         
+    @staticmethod
+    def scan_dtypes(filepath, chunksize=CLEAN_CHUNK_SIZE):
+        """Types des colonnes tels que read_csv les déduirait du fichier entier, en un passage par morceaux
+        
+        Un morceau sans valeur manquante lirait en entier une colonne que le fichier complet lit en flottant
+        (3 au lieu de 3.0 en sortie) : le flux relit donc chaque morceau avec ces types.
+        """
+        found, has_missing = {}, {}
+        for chunk in pd.read_csv(filepath, chunksize=chunksize):
+            for column, dtype in chunk.dtypes.items():
+                kinds = found.setdefault(column, set())
+                if not chunk[column].isna().all():
+                    kinds.add(dtype)  # Un morceau entièrement vide n'apporte aucun type
+                has_missing[column] = has_missing.get(column, False) or chunk[column].hasnans
+                
+        dtypes = {}
+        for column, kinds in found.items():
+            if not kinds:
+                dtypes[column] = np.dtype('float64')  # Colonne entièrement vide
+            elif all(dtype.kind in 'iuf' for dtype in kinds) and (len(kinds) > 1 or has_missing[column]):
+                dtypes[column] = np.dtype('float64')  # Entiers et flottants ou valeurs manquantes : flottants
+            elif len(kinds) == 1 and not (has_missing[column] and next(iter(kinds)).kind == 'b'):
+                dtypes[column] = next(iter(kinds))
+            else:
+                dtypes[column] = np.dtype('object')  # Types mélangés (texte et nombres, booléens manquants)
+        return dtypes
+        
+    def clean_stream(self, input_path, output_path, chunksize=CLEAN_CHUNK_SIZE, memory_limit=DEDUPE_MEMORY_LIMIT):
+        """Nettoie un CSV morceau par morceau (mémoire constante) ; même fichier de sortie que clean_all + save
+        
+        Chaque morceau passe par les mêmes étapes que clean_all : dédoublonnage via les empreintes des titres
+        déjà écrits (SeenTitles), étapes ligne par ligne, puis IDs numériques à la suite du morceau précédent.
+        """
+        print("\n" + "="*60)
+        print("   🧹 NETTOYAGE DES DONNÉES (FLUX)")
+        print("="*60 + "\n")
+        print(f"📂 Lecture par morceaux de {chunksize} lignes: {input_path}")
+        
+        dtypes = self.scan_dtypes(input_path, chunksize)
+        read_count, next_id = 0, 1
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with SeenTitles(memory_limit) as seen, open(output_path, 'w', encoding='utf-8', newline='') as output:
+            for number, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize, dtype=dtypes)):
+                read_count += len(chunk)
+                cleaner = DataCleaner(chunk[seen.first_occurrences(chunk['title'])], verbose=False)
+                cleaner.clean_rows()
+                cleaner.add_numeric_id(start=next_id)
+                next_id += len(cleaner.df)
+                # Sortie ajoutée morceau par morceau (en-tête avec le premier)
+                cleaner.df.to_csv(output, index=False, header=(number == 0), lineterminator=os.linesep)
+                print(f"   🧩 Morceau {number + 1}: {len(chunk)} lus, {len(cleaner.df)} écrits")
+                
+        self.original_count = read_count
+        print(f"\n✅ Nettoyage terminé:")
+        print(f"   📊 Avant: {read_count} cours")
+        print(f"   📊 Après: {next_id - 1} cours")
+        print(f"   📊 Supprimés: {read_count - (next_id - 1)}")
+        print(f"\n💾 Sauvegardé: {output_path}")
+        return self
+        
     def get_stats(self):
         """Retourne des statistiques sur le dataset"""
         stats = {
@@ -337,10 +551,23 @@ class DataCleaner:
         return self.df
 
 
+def _clean_shard(df):
+    """Étapes ligne par ligne d'une tranche de lignes (exécutée dans un processus du pool)"""
+    return DataCleaner(df, verbose=False).clean_rows().df
+
+
 def main():
-    """Fonction principale"""
+    """Fonction principale (--stream : nettoyage par morceaux, pour les fichiers plus grands que la mémoire)"""
     cleaner = DataCleaner()
     
+    if '--stream' in sys.argv[1:]:
+        if not os.path.exists(RAW_DATA_PATH):
+            print(f"❌ Fichier non trouvé: {RAW_DATA_PATH}")
+            print("   Exécutez d'abord: python scrapers/run_scrapers.py")
+            return
+        cleaner.clean_stream(RAW_DATA_PATH, CLEAN_DATA_PATH)
+        return
+        
     # Charger les données brutes
     try:
         cleaner.load_data(RAW_DATA_PATH)
@@ -350,7 +577,7 @@ def main():
         return
         
     # Nettoyer
-    cleaner.clean_all()
+    cleaner.clean_all(n_jobs=PIPELINE_N_JOBS)
     
     # Statistiques
     stats = cleaner.get_stats()
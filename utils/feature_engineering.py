@@ -6,9 +6,15 @@ import sys
 import os
 
 # Configuration UTF-8 pour Windows
+# reconfigure modifie le flux existant : le remplacer par un nouveau TextIOWrapper fermerait le flux
+# d'un script qui importe ce module (benchmarks)
 import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+for stream_name in ('stdout', 'stderr'):
+    stream = getattr(sys, stream_name)
+    if hasattr(stream, 'reconfigure'):
+        stream.reconfigure(encoding='utf-8', errors='replace')
+    elif hasattr(stream, 'buffer'):
+        setattr(sys, stream_name, io.TextIOWrapper(stream.buffer, encoding='utf-8', errors='replace'))
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -24,6 +30,13 @@ except ImportError:
     TFIDF_MAX_FEATURES = 5000
     TFIDF_NGRAM_RANGE = (1, 2)
 
+try:
+    from config import PIPELINE_N_JOBS
+except ImportError:
+    PIPELINE_N_JOBS = 1
+
+from utils.parallel import resolve_n_jobs, run_sharded
+
 
 class FeatureEngineer:
     """Classe pour créer les features ML"""
@@ -54,8 +67,13 @@ class FeatureEngineer:
         'cours', 'apprendre', 'introduction', 'guide', 'tutoriel',
     ])
     
-    def __init__(self, df=None):
+    def __init__(self, df=None, verbose=True):
         self.df = df if df is not None else pd.DataFrame()
+        self.verbose = verbose  # Messages de chaque étape (désactivés dans les processus du pool)
+        
+    def _log(self, message):
+        if self.verbose:
+            print(message)
         
     def load_data(self, filepath):
         """Charge les données depuis un fichier CSV"""
@@ -92,7 +110,7 @@ class FeatureEngineer:
         
     def create_combined_text(self):
         """Crée une colonne de texte combiné pour TF-IDF"""
-        print("📝 Création du texte combiné...")
+        self._log("📝 Création du texte combiné...")
         
         text_columns = ['title', 'description', 'skills', 'category']
         
@@ -106,12 +124,12 @@ class FeatureEngineer:
         self.df['combined_text'] = self.df.apply(combine_text, axis=1)
         self.df['combined_text'] = self.df['combined_text'].apply(self.clean_text_for_nlp)
         
-        print("   ✅ Texte combiné créé")
+        self._log("   ✅ Texte combiné créé")
         return self
         
     def encode_platform(self):
         """Encode la plateforme en variable numérique"""
-        print("🔢 Encodage de la plateforme...")
+        self._log("🔢 Encodage de la plateforme...")
         
         platform_map = {
             'Coursera': 1,
@@ -119,12 +137,12 @@ class FeatureEngineer:
         }
         
         self.df['platform_encoded'] = self.df['platform'].map(platform_map).fillna(0).astype(int)
-        print("   ✅ Plateforme encodée")
+        self._log("   ✅ Plateforme encodée")
         return self
         
     def encode_level(self):
         """Encode le niveau en variable numérique"""
-        print("🔢 Encodage du niveau...")
+        self._log("🔢 Encodage du niveau...")
         
         level_map = {
             'Beginner': 1,
@@ -134,12 +152,12 @@ class FeatureEngineer:
         }
         
         self.df['level_encoded'] = self.df['level'].map(level_map).fillna(0).astype(int)
-        print("   ✅ Niveau encodé")
+        self._log("   ✅ Niveau encodé")
         return self
         
     def encode_price(self):
         """Encode le prix en variable numérique"""
-        print("🔢 Encodage du prix...")
+        self._log("🔢 Encodage du prix...")
         
         def encode_price_value(price):
             if pd.isna(price):
@@ -160,22 +178,22 @@ class FeatureEngineer:
                 return 2  # Paid
                 
         self.df['price_encoded'] = self.df['price'].apply(encode_price_value)
-        print("   ✅ Prix encodé")
+        self._log("   ✅ Prix encodé")
         return self
         
     def normalize_rating(self):
         """Normalise le rating entre 0 et 1"""
-        print("📊 Normalisation du rating...")
+        self._log("📊 Normalisation du rating...")
         
         max_rating = self.df['rating'].max() if self.df['rating'].max() > 0 else 5.0
         self.df['rating_normalized'] = self.df['rating'] / max_rating
         
-        print("   ✅ Rating normalisé")
+        self._log("   ✅ Rating normalisé")
         return self
         
     def create_popularity_score(self):
         """Crée un score de popularité basé sur le rating et le nombre de reviews"""
-        print("🌟 Création du score de popularité...")
+        self._log("🌟 Création du score de popularité...")
         
         # Normaliser le nombre de reviews (log scale)
         self.df['reviews_log'] = np.log1p(self.df['num_reviews'].fillna(0))
@@ -188,12 +206,12 @@ class FeatureEngineer:
             0.4 * self.df['reviews_normalized']
         )
         
-        print("   ✅ Score de popularité créé")
+        self._log("   ✅ Score de popularité créé")
         return self
         
     def create_category_encoding(self):
         """Crée un encodage one-hot des catégories"""
-        print("🏷️ Encodage des catégories...")
+        self._log("🏷️ Encodage des catégories...")
         
         # Obtenir les catégories uniques
         categories = self.df['category'].unique()
@@ -203,19 +221,34 @@ class FeatureEngineer:
             col_name = f"cat_{cat.lower().replace(' ', '_')}"
             self.df[col_name] = (self.df['category'] == cat).astype(int)
             
-        print(f"   ✅ {len(categories)} catégories encodées")
+        self._log(f"   ✅ {len(categories)} catégories encodées")
         return self
         
-    def engineer_all(self):
-        """Exécute toutes les étapes de feature engineering"""
-        print("\n" + "="*60)
-        print("   🔧 FEATURE ENGINEERING")
-        print("="*60 + "\n")
-        
+    def engineer_rows(self):
+        """Étapes ligne par ligne (texte combiné, encodages) : les mêmes en série et pour chaque tranche"""
         self.create_combined_text()
         self.encode_platform()
         self.encode_level()
         self.encode_price()
+        return self
+        
+    def engineer_all(self, n_jobs=1):
+        """Exécute toutes les étapes de feature engineering
+        
+        n_jobs > 1 (-1 : tous les cœurs) : étapes ligne par ligne réparties par tranches de lignes sur un pool
+        de processus ; les normalisations par le maximum s'exécutent ensuite sur le catalogue recollé.
+        """
+        print("\n" + "="*60)
+        print("   🔧 FEATURE ENGINEERING")
+        print("="*60 + "\n")
+        
+        n_jobs = resolve_n_jobs(n_jobs)
+        if n_jobs > 1:
+            self.df = run_sharded(_engineer_shard, self.df, n_jobs)
+            self._log(f"⚙️ Texte combiné et encodages créés sur {n_jobs} processus")
+        else:
+            self.engineer_rows()
+        # Étapes globales (maximums sur tout le catalogue)
         self.normalize_rating()
         self.create_popularity_score()
         # self.create_category_encoding()  # Optionnel, peut créer beaucoup de colonnes
@@ -254,6 +287,11 @@ class FeatureEngineer:
         return self.df
 
 
+def _engineer_shard(df):
+    """Étapes ligne par ligne d'une tranche de lignes (exécutée dans un processus du pool)"""
+    return FeatureEngineer(df, verbose=False).engineer_rows().df
+
+
 def main():
     """Fonction principale"""
     engineer = FeatureEngineer()
@@ -267,7 +305,7 @@ def main():
         return
         
     # Engineering
-    engineer.engineer_all()
+    engineer.engineer_all(n_jobs=PIPELINE_N_JOBS)
     
     # Sauvegarder (écrase le fichier clean)
     engineer.save(CLEAN_DATA_PATH)
@@ -0,0 +1,57 @@
+"""
+Exécution parallèle par tranches de lignes (nettoyage et feature engineering)
+Le DataFrame est découpé en tranches contiguës, chacune traitée par un processus du pool ; les tranches
+résultats sont recollées dans l'ordre des lignes, ce qui redonne le DataFrame de l'exécution en série.
+Seules les étapes ligne par ligne s'y prêtent : les étapes globales (dédoublonnage, maximums, IDs)
+s'exécutent ensuite sur le DataFrame recollé.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+
+def resolve_n_jobs(n_jobs):
+    """Nombre de processus : None ou 1 -> en série, -1 -> tous les cœurs, -2 -> tous sauf un (comme scikit-learn)"""
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0:
+        raise ValueError("n_jobs doit être différent de 0")
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def row_shards(df, n_shards):
+    """Tranches contiguës de tailles égales (à une ligne près), dans l'ordre"""
+    n_shards = max(min(n_shards, len(df)), 1)
+    bounds = [len(df) * k // n_shards for k in range(n_shards + 1)]
+    return [df.iloc[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+def map_shards(function, df, n_jobs):
+    """Applique function à chaque tranche dans un pool de n_jobs processus ; résultats dans l'ordre des lignes
+
+    function doit être une fonction de module (sérialisable) qui prend et renvoie un DataFrame.
+    """
+    shards = row_shards(df, n_jobs)
+    if len(shards) == 1:
+        return [function(shards[0])]
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        return list(pool.map(function, shards))
+
+
+def concat_shards(frames):
+    """Recolle les tranches traitées
+
+    Une tranche vidée par un filtre (titres trop courts...) s'arrête avant les conversions de types :
+    elle est ignorée pour que les types du résultat soient ceux de l'exécution en série.
+    """
+    kept = [frame for frame in frames if len(frame)] or frames[:1]
+    return pd.concat(kept) if len(kept) > 1 else kept[0]
+
+
+def run_sharded(function, df, n_jobs):
+    """Découpe df, applique function à chaque tranche en parallèle et recolle le résultat"""
+    return concat_shards(map_shards(function, df, resolve_n_jobs(n_jobs)))